@@ -0,0 +1,209 @@
+"""
+Compact in-memory article records for the indexes in database.py
+
+A stored article is a dict of strings: the same source and category names
+and a 19-character ISO date repeated in every document, plus a dict's own
+overhead. In memory each article is instead an Article with fixed slots:
+source and category are small integer codes into a shared table, and the
+publish date is epoch seconds. Dicts in the NewsArticle shape are built
+only when an article leaves the collection (chat, backups, field subsets);
+full articles in API responses are joined from each record's JSON, encoded
+on first use and cached for the articles read most recently.
+"""
+import functools
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+EPOCH = datetime(1970, 1, 1)
+SECOND = timedelta(seconds=1)
+
+# Fields every article has (NewsArticle), in the order they are returned
+FIELDS = ('title', 'content', 'source', 'url', 'published_date', 'category', 'image_url')
+
+# Fields an upsert may change; their hash tells real updates from repeats
+UPSERT_FIELDS = ('title', 'content', 'published_date', 'image_url')
+
+# Articles whose encoded JSON is kept (the recent pages everyone reads)
+JSON_CACHE_SIZE = int(os.getenv('NEWS_JSON_CACHE', '10000'))
+
+
+def to_epoch(value) -> Optional[int]:
+    """
+    Epoch seconds for a published_date (ISO string, datetime or number);
+    None when there is no date or it cannot be read. Naive dates are UTC.
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(value)
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.strip())
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    # Plain arithmetic on naive UTC is several times cheaper than timestamp()
+    return (value - EPOCH) // SECOND
+
+
+def _json_default(value):
+    """Encode what JSON has no type for (dates from old stores) the way jsonable_encoder does"""
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+# Same output as the response cache's json.dumps(jsonable_encoder(...)) for plain articles
+encode_json = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=_json_default).encode
+
+
+def normalize(document) -> Dict:
+    """
+    Copy of a document in the form it is stored: published_date as a
+    naive-UTC ISO string (datetimes and UTC offsets are converted here,
+    once), no '_id' (storage hands out the ids)
+    """
+    document = {k: v for k, v in document.items() if k != '_id'}
+    published = to_epoch(document.get('published_date'))
+    if published is not None:
+        document['published_date'] = from_epoch(published)
+    return document
+
+
+@functools.lru_cache(maxsize=4096)
+def from_epoch(seconds: Optional[int]) -> Optional[str]:
+    """
+    ISO string (naive UTC, like the scraper stores) for epoch seconds;
+    cached, since the same recent pages are read over and over
+    """
+    if seconds is None:
+        return None
+    return (EPOCH + seconds * SECOND).isoformat()
+
+
+class Codes:
+    """
+    Shared table of repeated strings (sources, categories) and their small
+    integer codes; every record holding a code shares the one string
+    """
+    def __init__(self):
+        self.values: List[Optional[str]] = [None]   # code 0 is None
+        self.codes: Dict[Optional[str], int] = {None: 0}
+
+    def code(self, value: Optional[str]) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+SOURCES = Codes()
+CATEGORIES = Codes()
+
+
+def fingerprint(document, published: Optional[int] = None) -> int:
+    """
+    64-bit hash of the fields an upsert may change (dates compared as epochs;
+    pass `published` when the epoch is already known)
+    """
+    if published is None:
+        published = to_epoch(document.get('published_date'))
+    text = '\x1f'.join(
+        str(published) if field == 'published_date' else str(document.get(field) or '')
+        for field in UPSERT_FIELDS
+    )
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class Article:
+    """
+    One article in memory; reads like a read-only dict through get()
+    (source, category and published_date come back as strings)
+    """
+    __slots__ = ('id', 'title', 'content', 'url', 'image_url', 'source_code', 'category_code',
+                 'published', 'fingerprint', 'extra')
+
+    def __init__(self, doc_id: int, document):
+        self.id = doc_id
+        self.title = document.get('title')
+        self.content = document.get('content')
+        self.url = document.get('url')
+        self.image_url = document.get('image_url')
+        self.source_code = SOURCES.code(document.get('source'))
+        self.category_code = CATEGORIES.code(document.get('category'))
+        self.published = to_epoch(document.get('published_date'))
+        self.fingerprint = fingerprint(document, self.published)
+        # Anything outside the NewsArticle fields is kept as is
+        extra = {k: v for k, v in document.items() if k not in FIELDS and k != '_id'}
+        if self.published is None and document.get('published_date') not in (None, ''):
+            extra['published_date'] = document['published_date']   # unreadable date, kept verbatim
+        self.extra = extra or None
+
+    @property
+    def json(self) -> bytes:
+        """The full article as the API returns it, encoded (see _article_json)"""
+        return _article_json(self)
+
+    @property
+    def source(self) -> Optional[str]:
+        return SOURCES.values[self.source_code]
+
+    @property
+    def category(self) -> Optional[str]:
+        return CATEGORIES.values[self.category_code]
+
+    def get(self, field: str, default=None):
+        if field == '_id':
+            return str(self.id)
+        if self.extra is not None and field in self.extra:
+            return self.extra[field]
+        if field == 'source':
+            value = SOURCES.values[self.source_code]
+        elif field == 'category':
+            value = CATEGORIES.values[self.category_code]
+        elif field == 'published_date':
+            value = from_epoch(self.published)
+        elif field in FIELDS:
+            value = getattr(self, field)
+        else:
+            return default
+        # Missing and None are the same here
+        return default if value is None else value
+
+    def to_dict(self, fields=None) -> Dict:
+        """The article as the API returns it (NewsArticle fields plus _id), or just `fields` and _id"""
+        if fields:
+            return {'_id': str(self.id), **{f: self.get(f) for f in fields if f in FIELDS or f in (self.extra or ())}}
+        article = {
+            'title': self.title,
+            'content': self.content,
+            'source': SOURCES.values[self.source_code],
+            'url': self.url,
+            'published_date': from_epoch(self.published),
+            'category': CATEGORIES.values[self.category_code],
+            'image_url': self.image_url,
+        }
+        if self.extra is not None:
+            article.update(self.extra)
+        article['_id'] = str(self.id)
+        return article
+
+    def to_document(self) -> Dict:
+        """The stored form (no _id), e.g. to apply changed fields"""
+        document = self.to_dict()
+        del document['_id']
+        return document
+
+
+@functools.lru_cache(maxsize=JSON_CACHE_SIZE)
+def _article_json(record: Article) -> bytes:
+    """
+    Encoded JSON of an article, cached by record: a write makes a new
+    record, so a changed article is never served from here
+    """
+    return encode_json(record.to_dict()).encode('utf-8')
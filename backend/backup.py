@@ -0,0 +1,146 @@
+"""
+NDJSON export/import of the news articles (one JSON object per line)
+
+The same generator pipeline serves GET /news?stream=ndjson and backups:
+
+    python3 backup.py export backup.ndjson.gz [--category technology] [--source CNN]
+    python3 backup.py import backup.ndjson.gz
+
+Files ending in .gz are compressed; "-" means stdout/stdin.
+"""
+import argparse
+import contextlib
+import gzip
+import json
+import sys
+import time
+from itertools import islice
+from typing import Dict, Iterable, Iterator
+
+from database import get_news_collection, close_mongodb_connection
+
+CHUNK_LINES = 500     # lines joined into one write / one streamed chunk
+IMPORT_BATCH = 1000   # articles per upsert when importing
+
+
+def to_ndjson(articles: Iterable[Dict], chunk_lines: int = CHUNK_LINES) -> Iterator[bytes]:
+    """
+    Encode articles as NDJSON, yielding chunks of up to chunk_lines lines
+    (articles already encoded as JSON bytes are passed through)
+    """
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=str).encode
+    articles = iter(articles)
+    while True:
+        lines = [article if isinstance(article, bytes) else encode(article).encode('utf-8')
+                 for article in islice(articles, chunk_lines)]
+        if not lines:
+            return
+        yield b"\n".join(lines) + b"\n"
+
+
+def from_ndjson(lines: Iterable) -> Iterator[Dict]:
+    """
+    Decode NDJSON lines (str or bytes), skipping blank ones
+    """
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"Line {number} is not valid JSON: {e}") from None
+
+
+def _open(path: str, mode: str):
+    if path == "-":
+        return sys.__stdout__.buffer if "w" in mode else sys.stdin.buffer
+    if path.endswith(".gz"):
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+def export_articles(path: str, **filters) -> int:
+    """
+    Write every matching article to path, newest first; returns the count
+    """
+    collection = get_news_collection()
+    count = 0
+
+    def counted(articles):
+        nonlocal count
+        for article in articles:
+            count += 1
+            yield article
+
+    out = _open(path, "wb")
+    try:
+        for chunk in to_ndjson(counted(collection.iter_articles(**filters, encoded=True))):
+            out.write(chunk)
+    finally:
+        if out is not sys.__stdout__.buffer:
+            out.close()
+    return count
+
+
+def import_articles(path: str, batch_size: int = IMPORT_BATCH) -> Dict[str, int]:
+    """
+    Upsert the articles from an NDJSON file in batches
+
+    Stored ids are not carried over (every backend hands out its own), and
+    articles that are already saved are skipped or refreshed like a scrape.
+    """
+    collection = get_news_collection()
+    totals = {"inserted": 0, "updated": 0, "skipped": 0}
+    source = _open(path, "rb")
+    try:
+        articles = from_ndjson(source)
+        while True:
+            batch = [{k: v for k, v in article.items() if k != '_id'}
+                     for article in islice(articles, batch_size)]
+            if not batch:
+                break
+            result = collection.upsert_many(batch)
+            totals["inserted"] += result.inserted_count
+            totals["updated"] += result.updated_count
+            totals["skipped"] += result.skipped_count
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or import news articles as NDJSON")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="write articles to a file")
+    export.add_argument("path", help="output file (.gz to compress, - for stdout)")
+    export.add_argument("--category")
+    export.add_argument("--source")
+
+    load = commands.add_parser("import", help="upsert articles from a file")
+    load.add_argument("path", help="input file (.gz if compressed, - for stdin)")
+    load.add_argument("--batch-size", type=int, default=IMPORT_BATCH)
+
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    # Status messages go to stderr so `export -` can be piped
+    with contextlib.redirect_stdout(sys.stderr):
+        _run(args, start)
+
+
+def _run(args, start):
+    try:
+        if args.command == "export":
+            count = export_articles(args.path, category=args.category, source=args.source)
+            print(f"📦 Exported {count} articles to {args.path} in {time.perf_counter() - start:.1f}s")
+        else:
+            totals = import_articles(args.path, batch_size=args.batch_size)
+            print(f"📥 Imported {args.path} in {time.perf_counter() - start:.1f}s: {totals['inserted']} new, "
+                  f"{totals['updated']} updated, {totals['skipped']} already saved")
+    finally:
+        close_mongodb_connection()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark: refreshing the frontend after a scrape, full reload vs GET /news/changes
+
+After each simulated scrape (new articles plus a few updated and deleted
+ones) a client either downloads the whole list again (GET /news, which
+the scrape took out of the response cache) or asks only for what changed
+since its last sequence number. Reports bytes and time per refresh for
+each corpus size.
+
+Run from the backend folder (changed articles per scrape is optional):
+    python3 benchmarks/bench_changes.py 50
+"""
+import sys
+
+from fastapi.testclient import TestClient
+
+from common import make_articles, memory_collection, timed
+
+SIZES = [1_000, 10_000, 50_000]
+DEFAULT_CHANGED = 50
+ROUNDS = 5
+
+
+def main():
+    import database
+    import main
+
+    changed = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_CHANGED
+    print(f"{changed} new articles, {changed // 10} updated and {changed // 10} deleted per scrape")
+    print(f"{'articles':>9} {'full GET /news':>22} {'GET /news/changes':>22} {'speedup':>8}")
+    for size in SIZES:
+        collection = database.news_collection = memory_collection(size)
+        collection._indexes()
+        # No `with`: the lifespan would connect to the configured database instead
+        client = TestClient(main.app)
+        seq = client.get("/news/changes").json()["seq"]
+        full = delta = 0.0
+        full_bytes = delta_bytes = 0
+        for round in range(ROUNDS):
+            start = size + round * changed
+            updated = list(make_articles(changed // 10, start - changed))
+            for article in updated:
+                article["content"] += " (updated)"
+            collection.upsert_many(list(make_articles(changed, start)) + updated)
+            page, _ = collection.find_page(limit=changed // 10, before=size // 2 - round * changed)
+            collection.delete_many({"_id": {"$in": [int(article["_id"]) for article in page]}})
+
+            response, seconds = timed(client.get, "/news")
+            full += seconds
+            full_bytes += len(response.content)
+            response, seconds = timed(client.get, "/news/changes", params={"since": seq})
+            delta += seconds
+            delta_bytes += len(response.content)
+            body = response.json()
+            assert not body["reset"] and not body["more"]
+            seq = body["seq"]
+        print(f"{size:>9} {full_bytes / ROUNDS / 1e6:>8.2f} MB {full / ROUNDS * 1000:>8.1f} ms "
+              f"{delta_bytes / ROUNDS / 1e3:>8.1f} kB {delta / ROUNDS * 1000:>8.2f} ms {full / delta:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark: HTML cleaning of feed summaries, BeautifulSoup vs the bounded cleaner
+
+The corpus (fixtures/feed_summaries.json) follows the markup real feeds
+ship: WordPress footers, feedburner pixels, full-content bodies with
+figures, embedded scripts, entity-heavy and non-English text.
+
+Run from the backend folder (batch size is optional):
+    python3 benchmarks/bench_clean.py 20000
+"""
+import json
+import os
+import sys
+
+from bs4 import BeautifulSoup
+
+from common import timed
+from cleaner import clean_html
+import scraper
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "feed_summaries.json")
+DEFAULT_BATCH = 20_000
+
+
+def soup_clean(html_text):
+    # What scraper.clean_html used to do
+    if not html_text:
+        return ""
+    text = BeautifulSoup(html_text, 'html.parser').get_text(separator=' ', strip=True)
+    return text[:497] + "..." if len(text) > 500 else text
+
+
+def main():
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BATCH
+    with open(FIXTURE, encoding="utf-8") as f:
+        corpus = json.load(f)
+    batch = (corpus * (batch_size // len(corpus) + 1))[:batch_size]
+    megabytes = sum(len(text.encode("utf-8")) for text in batch) / 1e6
+
+    # Same text apart from whitespace, which the new cleaner collapses before cutting
+    differ = 0
+    for text in corpus:
+        old, new = " ".join(soup_clean(text).split()).rstrip("."), clean_html(text).rstrip(".")
+        common = min(len(old), len(new))
+        differ += old[:common] != new[:common]
+    print(f"{len(corpus)} fixture summaries, {differ} with different text than BeautifulSoup")
+
+    _, soup = timed(lambda: [soup_clean(text) for text in batch])
+    _, bounded = timed(lambda: [clean_html(text) for text in batch])
+    # Spread over the scraper's parse processes, as big scrapes do (started before timing)
+    pool = scraper.get_parse_pool()
+    list(pool.map(clean_html, batch[:scraper.PARSE_WORKERS]))
+    chunksize = max(1, batch_size // (scraper.PARSE_WORKERS * 4))
+    _, pooled = timed(lambda: list(pool.map(clean_html, batch, chunksize=chunksize)))
+    scraper.close_parse_pool()
+
+    print(f"\n{batch_size} summaries ({megabytes:.1f} MB), {os.cpu_count()} CPUs")
+    print(f"{'cleaner':>24} {'total':>8} {'per item':>10} {'speedup':>8}")
+    for name, seconds in [("BeautifulSoup", soup), ("bounded regex", bounded), ("bounded + parse pool", pooled)]:
+        print(f"{name:>24} {seconds:>7.2f}s {seconds / batch_size * 1e6:>8.1f}us {soup / seconds:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
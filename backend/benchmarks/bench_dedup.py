@@ -0,0 +1,103 @@
+"""
+Benchmark: near-duplicate clustering (clusters.py) as the corpus grows
+
+A synthetic corpus where some stories are run again by other sources, a
+few words reworded and a sign-off added (different URL, so the URL/title
+key does not merge them). Reports, per corpus size: build time, the cost
+of adding one more article (flat: it is compared with its LSH buckets,
+not with every article), how many candidates it was compared with,
+precision/recall of the clusters against the injected duplicates, and
+GET /news with and without collapse=true.
+
+Run from the backend folder (sizes are optional):
+    python3 benchmarks/bench_dedup.py 10000 50000 100000
+"""
+import itertools
+import random
+import sys
+
+from fastapi.testclient import TestClient
+
+from common import SOURCES, make_corpus, timed
+
+DEFAULT_SIZES = (10_000, 50_000, 100_000)
+DUPLICATE_SHARE = 0.2      # stories that other sources run again
+REWORDED = 3               # words changed in each copy
+SIGN_OFFS = ["Reporting by our correspondents.", "Additional reporting by agencies.", "Updated with comment."]
+ADDS = 1000                # articles timed one by one after the build
+
+
+def make_stories(count: int, seed: int = 7):
+    """(articles, {doc_id: story number}): a corpus with near-duplicate copies of some stories"""
+    rng = random.Random(seed)
+    articles, story_of = [], {}
+    for story, article in enumerate(make_corpus(count, seed=seed)):
+        articles.append(article)
+        story_of[len(articles)] = story
+        copies = rng.choice((1, 2)) if rng.random() < DUPLICATE_SHARE else 0
+        for copy in range(copies):
+            words = article["content"].split()
+            for _ in range(REWORDED):
+                words[rng.randrange(len(words))] = rng.choice(("reportedly", "officials", "sources", "early"))
+            source = SOURCES[(SOURCES.index(article["source"]) + 1 + copy) % len(SOURCES)]
+            articles.append(dict(article, source=source, content=" ".join(words) + " " + rng.choice(SIGN_OFFS),
+                                 url=f"{article['url']}?via={source.replace(' ', '').lower()}"))
+            story_of[len(articles)] = story
+    return articles, story_of
+
+
+def pair_scores(clusters, story_of):
+    """Precision and recall over pairs of articles: same cluster vs same story"""
+    def pairs(groups):
+        return {pair for ids in groups for pair in itertools.combinations(sorted(ids), 2)}
+    by_story = {}
+    for doc_id, story in story_of.items():
+        by_story.setdefault(story, []).append(doc_id)
+    truth, found = pairs(by_story.values()), pairs(clusters.members.values())
+    return len(truth & found) / max(len(found), 1), len(truth & found) / max(len(truth), 1)
+
+
+def main():
+    from tinydb.storages import MemoryStorage
+    import database
+    import main
+    from clusters import signature
+    from response_cache import response_cache
+    from storage import TinyDBBackend
+
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    response_cache.ttl = 0
+    print(f"{DUPLICATE_SHARE:.0%} of stories run again by 1-2 other sources, {REWORDED} words reworded")
+    print(f"{'articles':>9} {'build':>8} {'add':>9} {'compared':>9} {'precision':>10} {'recall':>7} "
+          f"{'stories':>8} {'GET /news':>10} {'collapsed':>10}")
+    for size in sizes:
+        articles, story_of = make_stories(size)
+        extra, _ = make_stories(ADDS, seed=size)
+        backend = TinyDBBackend(storage=MemoryStorage)
+        backend.insert(articles)
+        collection = database.news_collection = database.CollectionWrapper(backend)
+        docs = collection._indexes().docs
+        assert sorted(docs) == sorted(story_of)
+        clusters, build = timed(collection._cluster_index)
+
+        # One article at a time, as the scraper stores them
+        start = max(docs) + 1
+        compared = sum(len(clusters.candidates(signature(article))) for article in extra) / len(extra)
+        _, adding = timed(lambda: [clusters.add(start + i, article) for i, article in enumerate(extra)])
+        for i in range(len(extra)):
+            clusters.remove(start + i)
+
+        precision, recall = pair_scores(clusters, story_of)
+        # No `with`: the lifespan would connect to the configured database instead
+        client = TestClient(main.app)
+        client.get("/news?limit=1000")   # warm up
+        plain, plain_time = timed(client.get, "/news?limit=1000")
+        collapsed, collapsed_time = timed(client.get, "/news?limit=1000&collapse=true")
+        assert len(plain.json()) == len(collapsed.json()) == 1000
+        print(f"{len(articles):>9} {build:>7.1f}s {adding / len(extra) * 1e6:>7.0f}us {compared:>9.1f} "
+              f"{precision:>10.3f} {recall:>7.3f} {len(clusters.members):>8}/{len(set(story_of.values()))} "
+              f"{plain_time * 1000:>8.1f}ms {collapsed_time * 1000:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
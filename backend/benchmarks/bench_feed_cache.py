@@ -0,0 +1,58 @@
+"""
+Benchmark: repeated scrapes of unchanged feeds with and without the validator cache
+
+Simulates a cron job scraping every minute. Three stub servers support ETag,
+two do not (those are caught by the body hash).
+
+Run from the backend folder:
+    python3 benchmarks/bench_feed_cache.py
+"""
+import os
+import tempfile
+import time
+from contextlib import ExitStack
+
+from common import StubFeedServer, make_rss
+import scraper
+from feed_cache import FeedCache
+
+RUNS = 20
+
+
+def run(sources, servers, use_cache):
+    scraper.USE_FEED_CACHE = use_cache
+    for server in servers:
+        server.bytes_sent = 0
+    report = scraper.new_scrape_report()
+    start_cpu = time.process_time()
+    for _ in range(RUNS):
+        scraper.scrape_sources(sources, report)
+    cpu = time.process_time() - start_cpu
+    return sum(s.bytes_sent for s in servers), cpu, len(report["skipped"])
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp, ExitStack() as stack:
+        scraper.validator_cache = FeedCache(os.path.join(tmp, "feed_cache.json"))
+        servers = [
+            stack.enter_context(StubFeedServer(make_rss(f"Feed{i}", count=50), etag=i < 3))
+            for i in range(5)
+        ]
+        sources = [(s.url, f"Feed{i}", "general") for i, s in enumerate(servers)]
+
+        plain_bytes, plain_cpu, _ = run(sources, servers, use_cache=False)
+        cached_bytes, cached_cpu, skipped = run(sources, servers, use_cache=True)
+
+    print("=" * 50)
+    print(f"{RUNS} scrapes of {len(sources)} unchanged feeds")
+    print(f"No cache:   {plain_bytes / 1024:8.1f} KiB downloaded, {plain_cpu:.2f}s CPU")
+    print(f"With cache: {cached_bytes / 1024:8.1f} KiB downloaded, {cached_cpu:.2f}s CPU "
+          f"({skipped} feed fetches skipped)")
+    print(f"Bandwidth: {plain_bytes / max(cached_bytes, 1):.1f}x less   "
+          f"CPU: {plain_cpu / max(cached_cpu, 1e-9):.1f}x less")
+    print("=" * 50)
+    scraper.close_http_client()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Benchmark: sequential vs concurrent feed scraping against local stub servers
+
+Run from the backend folder:
+    python3 benchmarks/bench_fetch.py
+"""
+from contextlib import ExitStack
+
+from common import StubFeedServer, make_rss, timed
+import scraper
+
+# One stub server per source, each answering after a different delay
+DELAYS = [0.2, 0.4, 0.6, 0.8, 1.0]
+
+
+def main():
+    # Every run must really download and parse the feeds
+    scraper.USE_FEED_CACHE = False
+    with ExitStack() as stack:
+        servers = [
+            stack.enter_context(StubFeedServer(make_rss(f"Feed{i}"), delay))
+            for i, delay in enumerate(DELAYS)
+        ]
+        sources = [(s.url, f"Feed{i}", "general") for i, s in enumerate(servers)]
+
+        # Old behaviour: one feed after the other
+        def sequential():
+            articles = []
+            for source in sources:
+                articles.extend(scraper.scrape_rss_feed(*source))
+            return articles
+
+        seq_articles, seq_time = timed(sequential)
+        con_articles, con_time = timed(scraper.scrape_sources, sources)
+
+    print("=" * 50)
+    print(f"Feeds: {len(DELAYS)}   sum of delays: {sum(DELAYS):.2f}s   slowest: {max(DELAYS):.2f}s")
+    print(f"Sequential: {seq_time:.2f}s ({len(seq_articles)} articles)")
+    print(f"Concurrent: {con_time:.2f}s ({len(con_articles)} articles)")
+    print(f"Speedup:    {seq_time / con_time:.1f}x")
+    print("=" * 50)
+    scraper.close_http_client()
+
+
+if __name__ == "__main__":
+    main()
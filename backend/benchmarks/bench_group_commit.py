@@ -0,0 +1,81 @@
+"""
+Benchmark: concurrent POST /news-style inserts, one write each vs group commit
+
+Many concurrent callers each insert one article, either with one
+insert_one per caller (queued on the writer thread) or through the group
+commit queue that AsyncCollection.insert_one uses. Runs every file
+backend in both durability modes, then reopens the file and checks that
+every article is there.
+
+Run from the backend folder (callers and seeded corpus are optional):
+    python3 benchmarks/bench_group_commit.py 2000 1000
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+from common import make_articles, timed
+from storage import create_backend
+
+DEFAULT_CALLERS = 2000
+DEFAULT_CORPUS = 1000
+BACKENDS = ["tinydb", "sqlite", "log"]
+
+
+def open_collection(backend_name, tmp, fsync):
+    import database
+
+    backend = create_backend(backend_name, path=os.path.join(tmp, "news.json"),
+                             sqlite_path=os.path.join(tmp, "news.sqlite3"),
+                             log_path=os.path.join(tmp, "news.log"), fsync=fsync)
+    return database.CollectionWrapper(backend)
+
+
+async def insert_all(collection, documents, grouped):
+    from database import run_write
+
+    if grouped:
+        results = await asyncio.gather(*(collection.aio.insert_one(doc) for doc in documents))
+    else:
+        results = await asyncio.gather(*(run_write(collection.insert_one, doc) for doc in documents))
+    return [result.inserted_id for result in results]
+
+
+def measure(backend_name, fsync, grouped, callers, corpus):
+    with tempfile.TemporaryDirectory() as tmp:
+        collection = open_collection(backend_name, tmp, fsync)
+        collection.backend.insert(make_articles(corpus))
+        collection._indexes()
+        documents = list(make_articles(callers, start=corpus))
+
+        ids, seconds = timed(asyncio.run, insert_all(collection, documents, grouped))
+        commits = collection.commits.commits
+        collection.commits.close()
+        collection.backend.close()
+
+        # Reopen: every caller's article must be stored under its own id
+        reopened = open_collection(backend_name, tmp, fsync)
+        intact = reopened.backend.count() == corpus + callers and len(set(ids)) == callers
+        reopened.backend.close()
+    return callers / seconds, commits, intact
+
+
+def main():
+    callers = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_CALLERS
+    corpus = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_CORPUS
+
+    print(f"{callers} concurrent single-article inserts into {corpus} stored articles")
+    print(f"{'backend':>8} {'sync':>6} {'one write each':>15} {'group commit':>13} {'commits':>8} {'speedup':>8} {'intact':>7}")
+    for backend_name in BACKENDS:
+        for fsync in (True, False):
+            # TinyDB rewrites the whole file per write, so keep its ungrouped run short
+            single_callers = min(callers, 200) if backend_name == "tinydb" else callers
+            single, _, single_ok = measure(backend_name, fsync, False, single_callers, corpus)
+            grouped, commits, grouped_ok = measure(backend_name, fsync, True, callers, corpus)
+            print(f"{backend_name:>8} {'batch' if fsync else 'async':>6} {single:>11.0f}/s {grouped:>10.0f}/s "
+                  f"{commits:>8} {grouped / single:>7.1f}x {str(single_ok and grouped_ok):>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Load test: thousands of idle GET /news/live subscribers on one uvicorn worker
+
+Starts the API in a subprocess (temporary database), opens N raw SSE
+connections from this process and reports, from /proc of the server:
+memory per connection, CPU per connection while idle, then the fan-out
+latency of a POST /news to every subscriber and of a category-filtered
+stream. Last, a few clients that stop reading are pushed large articles
+until the server drops them (news_live_dropped_total), on a second
+server polling for changes more often so each article is its own event.
+
+Run from the backend folder (subscriber counts are optional):
+    python3 benchmarks/bench_live.py 1000 5000
+"""
+import asyncio
+import contextlib
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from common import BACKEND_DIR
+
+DEFAULT_COUNTS = (1000, 5000)
+PORT = 8791
+IDLE_SECONDS = 10
+SLOW_CLIENTS = 5
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+def proc_stats(pid):
+    """(resident bytes, CPU seconds) of a process"""
+    with open(f"/proc/{pid}/status") as f:
+        rss = next(int(line.split()[1]) * 1024 for line in f if line.startswith("VmRSS:"))
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return rss, (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+async def subscribe(query="", rcvbuf=None):
+    """Open a raw SSE connection and wait for the hello event"""
+    sock = None
+    if rcvbuf:
+        sock = socket.socket()
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+        sock.setblocking(False)
+        await asyncio.get_running_loop().sock_connect(sock, ("127.0.0.1", PORT))
+    reader, writer = await asyncio.open_connection(sock=sock) if sock else \
+        await asyncio.open_connection("127.0.0.1", PORT, limit=1 << 22)
+    writer.write(f"GET /news/live{query} HTTP/1.1\r\nHost: bench\r\nAccept: text/event-stream\r\n\r\n".encode())
+    await reader.readuntil(b"event: hello")
+    await reader.readuntil(b"\n\n")
+    return reader, writer
+
+
+async def next_changes(reader):
+    """Time at which the next `changes` event arrived, and its data"""
+    await reader.readuntil(b"event: changes\n")
+    data = await reader.readuntil(b"\n\n")
+    return time.perf_counter(), json.loads(data.split(b"data: ", 1)[1])
+
+
+async def post(http, **article):
+    response = await http.post("/news", json={"content": "Live feed load test.", "source": "Bench", **article})
+    response.raise_for_status()
+
+
+def latencies(start, arrivals):
+    ms = sorted((arrival - start) * 1000 for arrival in arrivals)
+    return f"p50 {statistics.median(ms):.0f}ms  p99 {ms[int(len(ms) * 0.99) - 1]:.0f}ms  max {ms[-1]:.0f}ms"
+
+
+async def run(server_pid, count):
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", timeout=120) as http:
+        rss_before, _ = proc_stats(server_pid)
+        clients = []
+        for i in range(0, count, 200):
+            clients += await asyncio.gather(*(subscribe() for _ in range(min(200, count - i))))
+        tech = await asyncio.gather(*(subscribe("?category=technology") for _ in range(100)))
+        await asyncio.sleep(1)
+        rss_after, cpu_before = proc_stats(server_pid)
+        await asyncio.sleep(IDLE_SECONDS)
+        _, cpu_after = proc_stats(server_pid)
+        total = count + len(tech)
+        print(f"\n{total} subscribers ({len(tech)} filtered to technology)")
+        print(f"  memory: {(rss_after - rss_before) / total / 1024:.1f} KiB per connection "
+              f"({rss_after / 1e6:.0f} MB resident)")
+        print(f"  idle CPU: {(cpu_after - cpu_before) / IDLE_SECONDS * 100:.1f}% of a core for all of them, "
+              f"{(cpu_after - cpu_before) / IDLE_SECONDS / total * 1e6:.2f} us/s per connection")
+
+        waiting = [asyncio.create_task(next_changes(reader)) for reader, _ in clients + tech]
+        start = time.perf_counter()
+        await post(http, title="Sports fan-out", category="sports")
+        results = await asyncio.gather(*waiting[:count])
+        assert all(data["articles"][0]["title"] == "Sports fan-out" for _, data in results)
+        print(f"  POST /news -> all {count} unfiltered: {latencies(start, [t for t, _ in results])}")
+
+        # The filtered streams skipped the sports article; they get the next technology one
+        start = time.perf_counter()
+        await post(http, title="Technology fan-out", category="technology")
+        results = await asyncio.gather(*waiting[count:])
+        assert all(data["articles"][0]["title"] == "Technology fan-out" for _, data in results)
+        print(f"  POST /news -> {len(tech)} technology: {latencies(start, [t for t, _ in results])}")
+
+        for _, writer in clients + tech:
+            writer.close()
+        await asyncio.sleep(1)
+
+
+async def slow_consumers(server_pid):
+    """Clients that never read: the server must drop them, not buffer without bound"""
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", timeout=120) as http:
+        slow = [await subscribe(rcvbuf=4096) for _ in range(SLOW_CLIENTS)]
+        big = "x" * 100_000
+        rss_before, _ = proc_stats(server_pid)
+        for i in range(300):
+            await post(http, title=f"Big {i}", content=big, category="general")
+            await asyncio.sleep(0.03)
+        await asyncio.sleep(2)
+        rss_after, _ = proc_stats(server_pid)
+        metrics = (await http.get("/metrics")).text
+        dropped = next(line for line in metrics.splitlines() if line.startswith("news_live_dropped_total"))
+        print(f"\n{SLOW_CLIENTS} clients that stopped reading, 300 x 100 kB articles: {dropped}, "
+              f"server grew {(rss_after - rss_before) / 1e6:.0f} MB")
+        for _, writer in slow:
+            writer.close()
+
+
+@contextlib.contextmanager
+def serve(tmp, **settings):
+    """The API in a subprocess on an empty database; yields its pid"""
+    env = dict(os.environ, AUTO_SCRAPE="0", NEWS_DB_BACKEND="sqlite",
+               NEWS_SQLITE_PATH=os.path.join(tmp, "db.sqlite3"), NEWS_SEARCH_PATH=os.path.join(tmp, "search.idx"),
+               NEWS_CHANGES_PATH=os.path.join(tmp, "changes"), NEWS_JOBS_DIR=os.path.join(tmp, "jobs"), **settings)
+    for name in ("db.sqlite3", "search.idx"):
+        if os.path.exists(os.path.join(tmp, name)):
+            os.remove(os.path.join(tmp, name))
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(PORT),
+                               "--log-level", "warning", "--backlog", "4096"],
+                              cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL)
+    try:
+        for _ in range(100):
+            try:
+                httpx.get(f"http://127.0.0.1:{PORT}/")
+                break
+            except httpx.TransportError:
+                time.sleep(0.2)
+        yield server.pid
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or DEFAULT_COUNTS
+    with tempfile.TemporaryDirectory() as tmp:
+        with serve(tmp) as pid:
+            for count in counts:
+                asyncio.run(run(pid, count))
+        # Short polls: one event per article, so the slow clients' queues fill up quickly
+        with serve(tmp, LIVE_POLL_SECONDS="0.02") as pid:
+            asyncio.run(slow_consumers(pid))
+
+
+if __name__ == "__main__":
+    main()
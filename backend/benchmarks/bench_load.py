@@ -0,0 +1,179 @@
+"""
+Load test: mixed read/write traffic against sync vs async handlers
+
+Each mode serves a TinyDB file seeded with articles from its own uvicorn
+process. "sync" mounts plain `def` routes shaped like the old handlers
+(every request holds a Starlette threadpool thread for the whole storage
+call); "async" is the real app, whose handlers await the storage read
+threads and the single writer thread. The response cache is turned off in
+both so every GET does the work.
+
+Clients loop for a fixed time, each request a GET /news page (a few
+categories and page sizes) or, with the write share, a POST /news.
+Reports sustained requests per second and p50/p99 latency per kind.
+
+Each storage write also waits IO_DELAY seconds first, standing in for a
+database round trip or a slow disk (a TinyDB rewrite on this size is
+mostly CPU, which no handler style can overlap on one core).
+
+Run from the backend folder (seconds, clients, write share and I/O delay are optional):
+    python3 benchmarks/bench_load.py 15 64 0.2 0.02
+"""
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import BACKEND_DIR, make_articles
+
+SEED_ARTICLES = 3000
+IO_DELAY = 0.02
+CATEGORIES = ["technology", "general", "business", "science", "health"]
+
+
+def sync_app():
+    """The API before async handlers: sync routes straight onto the collection"""
+    from fastapi import FastAPI
+    from typing import Optional
+    from models import NewsArticle
+    from database import get_news_collection
+
+    app = FastAPI()
+
+    @app.get("/news")
+    def get_news(category: Optional[str] = None, limit: Optional[int] = None):
+        return get_news_collection().find_page(category=category, limit=limit)[0]
+
+    @app.post("/news")
+    def add_news(article: NewsArticle):
+        result = get_news_collection().insert_one(article.model_dump())
+        return {"status": "success", "id": str(result.inserted_id)}
+
+    return app
+
+
+def serve(mode, port, io_delay):
+    import uvicorn
+    import database
+
+    database.connect_to_mongodb()
+    collection = database.get_news_collection()
+    collection._indexes()
+
+    insert = collection.backend.insert
+    def slow_insert(documents):
+        time.sleep(io_delay)
+        return insert(documents)
+    collection.backend.insert = slow_insert
+
+    if mode == "sync":
+        app = sync_app()
+    else:
+        import main
+        app = main.app
+    # No lifespan: it would start the scrape scheduler
+    uvicorn.run(app, host="127.0.0.1", port=port, lifespan="off", log_level="error", timeout_keep_alive=60)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(values, share):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+async def load(base_url, seconds, clients, write_share):
+    import httpx
+
+    latencies = {"read": [], "write": []}
+    errors = 0
+    deadline = time.perf_counter() + seconds
+    counter = 0
+
+    async def client_loop(http):
+        nonlocal errors, counter
+        rng = random.Random()
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            if rng.random() < write_share:
+                counter += 1
+                kind = "write"
+                response = await http.post("/news", json={
+                    "title": f"Load test article {counter}", "content": "Body " * 40,
+                    "source": "LoadTest", "url": f"https://example.com/load/{os.getpid()}/{counter}",
+                    "category": rng.choice(CATEGORIES)})
+            else:
+                kind = "read"
+                response = await http.get("/news", params={"category": rng.choice(CATEGORIES),
+                                                           "limit": rng.choice([20, 50, 100])})
+            if response.status_code >= 400:
+                errors += 1
+            latencies[kind].append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as http:
+        await asyncio.gather(*(client_loop(http) for _ in range(clients)))
+    return latencies, errors
+
+
+def run_mode(mode, seconds, clients, write_share, io_delay):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "news.json")
+        with open(path, "w") as f:
+            json.dump({"news_articles": {str(i + 1): a for i, a in enumerate(make_articles(SEED_ARTICLES))}}, f)
+        port = free_port()
+        env = dict(os.environ, NEWS_DB_BACKEND="tinydb", NEWS_DB_PATH=path,
+                   NEWS_SEARCH_PATH=os.path.join(tmp, "search.idx"), RESPONSE_CACHE_TTL="0")
+        server = subprocess.Popen([sys.executable, __file__, "--serve", mode, str(port), str(io_delay)],
+                                  env=env, cwd=BACKEND_DIR, stdout=subprocess.DEVNULL)
+        try:
+            import httpx
+            for _ in range(200):
+                try:
+                    httpx.get(f"http://127.0.0.1:{port}/news", params={"limit": 1})
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+            latencies, errors = asyncio.run(load(f"http://127.0.0.1:{port}", seconds, clients, write_share))
+        finally:
+            server.terminate()
+            server.wait()
+    return latencies, errors
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--serve":
+        serve(sys.argv[2], int(sys.argv[3]), float(sys.argv[4]))
+        return
+
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 15
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    write_share = float(sys.argv[3]) if len(sys.argv) > 3 else 0.2
+    io_delay = float(sys.argv[4]) if len(sys.argv) > 4 else IO_DELAY
+
+    print(f"{clients} clients for {seconds:.0f}s, {write_share:.0%} writes, "
+          f"TinyDB file with {SEED_ARTICLES} articles, {io_delay * 1000:.0f}ms I/O per write, {os.cpu_count()} CPUs")
+    print(f"{'handlers':>9} {'req/s':>7} {'reads/s':>8} {'read p50':>9} {'read p99':>9} "
+          f"{'writes/s':>9} {'write p50':>10} {'write p99':>10} {'errors':>7}")
+    for mode in ("sync", "async"):
+        latencies, errors = run_mode(mode, seconds, clients, write_share, io_delay)
+        reads, writes = latencies["read"], latencies["write"]
+        print(f"{mode:>9} {(len(reads) + len(writes)) / seconds:>7.0f} {len(reads) / seconds:>8.0f} "
+              f"{percentile(reads, 0.5) * 1000:>7.0f}ms {percentile(reads, 0.99) * 1000:>7.0f}ms "
+              f"{len(writes) / seconds:>9.0f} {percentile(writes, 0.5) * 1000:>8.0f}ms "
+              f"{percentile(writes, 0.99) * 1000:>8.0f}ms {errors:>7}")
+
+
+if __name__ == "__main__":
+    main()
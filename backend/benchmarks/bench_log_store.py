@@ -0,0 +1,55 @@
+"""
+Benchmark: single-article writes and reads, TinyDB JSON file vs append-only log
+
+Every POST /news is one insert_one, so this inserts one document at a time
+into stores that already hold a corpus.
+
+Run from the backend folder (corpus sizes are optional):
+    python3 benchmarks/bench_log_store.py 1000 10000 50000
+"""
+import os
+import random
+import sys
+import tempfile
+
+from common import make_articles, timed
+from storage import LogBackend, TinyDBBackend
+
+DEFAULT_SIZES = [1_000, 10_000, 50_000]
+INSERTS = 200
+READS = 200
+
+
+def measure(backend, size):
+    backend.insert(make_articles(size))
+    new_docs = list(make_articles(INSERTS, start=size))
+
+    _, seconds = timed(lambda: [backend.insert([doc]) for doc in new_docs])
+    writes_per_sec = INSERTS / seconds
+
+    ids = random.sample(range(1, size + 1), READS)
+    _, seconds = timed(lambda: [backend.get(doc_id) for doc_id in ids])
+    read_ms = seconds / READS * 1000
+    return writes_per_sec, read_ms
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    print(f"{'corpus':>8} {'tinydb writes/s':>16} {'log writes/s':>13} {'speedup':>8} "
+          f"{'tinydb read':>12} {'log read':>10}")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            tiny = TinyDBBackend(os.path.join(tmp, "news.json"))
+            tiny_writes, tiny_read = measure(tiny, size)
+            tiny.close()
+
+            log = LogBackend(os.path.join(tmp, "news.log"))
+            log_writes, log_read = measure(log, size)
+            log.close()
+
+        print(f"{size:>8} {tiny_writes:>16.0f} {log_writes:>13.0f} {log_writes / tiny_writes:>7.0f}x "
+              f"{tiny_read:>10.2f}ms {log_read:>8.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark: memory per article in the in-memory indexes
+
+Compares ArticleIndexes (Article records with interned source/category
+codes and epoch dates) against the dict path it replaced, rebuilt here:
+a dict copy of every stored document with a string '_id', the ISO date
+in by_date, and article_key -> (doc_id, sha1 hex fingerprint) plus the
+reverse doc_id -> article_key map.
+
+Documents are decoded from JSON one by one, as a storage backend loads
+them, so nothing is shared with the corpus except what the store keeps.
+Retained memory is measured with tracemalloc after the build.
+
+Run from the backend folder (article counts are optional):
+    python3 benchmarks/bench_memory.py 1000 10000 50000
+"""
+import gc
+import hashlib
+import json
+import sys
+import time
+import tracemalloc
+
+from common import make_corpus
+
+from database import ArticleIndexes, article_key
+
+DEFAULT_COUNTS = (1000, 10000, 50000)
+UPSERT_FIELDS = ('title', 'content', 'published_date', 'image_url')
+
+
+def dict_indexes(documents):
+    """The previous ArticleIndexes.build: one dict per article"""
+    docs, ids, by_category, by_source, by_date, keys, key_by_id = {}, [], {}, {}, [], {}, {}
+    for doc_id, document in documents:
+        doc = dict(document)
+        doc['_id'] = str(doc_id)
+        docs[doc_id] = doc
+        ids.append(doc_id)
+        by_category.setdefault(doc.get('category'), []).append(doc_id)
+        by_source.setdefault(doc.get('source'), []).append(doc_id)
+        by_date.append((str(doc.get('published_date') or ''), doc_id))
+        key = article_key(doc)
+        text = '\x1f'.join(str(doc.get(field) or '') for field in UPSERT_FIELDS)
+        keys[key] = (doc_id, hashlib.sha1(text.encode('utf-8')).hexdigest())
+        key_by_id[doc_id] = key
+    by_date.sort()
+    return docs, ids, by_category, by_source, by_date, keys, key_by_id
+
+
+def measure(build, lines):
+    """Bytes retained by build() over decoded documents, and seconds taken"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    store = build((doc_id, json.loads(line)) for doc_id, line in enumerate(lines, start=1))
+    seconds = time.perf_counter() - start
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del store
+    return retained, seconds
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or DEFAULT_COUNTS
+    print(f"{'articles':>9} {'dicts B/article':>16} {'records B/article':>18} {'saved':>7} "
+          f"{'dicts build':>12} {'records build':>14}")
+    for count in counts:
+        lines = [json.dumps(article) for article in make_corpus(count)]
+        text = sum(len(a['title']) + len(a['content']) + len(a['url']) for a in map(json.loads, lines[:100])) / 100
+        old, old_s = measure(dict_indexes, lines)
+        new, new_s = measure(ArticleIndexes.build, lines)
+        print(f"{count:>9} {old / count:>16.0f} {new / count:>18.0f} {(1 - new / old) * 100:>6.1f}% "
+              f"{old_s * 1000:>9.0f} ms {new_s * 1000:>11.0f} ms")
+    print(f"\n(title + content + url average {text:.0f} characters per article, kept by both)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark: cost of the /metrics instrumentation (NEWS_METRICS=1 vs 0)
+
+Each mode runs in its own process (the switch is read at import): GET
+/news pages through the ASGI app in-process, bare find_page calls on the
+collection and a full scrape of local stub feeds through run_scrape.
+Reports the time per operation in both modes and the difference, then
+the per-stage scrape timings the instrumented run collected.
+
+Run from the backend folder (requests and feeds are optional):
+    python3 benchmarks/bench_metrics.py 3000 40
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+from common import BACKEND_DIR, StubFeedServer, make_rss, memory_collection, timed
+
+CORPUS = 5000
+DEFAULT_REQUESTS = 3000
+DEFAULT_FEEDS = 40
+
+
+async def get_pages(app, requests):
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        for i in range(requests):
+            response = await http.get("/news", params={"limit": 20, "category": "technology" if i % 2 else None})
+            assert response.status_code == 200
+
+
+def measure(requests, feed_count):
+    """One mode, in this process: seconds per operation"""
+    import database
+    import scheduler
+    import scraper
+
+    database.news_collection = memory_collection(CORPUS)
+    database.news_collection._indexes()
+    import main
+
+    results = {}
+    asyncio.run(get_pages(main.app, 50))   # warm up
+    _, seconds = timed(asyncio.run, get_pages(main.app, requests))
+    results["GET /news"] = seconds / requests
+
+    collection = database.news_collection
+    calls = requests * 10
+    _, seconds = timed(lambda: [collection.find_page(category="technology", limit=20) for _ in range(calls)])
+    results["find_page"] = seconds / calls
+
+    scraper.USE_FEED_CACHE = False
+    scraper.PARSE_WORKERS = 1
+    with StubFeedServer(make_rss("Bench", 20)) as server:
+        sources = [(f"{server.url}?feed={i}", f"Feed{i % 4}", "general") for i in range(feed_count)]
+        _, seconds = timed(scheduler.run_scrape, sources)
+    results["scrape"] = seconds
+    scraper.close_http_client()
+
+    stages = {}
+    histogram = main.metrics.SCRAPE_STAGE_SECONDS
+    for (stage, _), series in histogram.series.items():
+        stages[stage] = stages.get(stage, 0) + series[-2]
+    return results, stages
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--measure":
+        print(json.dumps(measure(int(sys.argv[2]), int(sys.argv[3]))))
+        return
+
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REQUESTS
+    feed_count = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_FEEDS
+
+    runs = {}
+    for enabled in ("0", "1"):
+        env = dict(os.environ, NEWS_METRICS=enabled, RESPONSE_CACHE_TTL="0", AUTO_SCRAPE="0")
+        output = subprocess.run([sys.executable, __file__, "--measure", str(requests), str(feed_count)],
+                                env=env, cwd=BACKEND_DIR, capture_output=True, text=True, check=True).stdout
+        runs[enabled] = json.loads(output.strip().splitlines()[-1])
+
+    (off, _), (on, stages) = runs["0"], runs["1"]
+    print(f"{CORPUS} articles in memory, {requests} GET /news pages, {feed_count} stub feeds scraped")
+    print(f"{'operation':>12} {'metrics off':>12} {'metrics on':>12} {'overhead':>9}")
+    for name, unit, scale in (("GET /news", "us", 1e6), ("find_page", "us", 1e6), ("scrape", "ms", 1e3)):
+        print(f"{name:>12} {off[name] * scale:>9.1f} {unit} {on[name] * scale:>9.1f} {unit} "
+              f"{(on[name] / off[name] - 1) * 100:>+8.1f}%")
+    print("\nScrape stage time summed over feeds (runs overlap): " +
+          ", ".join(f"{stage} {seconds * 1000:.0f}ms" for stage, seconds in sorted(stages.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Stress test: several uvicorn worker processes writing to one database
+
+Starts `uvicorn main:app --workers N` on a fresh database file, lets
+concurrent clients POST unique articles and GET /news for a while, then
+checks that every acknowledged article is stored exactly once and that
+every worker serves all of them. Runs with NEWS_MULTI_PROCESS=1 and,
+for comparison, without it (workers with private, stale copies).
+
+Run from the backend folder (workers, seconds and clients are optional):
+    python3 benchmarks/bench_multiworker.py 4 10 32
+"""
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import BACKEND_DIR
+
+BACKENDS = ["tinydb", "sqlite"]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def load(base_url, seconds, clients):
+    import httpx
+
+    acknowledged = []
+    reads = 0
+    errors = 0
+    deadline = time.perf_counter() + seconds
+
+    async def client_loop(http, client_no):
+        nonlocal reads, errors
+        n = 0
+        while time.perf_counter() < deadline:
+            n += 1
+            url = f"https://example.com/stress/{client_no}/{n}"
+            response = await http.post("/news", json={
+                "title": f"Stress article {client_no}-{n}", "content": "Body " * 20,
+                "source": "Stress", "url": url, "category": "general"})
+            if response.status_code == 200:
+                acknowledged.append((response.json()["id"], url))
+            else:
+                errors += 1
+            response = await http.get("/news", params={"limit": 20})
+            reads += response.status_code == 200
+            errors += response.status_code != 200
+
+    # A new connection per request spreads the requests over the workers
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=httpx.Limits(max_keepalive_connections=0)) as http:
+        await asyncio.gather(*(client_loop(http, i) for i in range(clients)))
+    return acknowledged, reads, errors
+
+
+def stale_reads(base_url, acknowledged, workers):
+    """How many GET /news answers (spread over the workers) miss acknowledged articles"""
+    import httpx
+
+    expected = {url for _, url in acknowledged}
+    stale = 0
+    for _ in range(workers * 4):
+        with httpx.Client(base_url=base_url, timeout=60) as http:
+            served = {a["url"] for a in http.get("/news", params={"fields": "url"}).json()}
+        stale += not expected <= served
+    return stale
+
+
+def lost_writes(env, backend, acknowledged):
+    """(acknowledged articles not in the file, ids handed out twice)"""
+    from storage import create_backend
+
+    store = create_backend(backend, path=env["NEWS_DB_PATH"], sqlite_path=env["NEWS_SQLITE_PATH"])
+    stored = {doc.get("url") for _, doc in store.load()}
+    store.close()
+    lost = sum(url not in stored for _, url in acknowledged)
+    duplicate_ids = len(acknowledged) - len({doc_id for doc_id, _ in acknowledged})
+    return lost, duplicate_ids
+
+
+def run(backend, multi_process, workers, seconds, clients):
+    import httpx
+
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        env = dict(os.environ, NEWS_DB_BACKEND=backend, AUTO_SCRAPE="0", RESPONSE_CACHE_TTL="0",
+                   NEWS_DB_PATH=os.path.join(tmp, "news.json"),
+                   NEWS_SQLITE_PATH=os.path.join(tmp, "news.sqlite3"),
+                   NEWS_SEARCH_PATH=os.path.join(tmp, "news.idx"),
+                   NEWS_CHANGES_PATH=os.path.join(tmp, "news.changes"),
+                   NEWS_JOBS_DIR=os.path.join(tmp, "jobs"),
+                   NEWS_MULTI_PROCESS="1" if multi_process else "0")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+             "--workers", str(workers), "--log-level", "error"],
+            env=env, cwd=BACKEND_DIR, stdout=subprocess.DEVNULL
+        )
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            for _ in range(300):
+                try:
+                    httpx.get(f"{base_url}/news", params={"limit": 1})
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+            time.sleep(1)   # let every worker finish starting
+            acknowledged, reads, errors = asyncio.run(load(base_url, seconds, clients))
+            stale = stale_reads(base_url, acknowledged, workers)
+        finally:
+            server.terminate()
+            server.wait()
+        lost, duplicate_ids = lost_writes(env, backend, acknowledged)
+    return len(acknowledged) / seconds, reads / seconds, errors, lost, duplicate_ids, stale
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    clients = int(sys.argv[3]) if len(sys.argv) > 3 else 32
+
+    print(f"{workers} uvicorn workers, {clients} clients for {seconds:.0f}s (POST + GET each), {os.cpu_count()} CPUs")
+    print(f"{'backend':>8} {'mode':>14} {'posts/s':>8} {'reads/s':>8} {'errors':>7} "
+          f"{'lost':>6} {'dup ids':>8} {'stale GETs':>11}")
+    for backend in BACKENDS:
+        for multi_process in (False, True):
+            posts, reads, errors, lost, duplicate_ids, stale = run(backend, multi_process, workers, seconds, clients)
+            mode = "multi-process" if multi_process else "unsynchronized"
+            print(f"{backend:>8} {mode:>14} {posts:>8.0f} {reads:>8.0f} {errors:>7} "
+                  f"{lost:>6} {duplicate_ids:>8} {stale:>6}/{workers * 4}")
+
+
+if __name__ == "__main__":
+    main()
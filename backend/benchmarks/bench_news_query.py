@@ -0,0 +1,47 @@
+"""
+Benchmark: GET /news storage path, full scan vs index-backed pages
+
+Run from the backend folder (sizes are optional):
+    python3 benchmarks/bench_news_query.py 10000 100000 1000000
+"""
+import sys
+
+from common import memory_collection, timed
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+REPEAT = 20
+
+
+def full_scan(collection):
+    # What GET /news used to do on every request
+    articles = list(collection.find())
+    for article in articles:
+        article['_id'] = str(article['_id'])
+    return articles
+
+
+def per_request(func):
+    _, seconds = timed(lambda: [func() for _ in range(REPEAT)])
+    return seconds / REPEAT * 1000
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    print(f"{'articles':>10} {'build':>9} {'full scan':>11} {'page':>9} {'category':>9} "
+          f"{'date+src':>9} {'projected':>10} {'deep page':>10}")
+    for size in sizes:
+        collection = memory_collection(size)
+        _, build = timed(collection._indexes)
+        scan = per_request(lambda: full_scan(collection)) if size <= 100_000 else timed(full_scan, collection)[1] * 1000
+        page = per_request(lambda: collection.find_page(limit=20))
+        by_category = per_request(lambda: collection.find_page(category="science", limit=20))
+        date_source = per_request(lambda: collection.find_page(
+            source="BBC News", published_from="2026-03-01", published_to="2026-03-02", limit=20))
+        projected = per_request(lambda: collection.find_page(limit=20, fields=["title", "source", "url"]))
+        deep = per_request(lambda: collection.find_page(before=size // 2, limit=20))
+        print(f"{size:>10} {build:>8.2f}s {scan:>9.1f}ms {page:>7.3f}ms {by_category:>7.3f}ms "
+              f"{date_source:>7.3f}ms {projected:>8.3f}ms {deep:>8.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark: feed parsing in the fetch threads vs the parser process pool
+
+Parses the same set of downloaded feed bodies inline and over 1, 2, 4, ...
+worker processes (up to the core count) and reports articles per second,
+then runs a full scrape of every feed against local stub servers.
+
+Run from the backend folder (feed count is optional):
+    python3 benchmarks/bench_parse.py 400
+"""
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+
+from common import StubFeedServer, make_rss, timed
+import scraper
+
+DEFAULT_FEEDS = 400
+ITEMS_PER_FEED = 40      # feedparser reads every item, the scraper keeps the first 10
+SERVERS = 8
+
+
+def parse_inline(bodies):
+    return [scraper.parse_feed(body, f"https://example.com/{i}", f"Feed{i}") for i, body in enumerate(bodies)]
+
+
+def parse_pooled(pool, bodies):
+    urls = [f"https://example.com/{i}" for i in range(len(bodies))]
+    names = [f"Feed{i}" for i in range(len(bodies))]
+    return list(pool.map(scraper.parse_feed, bodies, urls, names))
+
+
+def main():
+    feed_count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_FEEDS
+    cores = os.cpu_count() or 1
+    bodies = [make_rss(f"Feed{i}", ITEMS_PER_FEED) for i in range(feed_count)]
+    megabytes = sum(map(len, bodies)) / 1e6
+
+    print(f"{feed_count} feeds x {ITEMS_PER_FEED} items ({megabytes:.1f} MB), {cores} CPUs")
+    print(f"{'parser':>18} {'total':>8} {'articles/s':>11} {'speedup':>8}")
+    parsed, inline = timed(parse_inline, bodies)
+    articles = sum(map(len, parsed))
+    print(f"{'inline':>18} {inline:>7.2f}s {articles / inline:>11.0f} {1:>7.1f}x")
+
+    workers = 1
+    while workers <= max(cores, 4):
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parse_pooled(pool, bodies[:workers])   # start the workers outside the timing
+            _, seconds = timed(parse_pooled, pool, bodies)
+        print(f"{f'{workers} processes':>18} {seconds:>7.2f}s {articles / seconds:>11.0f} {inline / seconds:>7.1f}x")
+        workers *= 2
+
+    # Whole pipeline: downloads, parsing in the pool, batches back to the caller
+    scraper.USE_FEED_CACHE = False
+    with ExitStack() as stack:
+        servers = [stack.enter_context(StubFeedServer(bodies[i])) for i in range(SERVERS)]
+        sources = [(f"{servers[i % SERVERS].url}?feed={i}", f"Feed{i}", "general") for i in range(feed_count)]
+        for workers in sorted({1, cores}):
+            scraper.PARSE_WORKERS = workers
+            scraper.close_parse_pool()
+            if workers > 1:
+                scraper.get_parse_pool().submit(int).result()   # start the workers outside the timing
+            batches, seconds = timed(lambda: list(scraper.iter_scrape_batches(sources, scraper.new_scrape_report())))
+            count = sum(map(len, batches))
+            print(f"\nFull scrape, PARSE_WORKERS={workers}: {count} articles in {len(batches)} batches, "
+                  f"{seconds:.2f}s ({count / seconds:.0f} articles/s)")
+    scraper.close_parse_pool()
+    scraper.close_http_client()
+
+
+if __name__ == "__main__":
+    main()
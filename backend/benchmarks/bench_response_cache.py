@@ -0,0 +1,59 @@
+"""
+Benchmark: repeated GET /news polls with and without the response cache
+
+Polls the same URLs the frontend and API clients use and reports the
+average latency when every poll rebuilds the response, when it is served
+from the cache, and when the client revalidates with If-None-Match (304).
+
+Run from the backend folder (size and polls are optional):
+    python3 benchmarks/bench_response_cache.py 20000 50
+"""
+import sys
+
+from fastapi.testclient import TestClient
+
+from common import memory_collection, timed
+
+DEFAULT_SIZE = 20_000
+DEFAULT_POLLS = 50
+URLS = ["/news", "/news?limit=20", "/news?category=technology&limit=100"]
+
+
+def poll(client, url, polls, etag=False):
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = client.get(url).headers["etag"]
+    for _ in range(polls):
+        client.get(url, headers=headers)
+
+
+def main():
+    import database
+    import main
+    from response_cache import response_cache
+
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE
+    polls = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_POLLS
+    database.news_collection = memory_collection(size)
+    database.news_collection._indexes()
+    # No `with`: the lifespan would connect to the configured database instead
+    client = TestClient(main.app)
+
+    print(f"{polls} polls per URL over {size} articles")
+    print(f"{'URL':>38} {'uncached':>10} {'cached':>10} {'304':>10} {'speedup':>8}")
+    for url in URLS:
+        # A TTL of 0 turns the cache off
+        ttl = response_cache.ttl
+        response_cache.ttl = 0
+        _, uncached = timed(poll, client, url, polls)
+        response_cache.ttl = ttl
+        client.get(url)
+        _, cached = timed(poll, client, url, polls)
+        _, revalidated = timed(poll, client, url, polls, True)
+        print(f"{url:>38} {uncached / polls * 1000:>8.2f}ms {cached / polls * 1000:>8.2f}ms "
+              f"{revalidated / polls * 1000:>8.2f}ms {uncached / cached:>7.1f}x")
+    print(f"\nCache: {response_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
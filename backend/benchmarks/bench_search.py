@@ -0,0 +1,84 @@
+"""
+Benchmark: full-text search index (build, save/load, query latency)
+
+Articles are drawn from a Zipf-distributed vocabulary so that there are
+rare, mid-frequency and very common terms, like real news text.
+
+Run from the backend folder (sizes are optional):
+    python3 benchmarks/bench_search.py 100000 500000
+"""
+import itertools
+import os
+import random
+import sys
+import tempfile
+
+from common import timed
+from search import SearchIndex
+
+DEFAULT_SIZES = [100_000, 500_000]
+VOCABULARY = 50_000
+WORDS_PER_ARTICLE = 80
+REPEAT = 20
+
+# Query terms by frequency rank (0 = most common word)
+QUERIES = {
+    "rare term": (20_000,),
+    "mid term": (300,),
+    "common term": (3,),
+    "two mid terms": (100, 300),
+    "rare + common": (5, 5_000),
+    "two common terms": (3, 10),
+    "four common terms": (3, 4, 5, 6),
+}
+
+
+def make_vocabulary():
+    # Prefix-friendly words: w<rank in hex><letter>
+    return [f"w{rank:x}{'abcdefghij'[rank % 10]}" for rank in range(VOCABULARY)]
+
+
+def make_corpus(count, vocabulary):
+    rng = random.Random(42)
+    cumulative = list(itertools.accumulate(1 / (rank + 1) for rank in range(VOCABULARY)))
+    for doc_id in range(1, count + 1):
+        words = rng.choices(vocabulary, cum_weights=cumulative, k=WORDS_PER_ARTICLE)
+        yield doc_id, {"title": " ".join(words[:8]), "content": " ".join(words[8:])}
+
+
+def per_query(index, query, **kwargs):
+    index.search(query, **kwargs)   # first run builds the heads of common terms
+    _, seconds = timed(lambda: [index.search(query, **kwargs) for _ in range(REPEAT)])
+    return seconds / REPEAT * 1000
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    vocabulary = make_vocabulary()
+    for size in sizes:
+        index = SearchIndex()
+        corpus = list(make_corpus(size, vocabulary))
+        _, build = timed(lambda: [index.add(doc_id, doc) for doc_id, doc in corpus])
+
+        path = os.path.join(tempfile.mkdtemp(), "bench_search.idx")
+        _, save = timed(index.save, path)
+        _, load = timed(SearchIndex.load, path)
+        megabytes = os.path.getsize(path) / 1e6
+        os.remove(path)
+
+        print(f"\n{size} articles: build {build:.1f}s, save {save:.2f}s, load {load:.2f}s, "
+              f"file {megabytes:.1f} MB, {len(index.postings)} terms")
+        print(f"{'query':>20} {'df':>8} {'top 10':>9} {'exact':>9} {'same':>5}")
+        for name, ranks in QUERIES.items():
+            query = " ".join(vocabulary[rank] for rank in ranks)
+            df = max(len(index.postings.get(vocabulary[rank], ((),))[0]) for rank in ranks)
+            fast = per_query(index, query, limit=10)
+            exact = per_query(index, query, limit=10, exact=True)
+            same = index.search(query, limit=10) == index.search(query, limit=10, exact=True)
+            print(f"{name:>20} {df:>8} {fast:>7.2f}ms {exact:>7.2f}ms {'yes' if same else 'no':>5}")
+        prefix = per_query(index, vocabulary[300][:3], limit=10, prefix=True)
+        print(f"{'prefix (' + vocabulary[300][:3] + ')':>20} {'':>8} {prefix:>7.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
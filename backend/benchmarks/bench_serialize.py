@@ -0,0 +1,67 @@
+"""
+Benchmark: large GET /news list responses, encoded per request vs joined from stored JSON
+
+The per-request path is how the response used to be built: find_page
+dicts through jsonable_encoder and json.dumps. The pre-serialized path
+is find_page_json, which joins the JSON bytes each article keeps. Both
+are timed on their own and end to end through the app (response cache
+off, so every request builds its body); the bodies are byte-identical.
+
+Run from the backend folder (size and requests are optional):
+    python3 benchmarks/bench_serialize.py 50000 20
+"""
+import json
+import sys
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+
+from common import memory_collection, timed
+
+DEFAULT_SIZE = 50_000
+DEFAULT_REQUESTS = 20
+LIMITS = [20, 100, 1000, None]   # None: every article (limit is at most 1000)
+
+
+def encoded_per_request(collection):
+    """find_page_json as it was before: encode the page's dicts on every call"""
+    def find_page_json(**filters):
+        articles, next_cursor = collection.find_page(**filters)
+        body = json.dumps(jsonable_encoder(articles), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return body, next_cursor
+    return find_page_json
+
+
+def main():
+    import database
+    import main
+    from response_cache import response_cache
+
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_REQUESTS
+    collection = database.news_collection = memory_collection(size)
+    collection._indexes()
+    response_cache.ttl = 0
+    # No `with`: the lifespan would connect to the configured database instead
+    client = TestClient(main.app)
+    paths = {"per request": encoded_per_request(collection), "pre-serialized": collection.find_page_json}
+
+    print(f"{size} articles, {requests} requests per row")
+    print(f"{'limit':>7} {'path':>15} {'encode':>10} {'GET /news':>10} {'responses/s':>12} {'MB/s':>7}")
+    for limit in LIMITS:
+        bodies = {name: find_page_json(limit=limit)[0] for name, find_page_json in paths.items()}
+        assert bodies["per request"] == bodies["pre-serialized"]
+        megabytes = len(bodies["pre-serialized"]) / 1e6
+        url = "/news" if limit is None else f"/news?limit={limit}"
+        for name, find_page_json in paths.items():
+            _, encode = timed(lambda: [find_page_json(limit=limit) for _ in range(requests)])
+            collection.find_page_json = find_page_json
+            client.get(url)   # warm up
+            _, served = timed(lambda: [client.get(url) for _ in range(requests)])
+            del collection.find_page_json
+            print(f"{limit or 'all':>7} {name:>15} {encode / requests * 1000:>8.1f}ms "
+                  f"{served / requests * 1000:>8.1f}ms {requests / served:>12.1f} {megabytes * requests / served:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
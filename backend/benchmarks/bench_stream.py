@@ -0,0 +1,88 @@
+"""
+Benchmark: GET /news as one JSON list vs ?stream=ndjson
+
+Each mode runs in its own process (uvicorn on a local port, the client
+streaming and discarding the body) so peak RSS can be compared. Reports
+time to first byte, total time and how much the peak RSS grew over the
+seeded collection.
+
+Run from the backend folder (size is optional):
+    python3 benchmarks/bench_stream.py 1000000
+"""
+import json
+import resource
+import subprocess
+import sys
+import threading
+import time
+
+from common import memory_collection
+
+DEFAULT_SIZE = 1_000_000
+MODES = {
+    "json list": {},
+    "ndjson stream": {"stream": "ndjson"},
+}
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_mode(mode, size):
+    """Serve the API over a seeded collection and time one full GET /news"""
+    import httpx
+    import uvicorn
+    import database
+    import main
+
+    database.news_collection = memory_collection(size)
+    database.news_collection._indexes()
+    seeded = peak_rss_mb()
+
+    # The lifespan would connect to the configured database instead
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=0, lifespan="off", log_level="error"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    port = server.servers[0].sockets[0].getsockname()[1]
+
+    received = 0
+    first_byte = None
+    start = time.perf_counter()
+    with httpx.Client(timeout=None) as client:
+        with client.stream("GET", f"http://127.0.0.1:{port}/news", params=MODES[mode]) as response:
+            for chunk in response.iter_raw():
+                if first_byte is None:
+                    first_byte = time.perf_counter() - start
+                received += len(chunk)
+    total = time.perf_counter() - start
+    server.should_exit = True
+    thread.join()
+
+    print(json.dumps({"ttfb": first_byte, "total": total, "mb": received / 1e6,
+                      "rss_growth": peak_rss_mb() - seeded}))
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--mode":
+        run_mode(sys.argv[2], int(sys.argv[3]))
+        return
+
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE
+    print(f"GET /news over {size} articles")
+    print(f"{'mode':>14} {'TTFB':>9} {'total':>8} {'body':>9} {'peak RSS growth':>16}")
+    for mode in MODES:
+        output = subprocess.run(
+            [sys.executable, __file__, "--mode", mode, str(size)],
+            capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{mode:>14} {result['ttfb'] * 1000:>7.0f}ms {result['total']:>7.1f}s "
+              f"{result['mb']:>7.0f}MB {result['rss_growth']:>14.0f}MB")
+
+
+if __name__ == "__main__":
+    main()
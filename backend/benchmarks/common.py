@@ -0,0 +1,160 @@
+"""
+Shared helpers for the benchmark scripts (stub feed servers, timing)
+"""
+import hashlib
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Let benchmark scripts import the backend modules (scraper, database, ...)
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def make_rss(title: str, count: int = 10) -> bytes:
+    """
+    Build a small RSS document with count items
+    """
+    items = []
+    for i in range(count):
+        items.append(
+            f"<item><title>{title} story {i}</title>"
+            f"<link>https://example.com/{title.lower()}/{i}</link>"
+            f"<description>&lt;p&gt;Summary of {title} story {i}.&lt;/p&gt;</description>"
+            f"<pubDate>Tue, 10 Feb 2026 12:{i:02d}:00 GMT</pubDate></item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        f'<rss version="2.0"><channel><title>{title}</title>'
+        + "".join(items)
+        + "</channel></rss>"
+    ).encode("utf-8")
+
+
+class StubFeedServer:
+    """
+    Local HTTP server that serves one feed body after a fixed delay
+
+    With etag=True it sends an ETag and answers If-None-Match with 304.
+    """
+    def __init__(self, body: bytes, delay: float = 0.0, etag: bool = False):
+        self.body = body
+        self.delay = delay
+        self.etag = etag
+        self.hits = 0
+        self.bytes_sent = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.hits += 1
+                time.sleep(server.delay)
+                tag = '"%s"' % hashlib.md5(server.body).hexdigest()
+                if server.etag and self.headers.get("If-None-Match") == tag:
+                    self.send_response(304)
+                    self.send_header("ETag", tag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/rss+xml")
+                self.send_header("Content-Length", str(len(server.body)))
+                if server.etag:
+                    self.send_header("ETag", tag)
+                self.end_headers()
+                self.wfile.write(server.body)
+                server.bytes_sent += len(server.body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}/feed.xml"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+SOURCES = ["TechCrunch", "The Verge", "CNN", "BBC News", "Bloomberg"]
+CATEGORIES = ["technology", "general", "business", "science", "health"]
+
+
+def make_articles(count: int, start: int = 0):
+    """
+    Generate synthetic articles shaped like the scraper output
+    """
+    for i in range(start, start + count):
+        source = SOURCES[i % len(SOURCES)]
+        yield {
+            "title": f"Synthetic headline number {i} from {source}",
+            "content": f"Body of synthetic article {i}. " * 12,
+            "source": source,
+            "url": f"https://example.com/{source.replace(' ', '').lower()}/{i}",
+            "published_date": f"2026-{1 + (i // 86400) % 12:02d}-{1 + (i // 3600) % 28:02d}T{(i // 60) % 24:02d}:{i % 60:02d}:00",
+            "category": CATEGORIES[(i // 7) % len(CATEGORIES)],
+            "image_url": None,
+        }
+
+
+def memory_collection(count: int):
+    """
+    CollectionWrapper over an in-memory TinyDB seeded with count articles
+    """
+    from tinydb.storages import MemoryStorage
+    from storage import TinyDBBackend
+    import database
+
+    backend = TinyDBBackend(storage=MemoryStorage)
+    backend.insert(make_articles(count))
+    return database.CollectionWrapper(backend)
+
+
+def timed(func, *args, **kwargs):
+    """
+    Run func and return (result, seconds)
+    """
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+# Words for make_corpus, most frequent first (rank drives a Zipf distribution)
+NEWS_WORDS = (
+    "the of and to in a for on with said new year market government company people after over "
+    "report data police million first technology business election court health bank prices rates "
+    "city world minister energy climate trade growth shares investors vaccine hospital research "
+    "scientists study launch startup funding software chips ai model security privacy regulators "
+    "football season storm flights airline oil inflation jobs housing schools students budget tax "
+    "war talks deal merger profits sales retail smartphone electric cars battery space satellite "
+    "ocean heatwave grid water drought wildfire earthquake festival film music award museum"
+).split()
+
+
+def make_corpus(count: int, start: int = 0, seed: int = 42):
+    """
+    Synthetic articles like make_articles, but with varied Zipf-distributed
+    text (same seed, same corpus) so search and chat have something to rank
+    """
+    import itertools
+    import random
+
+    rng = random.Random(seed)
+    vocabulary = NEWS_WORDS + [f"term{rank}" for rank in range(5000)]
+    cumulative = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    for article in make_articles(count, start):
+        words = rng.choices(vocabulary, cum_weights=cumulative, k=60)
+        article["title"] = " ".join(words[:8]).capitalize()
+        article["content"] = " ".join(words[8:]) + "."
+        yield article
@@ -0,0 +1,382 @@
+"""
+Benchmark suite: API, storage, scraper and chatbot hot paths, results as JSON
+
+Seeds a synthetic corpus (same size and seed, same articles) and measures:
+- api:     GET /news, GET /search, POST /news, DELETE /news/{id} and POST /chat
+           through the ASGI app in-process (no server, no network)
+- storage: CollectionWrapper operations on each file backend, in a temp folder
+- scraper: clean_html, parse_feed and scrape_rss_feed over the feeds in
+           fixtures/feeds, served by local stub servers, plus a full scrape
+- chat:    chat_with_ai for each kind of question
+
+Every case reports time per operation (p50/p95/mean) and operations per
+second. Results are written as JSON; --compare prints the change against an
+earlier run and exits with 1 if a case got slower than --threshold.
+
+Run from the backend folder:
+    python3 benchmarks/suite.py                              # everything, 10k articles
+    python3 benchmarks/suite.py --size 50000 --only api,chat --out run.json
+    python3 benchmarks/suite.py --compare baseline.json      # regression check
+"""
+import argparse
+import asyncio
+import atexit
+import glob
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from common import BACKEND_DIR, StubFeedServer, make_corpus
+
+# Keep the backend modules away from the real database files
+_TMP = tempfile.mkdtemp(prefix="news-suite-")
+atexit.register(shutil.rmtree, _TMP, ignore_errors=True)
+os.environ.update(
+    NEWS_DB_PATH=os.path.join(_TMP, "news.json"), NEWS_SQLITE_PATH=os.path.join(_TMP, "news.sqlite3"),
+    NEWS_LOG_PATH=os.path.join(_TMP, "news.log"), NEWS_SEARCH_PATH=os.path.join(_TMP, "news.idx"),
+    NEWS_CHANGES_PATH=os.path.join(_TMP, "news.changes"), NEWS_JOBS_DIR=os.path.join(_TMP, "jobs"),
+    AUTO_SCRAPE="0",
+)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+AREAS = ["api", "storage", "scraper", "chat"]
+BACKENDS = ["tinydb", "sqlite", "log"]
+
+CHAT_QUESTIONS = {
+    "latest": "What are the latest technology news?",
+    "topic": "Tell me about the election and the market",
+    "summary": "Summarize the top stories",
+    "count": "How many articles do you have?",
+    "sources": "What are your news sources?",
+}
+
+
+def percentile(samples, share):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+class Suite:
+    """Runs cases and keeps their results by name (area/case)"""
+    def __init__(self, scale: float):
+        self.scale = scale
+        self.results = {}
+
+    def iterations(self, n: int) -> int:
+        return max(1, int(n * self.scale))
+
+    def _record(self, name, samples, ops_per_sample=1, errors=0):
+        per_op = [s / ops_per_sample for s in samples]
+        result = {
+            "iterations": len(samples),
+            "ops": len(samples) * ops_per_sample,
+            "p50_us": round(percentile(per_op, 0.5) * 1e6, 2),
+            "p95_us": round(percentile(per_op, 0.95) * 1e6, 2),
+            "mean_us": round(sum(per_op) / len(per_op) * 1e6, 2),
+            "ops_per_s": round(len(samples) * ops_per_sample / sum(samples), 1) if sum(samples) else None,
+            "errors": errors,
+        }
+        self.results[name] = result
+        flag = f"  ({errors} errors)" if errors else ""
+        print(f"  {name:<44} p50 {result['p50_us']:>11.1f}us  p95 {result['p95_us']:>11.1f}us  "
+              f"{result['ops_per_s'] or 0:>10.0f}/s{flag}")
+
+    def measure(self, name, func, iterations, ops_per_call=1, warmup=1):
+        """Time func() per call; a falsy-but-not-None return counts as an error"""
+        for _ in range(warmup):
+            func()
+        samples, errors = [], 0
+        for _ in range(iterations):
+            start = time.perf_counter()
+            ok = func()
+            samples.append(time.perf_counter() - start)
+            errors += ok is not None and not ok
+        self._record(name, samples, ops_per_call, errors)
+
+    async def ameasure(self, name, make_call, iterations, ops_per_call=1, warmup=1):
+        """measure() for coroutines: make_call() returns the awaitable to time"""
+        for _ in range(warmup):
+            await make_call()
+        samples, errors = [], 0
+        for _ in range(iterations):
+            start = time.perf_counter()
+            ok = await make_call()
+            samples.append(time.perf_counter() - start)
+            errors += ok is not None and not ok
+        self._record(name, samples, ops_per_call, errors)
+
+
+def seeded_collection(size):
+    """In-memory collection with the synthetic corpus, installed as the app's collection"""
+    from tinydb.storages import MemoryStorage
+    from storage import TinyDBBackend
+    import database
+
+    backend = TinyDBBackend(storage=MemoryStorage)
+    backend.insert(make_corpus(size))
+    database.news_collection = database.CollectionWrapper(backend)
+    database.news_collection._indexes()
+    return database.news_collection
+
+
+# ---------- api ----------
+
+async def api_cases(suite, size):
+    import httpx
+    import main
+    from response_cache import response_cache
+
+    collection = seeded_collection(size)
+    ttl = response_cache.ttl
+    response_cache.ttl = 0        # every GET does the work, except the cached case
+    ids = sorted(int(doc_id) for doc_id in collection._indexes().docs)
+    middle = ids[len(ids) // 2]
+    posted = 0
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://suite") as http:
+        async def get(path, **params):
+            response = await http.get(path, params=params)
+            return response.status_code == 200
+
+        async def post_news():
+            nonlocal posted
+            posted += 1
+            response = await http.post("/news", json={
+                "title": f"Suite article {posted}", "content": "Body of the suite article. " * 10,
+                "source": "Suite", "url": f"https://example.com/suite/{posted}", "category": "general"})
+            return response.status_code == 200
+
+        async def post_many(count):
+            return all(await asyncio.gather(*(post_news() for _ in range(count))))
+
+        to_delete = iter(ids[-suite.iterations(200) - 1:])
+
+        async def delete_one():
+            response = await http.delete(f"/news/{next(to_delete)}")
+            return response.status_code == 200
+
+        async def chat(message):
+            response = await http.post("/chat", json={"user_message": message})
+            return response.status_code == 200
+
+        await suite.ameasure("api/GET /news?limit=20", lambda: get("/news", limit=20), suite.iterations(500))
+        await suite.ameasure("api/GET /news?category&limit=50",
+                             lambda: get("/news", category="technology", limit=50), suite.iterations(500))
+        await suite.ameasure("api/GET /news?before&limit=20",
+                             lambda: get("/news", before=str(middle), limit=20), suite.iterations(500))
+        await suite.ameasure("api/GET /news (all)", lambda: get("/news"), suite.iterations(10))
+        response_cache.ttl = ttl
+        await suite.ameasure("api/GET /news (all, cached)", lambda: get("/news"), suite.iterations(500))
+        response_cache.ttl = 0
+        await suite.ameasure("api/GET /search", lambda: get("/search", q="election market"), suite.iterations(300))
+        await suite.ameasure("api/POST /news", post_news, suite.iterations(200))
+        await suite.ameasure("api/POST /news x100 concurrent", lambda: post_many(100),
+                             suite.iterations(10), ops_per_call=100)
+        await suite.ameasure("api/DELETE /news/{id}", delete_one, suite.iterations(200))
+        await suite.ameasure("api/POST /chat", lambda: chat(CHAT_QUESTIONS["topic"]), suite.iterations(200))
+
+    response_cache.ttl = ttl
+    collection.commits.close()
+
+
+# ---------- storage ----------
+
+def storage_cases(suite, size, backends):
+    from storage import create_backend
+    import database
+
+    for name in backends:
+        folder = tempfile.mkdtemp(dir=_TMP)
+
+        def open_backend():
+            return create_backend(name, path=os.path.join(folder, "news.json"),
+                                  sqlite_path=os.path.join(folder, "news.sqlite3"),
+                                  log_path=os.path.join(folder, "news.log"),
+                                  fsync=database.DB_SYNC != "async")
+
+        backend = open_backend()
+        corpus = list(make_corpus(size))
+        start = time.perf_counter()
+        backend.insert(corpus)
+        suite._record(f"storage/{name}/bulk insert", [time.perf_counter() - start], ops_per_sample=size)
+        backend.close()
+
+        # Cold start: open the file and build the in-memory indexes
+        def cold_open():
+            store = open_backend()
+            database.CollectionWrapper(store)._indexes()
+            store.close()
+        suite.measure(f"storage/{name}/open + build indexes", cold_open, suite.iterations(3), warmup=0)
+
+        collection = database.CollectionWrapper(open_backend())
+        collection._indexes()
+        ids = sorted(collection._indexes().docs)
+        next_article = iter(make_corpus(10 ** 7, start=size, seed=7))
+        to_delete = iter(ids)
+        rescrapes = 0
+
+        def rescrape():
+            """A scrape batch: 100 stored articles with new text and 100 new ones"""
+            nonlocal rescrapes
+            rescrapes += 1
+            updated = [dict(doc, content=f"{doc['content']} Update {rescrapes}.") for doc in corpus[:100]]
+            return collection.upsert_many(updated + [next(next_article) for _ in range(100)])
+
+        suite.measure(f"storage/{name}/find_page", lambda: collection.find_page(limit=20), suite.iterations(2000))
+        suite.measure(f"storage/{name}/find_page category",
+                      lambda: collection.find_page(category="technology", limit=50), suite.iterations(2000))
+        suite.measure(f"storage/{name}/find_one url",
+                      lambda: collection.find_one({"url": corpus[size // 2]["url"]}), suite.iterations(2000))
+        suite.measure(f"storage/{name}/search",
+                      lambda: collection.search("election market", limit=10), suite.iterations(300))
+        suite.measure(f"storage/{name}/count_documents", lambda: collection.count_documents({}), suite.iterations(500))
+        suite.measure(f"storage/{name}/insert_one",
+                      lambda: collection.insert_one(next(next_article)), suite.iterations(50 if name == "tinydb" else 500))
+        suite.measure(f"storage/{name}/upsert_many 200",
+                      rescrape, suite.iterations(20), ops_per_call=200)
+        suite.measure(f"storage/{name}/delete_one",
+                      lambda: collection.delete_one({"_id": next(to_delete)}).deleted_count == 1,
+                      suite.iterations(50 if name == "tinydb" else 500))
+        collection.commits.close()
+        collection.backend.close()
+
+
+# ---------- scraper ----------
+
+def scraper_cases(suite):
+    import scraper
+    from cleaner import clean_html
+
+    with open(os.path.join(FIXTURES, "feed_summaries.json"), encoding="utf-8") as f:
+        summaries = json.load(f)
+    suite.measure("scraper/clean_html", lambda: [clean_html(text) for text in summaries],
+                  suite.iterations(200), ops_per_call=len(summaries))
+
+    feeds = {os.path.splitext(os.path.basename(path))[0]: open(path, "rb").read()
+             for path in sorted(glob.glob(os.path.join(FIXTURES, "feeds", "*.xml")))}
+    for feed_name, body in feeds.items():
+        suite.measure(f"scraper/parse_feed {feed_name}",
+                      lambda: bool(scraper.parse_feed(body, "https://example.com/feed", feed_name)),
+                      suite.iterations(50))
+
+    scraper.USE_FEED_CACHE = False     # every fetch downloads the body
+    servers = [StubFeedServer(body) for body in feeds.values()]
+    for server in servers:
+        server.__enter__()
+    try:
+        for feed_name, server in zip(feeds, servers):
+            suite.measure(f"scraper/scrape_rss_feed {feed_name}",
+                          lambda: bool(scraper.scrape_rss_feed(server.url, feed_name)), suite.iterations(30))
+        # Full pipeline over many sources: downloads, parser pool, batches back
+        sources = [(f"{servers[i % len(servers)].url}?feed={i}", f"Feed{i}", "general") for i in range(100)]
+        suite.measure("scraper/iter_scrape_batches 100 feeds",
+                      lambda: bool(sum(map(len, scraper.iter_scrape_batches(sources)))),
+                      suite.iterations(3), ops_per_call=len(sources))
+    finally:
+        for server in servers:
+            server.__exit__()
+        scraper.close_parse_pool()
+        scraper.close_http_client()
+
+
+# ---------- chat ----------
+
+def chat_cases(suite, size):
+    from chatbot import chat_with_ai
+
+    seeded_collection(size)
+    for kind, question in CHAT_QUESTIONS.items():
+        suite.measure(f"chat/{kind}", lambda: bool(chat_with_ai(question)), suite.iterations(200))
+
+
+# ---------- results ----------
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path, threshold):
+    """Print the change per case against a baseline run; returns the regressed case names"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nAgainst {baseline_path} (commit {baseline['meta'].get('commit')}, mean time per op):")
+    regressions = []
+    for name, result in results.items():
+        before = baseline["results"].get(name)
+        if not before or not before["mean_us"]:
+            print(f"  {name:<44} new")
+            continue
+        change = result["mean_us"] / before["mean_us"] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  SLOWER"
+            regressions.append(name)
+        elif change < -threshold:
+            flag = "  faster"
+        print(f"  {name:<44} {before['mean_us']:>11.1f}us -> {result['mean_us']:>11.1f}us {change:>+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=10_000, help="articles in the synthetic corpus")
+    parser.add_argument("--only", default=",".join(AREAS), help=f"comma-separated areas ({','.join(AREAS)})")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="storage backends to measure")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply iteration counts (0.1 for a quick run)")
+    parser.add_argument("--out", help="result file (default benchmarks/results/suite-<time>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="slowdown counted as a regression")
+    args = parser.parse_args()
+
+    areas = args.only.split(",")
+    suite = Suite(args.scale)
+    print(f"Benchmark suite: {args.size} articles, areas {', '.join(areas)}, {os.cpu_count()} CPUs")
+    if "api" in areas:
+        asyncio.run(api_cases(suite, args.size))
+    if "storage" in areas:
+        storage_cases(suite, args.size, args.backends.split(","))
+    if "scraper" in areas:
+        scraper_cases(suite)
+    if "chat" in areas:
+        chat_cases(suite, args.size)
+
+    finished = datetime.now(timezone.utc)
+    report = {
+        "meta": {
+            "time": finished.isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "size": args.size,
+            "scale": args.scale,
+            "areas": areas,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "results": suite.results,
+    }
+    out = args.out
+    if out is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, f"suite-{finished:%Y%m%d-%H%M%S}.json")
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {out}")
+
+    if args.compare and compare(suite.results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,21 @@ import random
 # Load environment variables
 load_dotenv()
 
-def get_recent_news_context(limit=5):
+# Words that steer the reply but say nothing about the topic, left out of retrieval
+QUESTION_WORDS = {
+    "latest", "recent", "today", "current", "news", "article", "articles", "story", "stories",
+    "tell", "me", "show", "give", "find", "any", "some", "about", "summarize", "summary",
+    "brief", "overview", "top", "please", "how", "many", "much", "do", "does", "know",
+    "technology", "tech", "ai", "computer", "business", "science", "health", "general",
+}
+
+# Question words that ask for a category, and the category they mean
+CATEGORY_WORDS = {
+    "technology": "technology", "tech": "technology", "ai": "technology", "computer": "technology",
+    "business": "business", "science": "science", "health": "health",
+}
+
+def get_recent_news_context(limit=5, category=None):
     """
     Get recent news articles to provide context to the chatbot
     """
@@ -15,32 +29,82 @@ def get_recent_news_context(limit=5):
         if collection is None:
             return []
         
-        # Get latest articles
-        articles = list(collection.find().sort("_id", -1).limit(limit))
+        # Latest stories straight from the index, each once however many sources ran it
+        articles, _ = collection.find_page(category=category, limit=limit, collapse=True)
         return articles
     except Exception as e:
         print(f"Error getting news: {e}")
         return []
 
+def topic_of(user_message: str) -> str:
+    """
+    The part of a question that names a topic ("latest news about the ECB" -> "ecb")
+    """
+    words = "".join(c if c.isalnum() else " " for c in user_message.lower()).split()
+    return " ".join(w for w in words if w not in QUESTION_WORDS)
+
+def mentions(message_lower: str, keywords) -> bool:
+    """
+    True if the message has one of the keywords as a whole word or phrase
+    ("summar*" matches any word starting with "summar")
+    """
+    words = "".join(c if c.isalnum() else " " for c in message_lower).split()
+    for keyword in keywords:
+        if " " in keyword:
+            if keyword in message_lower:
+                return True
+        elif keyword.endswith("*"):
+            if any(w.startswith(keyword[:-1]) for w in words):
+                return True
+        elif keyword in words:
+            return True
+    return False
+
+def search_news_context(user_message: str, limit=5, category=None):
+    """
+    Articles from the whole database that best match the question (BM25), best first
+    """
+    topic = topic_of(user_message)
+    if not topic:
+        return []
+    try:
+        collection = get_news_collection()
+        if collection is None:
+            return []
+        return collection.search(topic, limit=limit, category=category, collapse=True)
+    except Exception as e:
+        print(f"Error searching news: {e}")
+        return []
+
 def chat_with_ai(user_message: str) -> str:
     """
     Mock chatbot that responds intelligently based on news in database
     (No OpenAI API needed - perfect for demo!)
     """
     try:
-        # Get news articles
-        articles = get_recent_news_context(limit=10)
+        collection = get_news_collection()
+        total = collection.estimated_document_count() if collection is not None else 0
         
-        if not articles:
+        if not total:
             return "I don't have any news articles in the database yet. Please scrape some news first using the /scrape endpoint!"
         
         # Convert message to lowercase for matching
         message_lower = user_message.lower()
+        words = set("".join(c if c.isalnum() else " " for c in message_lower).split())
+        category = next((CATEGORY_WORDS[w] for w in words if w in CATEGORY_WORDS), None)
+        
+        # Articles about the topic of the question, ranked over the whole database
+        matches = search_news_context(user_message, limit=5, category=category)
         
         # Response logic based on user question
         
         # 1. If asking about "latest" or "recent" news
-        if any(word in message_lower for word in ["latest", "recent", "new", "today", "current"]):
+        if mentions(message_lower, ["latest", "recent*", "new", "today", "current*"]):
+            if matches:
+                # Newest of the relevant articles first
+                articles = sorted(matches, key=lambda a: int(a["_id"]), reverse=True)
+            else:
+                articles = get_recent_news_context(limit=5, category=category)
             response = "Here are the latest news articles:\n\n"
             for i, article in enumerate(articles[:5], 1):
                 response += f"{i}. **{article.get('title', 'N/A')}**\n"
@@ -49,43 +113,42 @@ def chat_with_ai(user_message: str) -> str:
             return response
         
         # 2. If asking about specific category
-        elif any(word in message_lower for word in ["technology", "tech", "ai", "computer"]):
-            tech_articles = [a for a in articles if a.get('category') == 'technology']
-            if tech_articles:
-                response = "Here are the technology news:\n\n"
-                for i, article in enumerate(tech_articles[:3], 1):
+        elif category is not None and not mentions(message_lower, ["summar*", "brief*", "overview"]):
+            articles = matches or get_recent_news_context(limit=3, category=category)
+            if articles:
+                response = f"Here are the {category} news:\n\n"
+                for i, article in enumerate(articles[:3], 1):
                     response += f"{i}. **{article.get('title', 'N/A')}**\n"
                     response += f"   {article.get('content', 'N/A')[:150]}...\n\n"
                 return response
             else:
-                return "I don't have any technology news yet. Try scraping tech news first!"
+                return f"I don't have any {category} news yet. Try scraping {category} news first!"
         
         # 3. If asking for summary
-        elif any(word in message_lower for word in ["summar", "brief", "overview", "top"]):
+        elif mentions(message_lower, ["summar*", "brief*", "overview", "top"]):
+            articles = matches or get_recent_news_context(limit=3, category=category)
             response = "📰 **News Summary**\n\n"
             for i, article in enumerate(articles[:3], 1):
                 response += f"{i}. **{article.get('title', 'N/A')}** ({article.get('source', 'N/A')})\n"
                 response += f"   {article.get('content', 'N/A')[:100]}...\n\n"
-            response += f"\nI have {len(articles)} articles to show you. Would you like to know more about any specific topic?"
+            response += f"\nI have {total} articles to show you. Would you like to know more about any specific topic?"
             return response
         
         # 4. If asking about count
-        elif any(word in message_lower for word in ["how many", "count", "number"]):
-            collection = get_news_collection()
-            total = collection.count_documents({})
+        elif mentions(message_lower, ["how many", "count", "number*"]):
             return f"📊 I currently have {total} news articles in the database. They cover topics like technology, business, and general news. What would you like to know about them?"
         
         # 5. If asking about sources
-        elif any(word in message_lower for word in ["source", "from where", "which website"]):
-            sources = list(set([a.get('source', 'Unknown') for a in articles]))
+        elif mentions(message_lower, ["source*", "from where", "which website"]):
+            sources = sorted(collection.distinct('source'))
             return f"📰 My news comes from these sources: {', '.join(sources)}. I can provide more details about any of these sources!"
         
         # 6. Generic greeting
-        elif any(word in message_lower for word in ["hello", "hi", "hey", "greetings"]):
-            return f"👋 Hello! I'm your AI news assistant. I have {len(articles)} news articles ready for you. You can ask me about:\n- Latest news\n- Technology news\n- News summaries\n- Specific topics\n\nWhat would you like to know?"
+        elif mentions(message_lower, ["hello", "hi", "hey", "greetings"]):
+            return f"👋 Hello! I'm your AI news assistant. I have {total} news articles ready for you. You can ask me about:\n- Latest news\n- Technology news\n- News summaries\n- Specific topics\n\nWhat would you like to know?"
         
         # 7. Help request
-        elif any(word in message_lower for word in ["help", "what can you do", "commands"]):
+        elif mentions(message_lower, ["help", "what can you do", "commands"]):
             return """🤖 **I can help you with:**
 
 1. **Latest News**: Ask "What are the latest news?"
@@ -98,7 +161,11 @@ Just ask me anything about the news!"""
         
         # 8. Default - show relevant articles
         else:
-            response = "I found some relevant news for you:\n\n"
+            articles = matches or get_recent_news_context(limit=3)
+            if matches:
+                response = "I found some relevant news for you:\n\n"
+            else:
+                response = f"I couldn't find articles about \"{topic_of(user_message) or user_message}\", here is the latest news:\n\n"
             for i, article in enumerate(articles[:3], 1):
                 response += f"{i}. **{article.get('title', 'N/A')}**\n"
                 response += f"   Source: {article.get('source', 'N/A')}\n"
@@ -0,0 +1,63 @@
+"""
+Turn feed summaries (HTML fragments) into short plain-text article content
+
+The cleaner is a single regex scan over the markup: text between tags is
+unescaped and its whitespace collapsed, and scanning stops as soon as
+enough visible text for a summary has been collected, so long bodies cost
+no more than short ones. Big scrapes clean in the scraper's parse worker
+processes, next to parsing (scraper._parse_source).
+"""
+import html
+import re
+
+SUMMARY_LENGTH = 500        # characters kept, longer text ends with "..."
+
+# A comment, a <!...> / <?...> declaration, or a start/end tag (attributes may hold '>')
+TAG_RE = re.compile(
+    r"<(?:!--.*?(?:-->|$)|[!?][^>]*>?|(/?)([a-zA-Z][^\s/>]*)(?:[^>\"']|\"[^\"]*\"|'[^']*')*>?)",
+    re.S
+)
+# Elements whose text is never visible
+HIDDEN_TAGS = frozenset(("script", "style", "template"))
+
+
+def clean_html(html_text: str, limit: int = SUMMARY_LENGTH) -> str:
+    """
+    Visible text of an HTML fragment, entities decoded, whitespace collapsed,
+    cut to `limit` characters
+    """
+    if not html_text:
+        return ""
+
+    words = []
+    size = -1               # length of " ".join(words)
+    hidden = None           # name of the hidden element being skipped
+    position = 0
+
+    for match in TAG_RE.finditer(html_text):
+        if hidden is None and match.start() > position:
+            for word in html.unescape(html_text[position:match.start()]).split():
+                words.append(word)
+                size += len(word) + 1
+            if size > limit:
+                break
+        position = match.end()
+
+        closing, name = match.group(1), match.group(2)
+        if name is None:
+            continue
+        name = name.lower()
+        if hidden is None:
+            if not closing and name in HIDDEN_TAGS and not match.group(0).endswith("/>"):
+                hidden = name
+        elif closing and name == hidden:
+            hidden = None
+    else:
+        if hidden is None:
+            words.extend(html.unescape(html_text[position:]).split())
+
+    text = " ".join(words)
+    if len(text) > limit:
+        text = text[:limit - 3] + "..."
+    return text
+
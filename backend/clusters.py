@@ -0,0 +1,194 @@
+"""
+Near-duplicate clusters of articles (MinHash signatures + LSH buckets)
+
+The same story often comes from several feeds with a different URL and a
+slightly different summary, which the URL/title key in database.py does
+not catch. Each article gets a MinHash signature of the 3-word shingles
+of its title and cleaned content. The signature is cut into bands, and
+articles sharing a band land in the same bucket. A new article is only
+compared with the articles in its buckets, so adding one costs the same
+however many are indexed. It joins the cluster of its most similar
+candidate when their estimated Jaccard similarity reaches the threshold.
+
+Signatures use one-permutation hashing (every shingle hashed once into
+one of NUM_BINS bins, empty bins filled from their neighbour) rather than
+NUM_BINS separate hash functions: 20-50x cheaper in pure Python.
+"""
+import bisect
+import os
+import zlib
+from array import array
+from typing import Dict, List, Optional
+
+from search import tokenize
+
+SHINGLE_WORDS = 3
+NUM_BINS = 64
+ROWS = 4                          # signature values per band: 16 bands, ~50% similarity to become candidates
+BANDS = NUM_BINS // ROWS
+THRESHOLD = float(os.getenv('NEWS_DUP_THRESHOLD', '0.5'))   # estimated Jaccard to join a cluster
+MAX_CANDIDATES = 64               # newest articles looked at per crowded bucket
+
+MIX = 0x9E3779B97F4A7C15          # 64-bit multiplicative mix of the CRC32 of a shingle
+MASK = (1 << 64) - 1
+BIN_SHIFT = 58                    # top 6 bits pick the bin (64 bins)
+VALUE_MASK = (1 << BIN_SHIFT) - 1
+EMPTY = 1 << 63
+ROTATION = 1 << BIN_SHIFT         # added per bin a borrowed value moved, so borrowed values differ from real ones
+
+
+def shingles(doc) -> set:
+    """3-word shingles of title + content (the words themselves for very short texts)"""
+    words = tokenize(f"{doc.get('title') or ''} {doc.get('content') or ''}")
+    if len(words) < SHINGLE_WORDS:
+        return set(words)
+    return {' '.join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def signature(doc) -> Optional[array]:
+    """MinHash signature of an article, or None when it has no words"""
+    bins = [EMPTY] * NUM_BINS
+    for shingle in shingles(doc):
+        h = (zlib.crc32(shingle.encode('utf-8')) * MIX) & MASK
+        i = h >> BIN_SHIFT
+        value = h & VALUE_MASK
+        if value < bins[i]:
+            bins[i] = value
+    if EMPTY not in bins:
+        return array('Q', bins)
+    if all(value == EMPTY for value in bins):
+        return None
+    # Densify: an empty bin takes the nearest filled bin to its right, offset by the distance
+    filled = [value != EMPTY for value in bins]
+    dense = bins[:]
+    for i in range(NUM_BINS):
+        if not filled[i]:
+            distance = 1
+            while not filled[(i + distance) % NUM_BINS]:
+                distance += 1
+            dense[i] = bins[(i + distance) % NUM_BINS] + distance * ROTATION
+    return array('Q', dense)
+
+
+def similarity(a: array, b: array) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(x == y for x, y in zip(a, b)) / NUM_BINS
+
+
+class ClusterIndex:
+    """
+    Clusters of near-duplicate articles, updated one article at a time
+
+    A cluster's id is the doc_id of the article that started it (once that
+    one is removed, of the oldest article left); its representative is its
+    newest article.
+    """
+    def __init__(self, threshold: float = THRESHOLD):
+        self.threshold = threshold
+        self.signatures: Dict[int, array] = {}
+        self.buckets = [{} for _ in range(BANDS)]   # band -> {band hash: doc_id or [doc_ids]}
+        self.cluster_of: Dict[int, int] = {}        # doc_id -> cluster id
+        self.members: Dict[int, List[int]] = {}     # cluster id -> doc_ids, ascending
+
+    @classmethod
+    def build(cls, docs, threshold: float = THRESHOLD):
+        """Index {doc_id: doc} oldest first, so clusters start at their oldest article"""
+        index = cls(threshold)
+        for doc_id in sorted(docs):
+            index.add(doc_id, docs[doc_id])
+        return index
+
+    def _band_keys(self, sig: array):
+        return [hash(tuple(sig[b * ROWS:(b + 1) * ROWS])) for b in range(BANDS)]
+
+    def candidates(self, sig: array) -> set:
+        """Articles sharing at least one band with sig"""
+        found = set()
+        for bucket, key in zip(self.buckets, self._band_keys(sig)):
+            ids = bucket.get(key)
+            if ids is None:
+                continue
+            if isinstance(ids, int):
+                found.add(ids)
+            else:
+                found.update(ids[-MAX_CANDIDATES:])
+        return found
+
+    def add(self, doc_id: int, doc) -> int:
+        """Index an article and return its cluster id"""
+        sig = signature(doc)
+        cluster = doc_id
+        if sig is not None:
+            best = self.threshold
+            for other in self.candidates(sig):
+                score = similarity(sig, self.signatures[other])
+                if score > best or (score == best and score >= self.threshold and cluster == doc_id):
+                    best, cluster = score, self.cluster_of[other]
+            self.signatures[doc_id] = sig
+            for bucket, key in zip(self.buckets, self._band_keys(sig)):
+                ids = bucket.get(key)
+                if ids is None:
+                    bucket[key] = doc_id
+                elif isinstance(ids, int):
+                    bucket[key] = [ids, doc_id]
+                else:
+                    ids.append(doc_id)
+        self.cluster_of[doc_id] = cluster
+        bisect.insort(self.members.setdefault(cluster, []), doc_id)
+        return cluster
+
+    def remove(self, doc_id: int):
+        """Drop an article; a cluster losing its oldest article takes the id of the next one"""
+        cluster = self.cluster_of.pop(doc_id, None)
+        if cluster is None:
+            return
+        members = self.members[cluster]
+        members.remove(doc_id)
+        if not members:
+            del self.members[cluster]
+        elif cluster == doc_id:
+            # Otherwise the article coming back (update) would land in its old cluster by id
+            self.members[members[0]] = members
+            for member in members:
+                self.cluster_of[member] = members[0]
+            del self.members[cluster]
+        sig = self.signatures.pop(doc_id, None)
+        if sig is None:
+            return
+        for bucket, key in zip(self.buckets, self._band_keys(sig)):
+            ids = bucket.get(key)
+            if ids == doc_id:
+                del bucket[key]
+            elif isinstance(ids, list) and doc_id in ids:
+                ids.remove(doc_id)
+                if len(ids) == 1:
+                    bucket[key] = ids[0]
+
+    def update(self, doc_id: int, doc):
+        """Re-index an article whose text changed (it may move to another cluster)"""
+        self.remove(doc_id)
+        self.add(doc_id, doc)
+
+    def clear(self):
+        self.__init__(self.threshold)
+
+    def cluster(self, doc_id: int) -> int:
+        return self.cluster_of.get(doc_id, doc_id)
+
+    def size(self, doc_id: int) -> int:
+        """Articles in doc_id's cluster (1 when it has no near-duplicates)"""
+        return len(self.members.get(self.cluster_of.get(doc_id), ())) or 1
+
+    def is_representative(self, doc_id: int, accept=None) -> bool:
+        """
+        True when no newer article of its cluster passes accept(doc_id) (any
+        article by default): the one a collapsed, filtered list shows
+        """
+        members = self.members.get(self.cluster_of.get(doc_id)) or []
+        # Sliced rather than indexed: a write may empty the list meanwhile
+        newest = members[-1:]
+        if not newest or newest[0] == doc_id:
+            return True
+        if accept is None:
+            return False
+        return not any(accept(other) for other in members[bisect.bisect_right(members, doc_id):])
@@ -0,0 +1,17 @@
+"""
+pytest setup: every file the app would write goes to a temporary folder
+
+test_db.py and test_mongo.py are connection checks run by hand against a
+real database (python3 test_db.py), so pytest leaves them out.
+"""
+import os
+import tempfile
+
+collect_ignore = ["test_db.py", "test_mongo.py", "benchmarks"]
+
+_tmp = tempfile.mkdtemp(prefix="news-portal-tests-")
+for name, file in [("NEWS_DB_PATH", "news_database.json"), ("NEWS_SQLITE_PATH", "news_database.sqlite3"),
+                   ("NEWS_LOG_PATH", "news_database.log"), ("NEWS_SEARCH_PATH", "news_search.idx"),
+                   ("NEWS_CHANGES_PATH", "news_changes"), ("NEWS_JOBS_DIR", "scrape_jobs")]:
+    os.environ[name] = os.path.join(_tmp, file)
+os.environ["AUTO_SCRAPE"] = "0"
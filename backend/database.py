@@ -1,35 +1,117 @@
-from tinydb import TinyDB, Query
-from datetime import datetime
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from dotenv import load_dotenv
+from storage import create_backend
+from search import SearchIndex
+from clusters import ClusterIndex
+from shared import ChangeJournal, OP_UPSERT, OP_DELETE, OP_CLEAR
+from metrics import registry, STORAGE_SECONDS
+from articles import Article, SOURCES, CATEGORIES, UPSERT_FIELDS, encode_json, fingerprint, normalize, to_epoch
+from concurrent.futures import Future, ThreadPoolExecutor
+import asyncio
+import bisect
+import functools
+import hashlib
+import itertools
 import os
+import queue
+import threading
+import time
 
-# Use file-based database (no server needed!)
-DB_PATH = os.path.join(os.path.dirname(__file__), 'news_database.json')
+# Load environment variables
+load_dotenv()
+
+# Which storage backend to use: tinydb (default, file-based, no server needed!), sqlite, log or mongodb
+DB_BACKEND = os.getenv('NEWS_DB_BACKEND', 'tinydb')
+DB_PATH = os.getenv('NEWS_DB_PATH', os.path.join(os.path.dirname(__file__), 'news_database.json'))
+SQLITE_PATH = os.getenv('NEWS_SQLITE_PATH', os.path.join(os.path.dirname(__file__), 'news_database.sqlite3'))
+LOG_PATH = os.getenv('NEWS_LOG_PATH', os.path.join(os.path.dirname(__file__), 'news_database.log'))
+MONGODB_URL = os.getenv('MONGODB_URL', 'mongodb://localhost:27017')
+MONGODB_DB_NAME = os.getenv('MONGODB_DB_NAME', 'news_portal')
+MONGODB_POOL_SIZE = int(os.getenv('MONGODB_POOL_SIZE', '50'))
+
+# Full-text search index file, reloaded at startup instead of re-tokenizing every article
+SEARCH_INDEX_PATH = os.getenv('NEWS_SEARCH_PATH', os.path.join(os.path.dirname(__file__), 'news_search.idx'))
+SEARCH_SAVE_INTERVAL = 300   # seconds between saves after background scrapes
+
+# Durability: "batch" syncs every committed write (one batch) to disk, "async" leaves it to the OS
+DB_SYNC = os.getenv('NEWS_DB_SYNC', 'batch')
+
+# Single inserts (POST /news) are group-committed: whatever is queued is stored in one write
+GROUP_COMMIT_WAIT = float(os.getenv('NEWS_GROUP_COMMIT_MS', '2')) / 1000   # wait this long for more
+GROUP_COMMIT_MAX = int(os.getenv('NEWS_GROUP_COMMIT_MAX', '1000'))         # documents per commit
+
+# Several API worker processes on one database (uvicorn --workers N): writes take a
+# shared file lock and every worker follows the others' writes through a change journal
+MULTI_PROCESS = os.getenv('NEWS_MULTI_PROCESS', '0') == '1'
+CHANGES_PATH = os.getenv('NEWS_CHANGES_PATH', os.path.join(os.path.dirname(__file__), 'news_database.changes'))
+
+# GET /news/changes: per-article changes kept for clients catching up (older ones get a reset)
+CHANGE_LOG_SIZE = int(os.getenv('NEWS_CHANGE_LOG_SIZE', '100000'))
+CHANGES_LIMIT = 1000      # changes per GET /news/changes response
+
+# Threads behind the async API: reads share a bounded pool, writes (serialized by the
+# write lock anyway) queue on their own thread so a burst of writes cannot take the
+# threads reads need
+IO_READ_WORKERS = int(os.getenv('NEWS_IO_WORKERS', '8'))
+_read_executor = ThreadPoolExecutor(max_workers=IO_READ_WORKERS, thread_name_prefix="storage-read")
+_write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="storage-write")
 
 # Global database instance
 db = None
-news_table = None
 chat_table = None
+news_collection = None
+
+# Queue gauges, read when /metrics is scraped
+registry.gauge("news_storage_queued_tasks", "Storage calls waiting for an executor thread",
+               lambda: {"read": _read_executor._work_queue.qsize(), "write": _write_executor._work_queue.qsize()},
+               ["executor"])
+registry.gauge("news_group_commit_queued", "Inserts waiting for the next group commit",
+               lambda: news_collection.commits.queue.qsize() if news_collection is not None else 0)
+registry.gauge("news_group_commits_total", "Group commits stored",
+               lambda: news_collection.commits.commits if news_collection is not None else 0, kind="counter")
+registry.gauge("news_articles", "Articles in the in-memory indexes",
+               lambda: len(news_collection._index.docs) if news_collection is not None and news_collection._index is not None else 0)
+registry.gauge("news_story_clusters", "Near-duplicate clusters (stories) among the articles",
+               lambda: len(news_collection._clusters.members) if news_collection is not None and news_collection._clusters is not None else 0)
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = {'fbclid', 'gclid', 'cmpid', 'ocid', 'ref', 'at_medium', 'at_campaign'}
 
 def connect_to_mongodb():
     """
-    Connect to TinyDB database (file-based, no server needed)
+    Connect to the configured storage backend (TinyDB by default)
     """
-    global db, news_table, chat_table
+    global db, chat_table, news_collection
     
     try:
-        print(f"🔌 Connecting to database...")
+        print(f"🔌 Connecting to {DB_BACKEND} database...")
         
-        # Create or open database file
-        db = TinyDB(DB_PATH)
+        # Open the backend for the news table
+        db = create_backend(
+            DB_BACKEND,
+            table='news_articles',
+            path=DB_PATH,
+            sqlite_path=SQLITE_PATH,
+            log_path=LOG_PATH,
+            url=MONGODB_URL,
+            db_name=MONGODB_DB_NAME,
+            pool_size=MONGODB_POOL_SIZE,
+            fsync=DB_SYNC != 'async'
+        )
         
         # Get tables
-        news_table = db.table('news_articles')
-        chat_table = db.table('chat_history')
+        chat_table = db.open_table('chat_history')
+        journal = None
+        if MULTI_PROCESS:
+            if db.name == 'log':
+                raise ValueError("The log backend keeps its offsets in memory and supports one process only")
+            journal = ChangeJournal(CHANGES_PATH)
+        news_collection = CollectionWrapper(db, search_path=SEARCH_INDEX_PATH, journal=journal)
         
-        print(f"✅ Connected to database: {DB_PATH}")
-        print(f"📊 Current articles: {len(news_table)}")
+        print(f"✅ Connected to {db.name} database")
+        print(f"📊 Current articles: {db.count()}")
         return db
-        
+    
     except Exception as e:
         print(f"❌ Error: {e}")
         return None
@@ -38,102 +120,1285 @@ def close_mongodb_connection():
     """
     Close database connection
     """
-    global db
+    if news_collection is not None:
+        news_collection.commits.close()
+        news_collection.save_search_index()
     if db:
         db.close()
         print("🔌 Database connection closed")
 
-def get_news_collection():
+async def run_read(func, *args, **kwargs):
     """
-    Get the news articles collection
+    Run a blocking read (storage, indexes, serialization) on the read executor
     """
-    global news_table
-    if news_table is None:
-        connect_to_mongodb()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_read_executor, functools.partial(func, *args, **kwargs))
+
+async def run_write(func, *args, **kwargs):
+    """
+    Run a blocking write on the writer thread
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_write_executor, functools.partial(func, *args, **kwargs))
+
+def parse_id(value):
+    """
+    Article id from a request or a query
+    
+    Every backend uses positive integer ids, sent to clients as decimal
+    strings; anything else (including old Mongo ObjectIds) raises ValueError.
+    """
+    if isinstance(value, int) and not isinstance(value, bool):
+        doc_id = value
+    elif isinstance(value, str) and value.isascii() and value.strip().isdigit():
+        doc_id = int(value)
+    else:
+        raise ValueError(f"Invalid article id: {value!r}")
+    if doc_id < 1:
+        raise ValueError(f"Invalid article id: {value!r}")
+    return doc_id
+
+def canonical_url(url):
+    """
+    Normalize an article URL so the same story always gives the same key
+    """
+    if not url:
+        return None
+    parts = urlsplit(url.strip())
+    if not parts.netloc:
+        return None
+    
+    # Drop tracking parameters and sort the rest
+    params = []
+    if parts.query:
+        params = [
+            (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+            if not k.lower().startswith('utm_') and k.lower() not in TRACKING_PARAMS
+        ]
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit(('https', host, path, urlencode(sorted(params)), ''))
+
+def article_key(document):
+    """
+    Deduplication key: canonical URL, or a title+source hash when there is no URL
+    """
+    url = canonical_url(document.get('url'))
+    if url:
+        return 'url:' + url
+    text = f"{document.get('title', '').strip().lower()}|{document.get('source', '').strip().lower()}"
+    return 'hash:' + hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def date_key(value):
+    """
+    Sortable key for a published_date (ISO string, datetime or None): epoch
+    seconds, None when undated
+    """
+    return to_epoch(value)
+
+def _sorted_add(ids, doc_id):
+    """Keep an id list sorted; new ids are the largest so this is usually an append"""
+    if not ids or ids[-1] < doc_id:
+        ids.append(doc_id)
+    else:
+        bisect.insort(ids, doc_id)
+
+def _sorted_remove(ids, value):
+    i = bisect.bisect_left(ids, value)
+    if i < len(ids) and ids[i] == value:
+        del ids[i]
+
+# by_date key of undated articles: sorts before every date
+UNDATED = float('-inf')
+
+# Entries copied by the first slice of a walk over an index list (doubling up to WALK_SLICE_MAX)
+WALK_SLICE = 64
+WALK_SLICE_MAX = 4096
+
+def _walk(entries, low=None, high=None, descending=True):
+    """
+    Yield the entries of a sorted list strictly between low and high
+    
+    Reads do not take the write lock, so the list may change while it is
+    walked. It is copied a slice at a time (a slice copy is atomic) and the
+    next slice starts after the last entry seen, so an insert or delete
+    meanwhile never fails the walk or repeats an entry.
+    """
+    size = WALK_SLICE
+    while True:
+        lo = bisect.bisect_right(entries, low) if low is not None else 0
+        hi = bisect.bisect_left(entries, high) if high is not None else len(entries)
+        chunk = entries[max(lo, hi - size):hi] if descending else entries[lo:min(hi, lo + size)]
+        # The list may have shifted between the bisects and the copy: trim the ends
+        if chunk and low is not None and chunk[0] <= low:
+            chunk = chunk[bisect.bisect_right(chunk, low):]
+        if chunk and high is not None and chunk[-1] >= high:
+            chunk = chunk[:bisect.bisect_left(chunk, high)]
+        if not chunk:
+            return
+        if descending:
+            yield from reversed(chunk)
+            high = chunk[0]
+        else:
+            yield from chunk
+            low = chunk[-1]
+        size = min(size * 2, WALK_SLICE_MAX)
+
+def _date_entry(record):
+    return (record.published if record.published is not None else UNDATED, record.id)
+
+class ArticleIndexes:
+    """
+    In-memory copy of the articles plus the secondary indexes used to serve reads
+    
+    Articles are compact Article records (articles.py). Every id list is kept
+    sorted by doc_id, which is also insertion order, so "newest first" is a
+    walk from the end of a list.
+    
+    One thread writes (under the collection's write lock) while others read
+    without locking: an article enters docs before the lists and leaves it
+    before them, reads walk the lists with _walk and skip ids no longer in
+    docs.
+    """
+    def __init__(self):
+        self.docs = {}           # doc_id -> Article
+        self.ids = []            # all doc_ids
+        self.by_category = {}    # category -> doc_ids
+        self.by_source = {}      # source -> doc_ids
+        self.by_date = []        # (published epoch or UNDATED, doc_id), sorted
+        self.keys = {}           # article_key -> doc_id
     
-    # Return wrapped version for compatibility
-    class CollectionWrapper:
-        def __init__(self, table):
-            self.table = table
+    @classmethod
+    def build(cls, documents):
+        """Bulk-build the indexes from (doc_id, document) pairs, sorting once at the end"""
+        index = cls()
+        for doc_id, document in documents:
+            record = Article(doc_id, document)
+            index.docs[doc_id] = record
+            index.ids.append(doc_id)
+            index.by_category.setdefault(record.category, []).append(doc_id)
+            index.by_source.setdefault(record.source, []).append(doc_id)
+            index.by_date.append(_date_entry(record))
+            index.keys[article_key(document)] = doc_id
         
-        def find(self):
-            """Return all documents as a cursor-like object"""
-            class Cursor:
-                def __init__(self, docs):
-                    self.docs = docs
-                
-                def sort(self, field, direction):
-                    # For TinyDB, we'll just return as-is (newest first by default)
-                    return self
+        for ids in [index.ids, *index.by_category.values(), *index.by_source.values()]:
+            ids.sort()
+        index.by_date.sort()
+        return index
+    
+    def add(self, doc_id, document):
+        """Index a stored document"""
+        record = Article(doc_id, document)
+        self.docs[doc_id] = record
+        _sorted_add(self.ids, doc_id)
+        _sorted_add(self.by_category.setdefault(record.category, []), doc_id)
+        _sorted_add(self.by_source.setdefault(record.source, []), doc_id)
+        bisect.insort(self.by_date, _date_entry(record))
+        self.keys[article_key(document)] = doc_id
+    
+    def fingerprint_of(self, key):
+        """(doc_id, fingerprint) of the article stored under a dedup key, or None"""
+        doc_id = self.keys.get(key)
+        return None if doc_id is None else (doc_id, self.docs[doc_id].fingerprint)
+    
+    def _drop_key(self, record):
+        # The key is computed again instead of kept per article (url and title do not change)
+        key = article_key(record)
+        if self.keys.get(key) == record.id:
+            del self.keys[key]
+    
+    def remove(self, doc_id):
+        """Drop a document from every index, returns False if it was not there"""
+        record = self.docs.pop(doc_id, None)
+        if record is None:
+            return False
+        _sorted_remove(self.ids, doc_id)
+        _sorted_remove(self.by_category.get(record.category, []), doc_id)
+        _sorted_remove(self.by_source.get(record.source, []), doc_id)
+        _sorted_remove(self.by_date, _date_entry(record))
+        self._drop_key(record)
+        return True
+    
+    def remove_many(self, doc_ids):
+        """
+        Drop many documents at once: each list is filtered in one pass instead
+        of deleting from its middle once per id
+        """
+        doc_ids = set(doc_ids)
+        if len(doc_ids) <= 64:
+            return sum(self.remove(doc_id) for doc_id in doc_ids)
+        removed = {doc_id: self.docs.pop(doc_id) for doc_id in doc_ids if doc_id in self.docs}
+        if not removed:
+            return 0
+        self.ids = [doc_id for doc_id in self.ids if doc_id not in removed]
+        for category in {record.category for record in removed.values()}:
+            self.by_category[category] = [i for i in self.by_category[category] if i not in removed]
+        for source in {record.source for record in removed.values()}:
+            self.by_source[source] = [i for i in self.by_source[source] if i not in removed]
+        self.by_date = [entry for entry in self.by_date if entry[1] not in removed]
+        for record in removed.values():
+            self._drop_key(record)
+        return len(removed)
+    
+    def update(self, doc_id, fields):
+        """Apply changed fields to an indexed document"""
+        document = self.docs[doc_id].to_document()
+        document.update(fields)
+        self.replace(doc_id, document)
+    
+    def replace(self, doc_id, document):
+        """
+        Index a new version of a stored document: readers see the old or the
+        new one, never neither (its new list entries are added first)
+        """
+        old = self.docs.get(doc_id)
+        if old is None:
+            return self.add(doc_id, document)
+        record = Article(doc_id, document)
+        if record.category != old.category:
+            _sorted_add(self.by_category.setdefault(record.category, []), doc_id)
+        if record.source != old.source:
+            _sorted_add(self.by_source.setdefault(record.source, []), doc_id)
+        if _date_entry(record) != _date_entry(old):
+            bisect.insort(self.by_date, _date_entry(record))
+        old_key, key = article_key(old), article_key(document)
+        self.keys[key] = doc_id
+        self.docs[doc_id] = record
+        
+        if record.category != old.category:
+            _sorted_remove(self.by_category.get(old.category, []), doc_id)
+        if record.source != old.source:
+            _sorted_remove(self.by_source.get(old.source, []), doc_id)
+        if _date_entry(record) != _date_entry(old):
+            _sorted_remove(self.by_date, _date_entry(old))
+        if old_key != key and self.keys.get(old_key) == doc_id:
+            del self.keys[old_key]
+    
+    def clear(self):
+        self.__init__()
+    
+    @staticmethod
+    def _date_bounds(date_from, date_to):
+        """
+        Exclusive (low, high) by_date entries around a published_date range in
+        epoch seconds (undated articles excluded)
+        """
+        low = (date_from,) if date_from is not None else (UNDATED, float('inf'))
+        high = (date_to, float('inf')) if date_to is not None else None
+        return low, high
+    
+    @staticmethod
+    def matcher(category=None, source=None, date_from=None, date_to=None):
+        """Predicate telling whether an Article record passes the filters (epoch seconds for dates)"""
+        dated = date_from is not None or date_to is not None
+        category_code = CATEGORIES.codes.get(category, -1) if category is not None else None
+        source_code = SOURCES.codes.get(source, -1) if source is not None else None
+        
+        def matches(record):
+            if category_code is not None and record.category_code != category_code:
+                return False
+            if source_code is not None and record.source_code != source_code:
+                return False
+            if dated:
+                published = record.published
+                if published is None or (date_from is not None and published < date_from) \
+                        or (date_to is not None and published > date_to):
+                    return False
+            return True
+        return matches
+    
+    def query(self, category=None, source=None, date_from=None, date_to=None,
+              before=None, after=None, descending=True, order='_id'):
+        """
+        Yield matching doc_ids lazily, ordered by _id (insertion) or published_date
+        
+        `before`/`after` are keyset cursors on _id, `date_from`/`date_to` epoch
+        seconds. Only as many documents as the caller consumes are looked at.
+        """
+        dated = date_from is not None or date_to is not None
+        matches = self.matcher(category, source, date_from, date_to)
+        docs = self.docs
+        
+        if order == 'published_date':
+            low, high = self._date_bounds(date_from, date_to) if dated else (None, None)
+            for _, doc_id in _walk(self.by_date, low, high, descending):
+                if (before is None or doc_id < before) and (after is None or doc_id > after):
+                    record = docs.get(doc_id)
+                    if record is not None and matches(record):
+                        yield doc_id
+            return
+        
+        # Pick the smallest index as the list to walk
+        candidates = [self.ids]
+        if category is not None:
+            candidates.append(self.by_category.get(category, []))
+        if source is not None:
+            candidates.append(self.by_source.get(source, []))
+        if dated:
+            low, high = self._date_bounds(date_from, date_to)
+            lo = bisect.bisect_right(self.by_date, low)
+            hi = bisect.bisect_left(self.by_date, high) if high is not None else len(self.by_date)
+            if hi - lo < min(len(c) for c in candidates):
+                candidates.append(sorted(doc_id for _, doc_id in self.by_date[lo:hi]))
+        
+        driver = min(candidates, key=len)
+        for doc_id in _walk(driver, after, before, descending):
+            record = docs.get(doc_id)
+            if record is not None and matches(record):
+                yield doc_id
+
+def _field_value(record, field):
+    """A record's value for query matching (published_date as epoch seconds)"""
+    return record.published if field == 'published_date' else record.get(field)
+
+def _matches_condition(field, value, condition):
+    """Check one stored value against an equality or $gt/$gte/$lt/$lte/$in/$ne condition"""
+    if field == 'published_date':
+        value = date_key(value)
+    if not isinstance(condition, dict):
+        return value == (date_key(condition) if field == 'published_date' else condition)
+    for op, expected in condition.items():
+        if field == 'published_date' and op != '$in':
+            expected = date_key(expected)
+        if op == '$eq' and not value == expected:
+            return False
+        if op == '$ne' and value == expected:
+            return False
+        if op == '$in' and value not in expected:
+            return False
+        if op in ('$gt', '$gte', '$lt', '$lte'):
+            if value is None or value == '':
+                return False
+            if op == '$gt' and not value > expected:
+                return False
+            if op == '$gte' and not value >= expected:
+                return False
+            if op == '$lt' and not value < expected:
+                return False
+            if op == '$lte' and not value <= expected:
+                return False
+    return True
+
+def _project(doc, projection):
+    """Apply a pymongo-style projection ({'content': 0}, {'title': 1} or a list of fields)"""
+    if not projection:
+        return dict(doc)
+    if not isinstance(projection, dict):
+        projection = {field: 1 for field in projection}
+    keep_id = projection.get('_id', 1)
+    included = [f for f, on in projection.items() if on and f != '_id']
+    if included:
+        result = {f: doc[f] for f in included if f in doc}
+        if keep_id:
+            result['_id'] = doc['_id']
+        return result
+    excluded = {f for f, on in projection.items() if not on}
+    return {f: v for f, v in doc.items() if f not in excluded}
+
+class Cursor:
+    """
+    Lazy, pymongo-style cursor over the in-memory indexes
+    
+    Nothing runs until iteration. Filters on category, source, _id and
+    published_date ranges are pushed down into the index walk, and skip/limit
+    stop the walk early, so "latest N" only touches N documents.
+    """
+    # Fields whose plain equality is answered by an index
+    INDEXED = ('category', 'source')
+    
+    def __init__(self, index, query=None, projection=None):
+        self.index = index
+        self.query = dict(query or {})
+        self.projection = projection
+        self._sort = ('_id', -1)   # newest first, like before
+        self._skip = 0
+        self._limit = 0
+    
+    def sort(self, field, direction=-1):
+        self._sort = (field, direction)
+        return self
+    
+    def skip(self, n):
+        self._skip = max(0, n)
+        return self
+    
+    def limit(self, n):
+        # pymongo semantics: 0 means no limit
+        self._limit = max(0, n)
+        return self
+    
+    def _plan(self):
+        """Split the query into index pushdown arguments and leftover conditions"""
+        pushdown = {}
+        residual = {}
+        for field, condition in self.query.items():
+            if field in self.INDEXED and not isinstance(condition, dict):
+                pushdown[field] = condition
+                continue
+            if field == 'published_date' and isinstance(condition, dict):
+                # Range bounds are pushed down inclusively; strict bounds are rechecked
+                if '$gte' in condition or '$gt' in condition:
+                    pushdown['date_from'] = date_key(condition.get('$gte', condition.get('$gt')))
+                if '$lte' in condition or '$lt' in condition:
+                    pushdown['date_to'] = date_key(condition.get('$lte', condition.get('$lt')))
+            residual[field] = condition
+        return pushdown, residual
+    
+    def _doc_ids(self):
+        field, direction = self._sort
+        pushdown, residual = self._plan()
+        id_condition = residual.pop('_id', None)
+        
+        if id_condition is not None and not isinstance(id_condition, dict):
+            # Lookup by id: at most one document
+            try:
+                doc_id = parse_id(id_condition)
+            except ValueError:
+                return iter(())
+            ids = iter([doc_id] if doc_id in self.index.docs else [])
+            id_condition = None
+        elif isinstance(id_condition, dict) and '$in' in id_condition:
+            # Lookup by a list of ids: only those documents are looked at, then sorted
+            docs = self.index.docs
+            matches = self.index.matcher(**pushdown)
+            found = [doc_id for doc_id in {parse_id(v) for v in id_condition['$in']}
+                     if doc_id in docs and matches(docs[doc_id])]
+            if field == '_id':
+                sort_key = None
+            elif field == 'published_date':
+                def sort_key(doc_id):
+                    record = docs.get(doc_id)
+                    return _date_entry(record) if record is not None else (UNDATED, doc_id)
+            else:
+                sort_key = self._sort_key(field)
+            ids = iter(sorted(found, key=sort_key, reverse=direction < 0))
+        elif field in ('_id', 'published_date'):
+            ids = self.index.query(descending=direction < 0, order=field, **pushdown)
+        else:
+            # No index for this field: materialize the matches and sort them
+            ids = iter(sorted(self.index.query(**pushdown), key=self._sort_key(field), reverse=direction < 0))
+        
+        if id_condition is not None:
+            id_condition = {
+                op: [parse_id(v) for v in value] if op == '$in' else int(value)
+                for op, value in id_condition.items()
+            }
+        if not residual and id_condition is None:
+            return ids
+        docs = self.index.docs
+        
+        def passes(doc_id):
+            record = docs.get(doc_id)
+            return record is not None \
+                and (id_condition is None or _matches_condition('_id', doc_id, id_condition)) \
+                and all(_matches_condition(f, _field_value(record, f), c) for f, c in residual.items())
+        return filter(passes, ids)
+    
+    def _sort_key(self, field):
+        """Sort key on a field without an index (missing values first, as pymongo)"""
+        docs = self.index.docs
+        
+        def sort_key(doc_id):
+            record = docs.get(doc_id)
+            value = record.get(field) if record is not None else None
+            return (value is not None, value if value is not None else '')
+        return sort_key
+    
+    def __iter__(self):
+        ids = self._doc_ids()
+        count = 0
+        for position, doc_id in enumerate(ids):
+            if position < self._skip:
+                continue
+            if self._limit and count >= self._limit:
+                break
+            doc = self.index.docs.get(doc_id)
+            if doc is None:
+                continue
+            count += 1
+            yield _project(doc.to_dict(), self.projection)
+
+def _writes(method):
+    """Run a CollectionWrapper method under its write lock (storage and indexes change together)"""
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        with self._write_lock:
+            return method(self, *args, **kwargs)
+    return locked
+
+def _mutates(method):
+    """
+    Run a CollectionWrapper write under its write lock and, when other worker
+    processes share the database, under their shared lock on top of their writes
+    """
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        with self._write_lock:
+            if self.journal is None:
+                return method(self, *args, **kwargs)
+            with self.journal.lock:
+                self.backend.refresh()
+                self._catch_up()
+                return method(self, *args, **kwargs)
+    return locked
+
+class GroupCommitWriter:
+    """
+    Single writer thread that stores queued inserts together
+    
+    Each caller queues one document and gets a Future for its own id. The
+    thread takes everything queued (waiting up to max_wait for more, at most
+    max_batch documents) and stores it with one insert_many: one file
+    rewrite / transaction / fsync for the whole group instead of one each.
+    """
+    def __init__(self, collection, max_wait=GROUP_COMMIT_WAIT, max_batch=GROUP_COMMIT_MAX):
+        self.collection = collection
+        self.max_wait = max_wait
+        self.max_batch = max_batch
+        self.queue = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+        self.commits = 0
+        self.committed = 0
+    
+    def submit(self, document):
+        """Queue a document; the Future resolves to an insert result once it is stored"""
+        future = Future()
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+                self.thread.start()
+            self.queue.put((document, future))
+        return future
+    
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            stop = False
+            while len(batch) < self.max_batch:
+                try:
+                    item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+            if stop:
+                return
+    
+    def _commit(self, batch):
+        class Result:
+            def __init__(self, doc_id):
+                self.inserted_id = doc_id
+        
+        try:
+            result = self.collection.insert_many([document for document, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.commits += 1
+        self.committed += len(batch)
+        for (_, future), doc_id in zip(batch, result.inserted_ids):
+            future.set_result(Result(doc_id))
+    
+    def close(self):
+        """Store everything still queued and stop the thread"""
+        with self.lock:
+            thread, self.thread = self.thread, None
+            if thread is not None:
+                self.queue.put(None)
+        if thread is not None:
+            thread.join()
+
+class DeleteResult:
+    def __init__(self, count):
+        self.deleted_count = count
+
+class ChangeLog:
+    """
+    The latest per-article changes in sequence order, for GET /news/changes
+    
+    Sequence numbers are microsecond timestamps, bumped by one when writes
+    come faster, so they keep increasing across restarts (and stay exact as
+    JavaScript numbers); in multi-process
+    mode they travel in the change journal and every worker numbers a write
+    the same way. Only the last max_entries changes are kept: a client
+    behind `start` (or ahead of `last`, e.g. after the clock went back)
+    has to reload the full list.
+    """
+    def __init__(self, max_entries=CHANGE_LOG_SIZE):
+        self.max_entries = max_entries
+        self.entries = []        # (seq, op, doc_id), ascending seq
+        self.last = self.start = time.time_ns() // 1000   # every change after start is in entries
+        self.lock = threading.Lock()
+    
+    def next_seq(self):
+        """A new sequence number, above every one handed out or seen so far"""
+        return max(self.last + 1, time.time_ns() // 1000)
+    
+    def record(self, op, doc_id, seq):
+        with self.lock:
+            if op == OP_CLEAR:
+                # Nothing before a clear can be replayed: every client reloads
+                self.entries = []
+                self.start = seq
+            else:
+                self.entries.append((seq, op, doc_id))
+                if len(self.entries) > self.max_entries * 2:
+                    self.start = self.entries[-self.max_entries - 1][0]
+                    self.entries = self.entries[-self.max_entries:]
+            self.last = max(self.last, seq)
+    
+    def reset(self):
+        """Forget every change (the indexes were reloaded)"""
+        with self.lock:
+            self.entries = []
+            self.start = self.last = self.next_seq()
+    
+    def since(self, seq, limit):
+        """
+        (changes after seq, at most limit, as (seq, op, doc_id); the sequence
+        number to ask from next; whether more are waiting), or None when seq
+        is outside the log
+        """
+        with self.lock:
+            if seq < self.start or seq > self.last:
+                return None
+            i = bisect.bisect_right(self.entries, (seq, float('inf')))
+            changes = self.entries[i:i + limit]
+            more = i + limit < len(self.entries)
+            return changes, changes[-1][0] if more else self.last, more
+
+class CollectionWrapper:
+    def __init__(self, backend, search_path=None, journal=None):
+        self.backend = backend
+        # Shared with the other worker processes (None when this process is the only one)
+        self.journal = journal
+        # In-memory indexes, built on first use
+        self._index = None
+        # Full-text index, loaded (or built) on the first search
+        self._search = None
+        self.search_path = search_path
+        self._search_saved_at = 0.0
+        # Near-duplicate clusters: built by the first scrape or collapsed read, then kept current
+        self._clusters = None
+        # Background scrapes and API requests write from different threads
+        self._write_lock = threading.RLock()
+        # Bumped by every write, so cached responses know when they are stale
+        self._version = 0
+        # Per-article changes with sequence numbers, for clients syncing deltas
+        self._changes = ChangeLog()
+        # Awaitable versions of the operations below, for async handlers
+        self.aio = AsyncCollection(self)
+        # Queue for single inserts, committed in groups
+        self.commits = GroupCommitWriter(self)
+    
+    def _indexes(self):
+        """Build the in-memory indexes with one pass over the table"""
+        # Once built, reads take them without queueing behind a running write
+        if self._index is None:
+            with self._write_lock:
+                if self._index is None:
+                    self._build_indexes()
+        elif self.journal is not None and self.journal.changed():
+            with self._write_lock:
+                self._catch_up()
+        return self._index
+    
+    def _build_indexes(self):
+        if self.journal is not None:
+            # Position first: writes landing during the load are re-applied, which is harmless
+            with self.journal.lock:
+                self.journal.mark()
+        self._index = ArticleIndexes.build(self.backend.load())
+    
+    def _catch_up(self):
+        """Apply the writes other worker processes made since the last look"""
+        if self.journal is None or self._index is None:
+            return
+        changes, replaced = self.journal.read_new()
+        if replaced:
+            print("🔄 Change journal replaced, reloading the indexes")
+            self._search = None
+            self._clusters = None
+            self._build_indexes()
+            self._changes.reset()
+            self._version += 1
+            return
+        if not changes:
+            return
+        
+        # Only the last change per document matters; storage has its current state
+        latest = {}
+        for op, doc_id, seq in changes:
+            if op == OP_CLEAR:
+                latest.clear()
+                self._index.clear()
+                if self._search is not None:
+                    self._search.clear()
+                if self._clusters is not None:
+                    self._clusters.clear()
+            else:
+                latest.pop(doc_id, None)
+                latest[doc_id] = op
+        
+        upserted = [doc_id for doc_id, op in latest.items() if op == OP_UPSERT]
+        stored = self.backend.get_many(upserted) if upserted else {}
+        gone = [doc_id for doc_id, op in latest.items() if op == OP_DELETE or doc_id not in stored]
+        self._forget(gone)
+        for doc_id in upserted:
+            document = stored.get(doc_id)
+            if document is None:
+                continue
+            if doc_id in self._index.docs:
+                old = self._index.docs[doc_id]
+                self._index.replace(doc_id, document)
+                if self._search is not None:
+                    self._search.update(doc_id, old, self._index.docs[doc_id])
+                if self._clusters is not None:
+                    self._clusters.update(doc_id, self._index.docs[doc_id])
+            else:
+                self._remember(doc_id, document)
+        # Numbered only now that the indexes hold them (GET /news/changes reads both)
+        for op, doc_id, seq in changes:
+            self._changes.record(op, doc_id, seq)
+        self._version += 1
+    
+    def _publish(self, op, doc_ids):
+        """Number a write's changes and tell the other worker processes about it"""
+        changes = []
+        for doc_id in doc_ids:
+            seq = self._changes.next_seq()
+            self._changes.record(op, int(doc_id), seq)
+            changes.append((op, int(doc_id), seq))
+        if self.journal is not None:
+            self.journal.append(changes)
+    
+    @property
+    def version(self):
+        """Write counter, a plain read (other workers' writes count once this process applied them)"""
+        return self._version
+    
+    @property
+    def current(self):
+        """
+        True when version is up to date without touching storage: the indexes
+        are loaded and no other worker wrote since (one stat of the journal)
+        """
+        return self._index is not None and (self.journal is None or not self.journal.changed())
+    
+    def current_version(self):
+        """Load the indexes or apply other workers' writes first, then version (storage I/O: run off the loop)"""
+        self._indexes()
+        return self._version
+    
+    def _search_index(self):
+        """Load the saved full-text index, or build it when it does not match the table"""
+        if self._search is None:
+            with self._write_lock:
+                return self._load_search_index()
+        return self._search
+    
+    def _load_search_index(self):
+        if self._search is None:
+            docs = self._indexes().docs
+            search = SearchIndex.load(self.search_path) if self.search_path else None
+            if search is not None and len(search.doc_len) == len(docs) \
+                    and search.signature == SearchIndex.signature_of(docs):
+                print(f"🔎 Loaded search index ({len(search.postings)} terms)")
+            else:
+                print(f"🔎 Building search index for {len(docs)} articles...")
+                search = SearchIndex()
+                for doc_id, doc in docs.items():
+                    search.add(doc_id, doc)
+            self._search = search
+            self.save_search_index()
+        return self._search
+    
+    @_writes
+    def save_search_index(self, min_interval=0):
+        """Write the full-text index to disk if it changed (at most every min_interval seconds)"""
+        if self._search is None or not self._search.dirty or not self.search_path:
+            return
+        if time.monotonic() - self._search_saved_at < min_interval:
+            return
+        self._search.save(self.search_path)
+        self._search_saved_at = time.monotonic()
+    
+    def _cluster_index(self):
+        """Near-duplicate clusters of the articles, built on first use"""
+        if self._clusters is None:
+            with self._write_lock:
+                if self._clusters is None:
+                    docs = self._indexes().docs
+                    print(f"🧩 Clustering {len(docs)} articles by near-duplicate text...")
+                    self._clusters = ClusterIndex.build(docs)
+        return self._clusters
+    
+    def _remember(self, doc_id, document):
+        """Add a stored document to the indexes"""
+        if self._index is not None:
+            self._index.add(doc_id, document)
+            if self._search is not None:
+                self._search.add(doc_id, document)
+            if self._clusters is not None:
+                self._clusters.add(doc_id, document)
+    
+    def _forget(self, doc_ids):
+        """Drop deleted documents from the indexes"""
+        if self._index is not None:
+            if self._search is not None:
+                for doc_id in doc_ids:
+                    doc = self._index.docs.get(doc_id)
+                    if doc is not None:
+                        self._search.remove(doc_id, doc)
+            if self._clusters is not None:
+                for doc_id in doc_ids:
+                    self._clusters.remove(doc_id)
+            self._index.remove_many(doc_ids)
+    
+    def _page(self, category=None, source=None, published_from=None, published_to=None,
+              before=None, limit=None, collapse=False):
+        """(records, next_cursor) of one page, newest first"""
+        index = self._indexes()
+        date_from = date_key(published_from) if published_from is not None else None
+        date_to = date_key(published_to) if published_to is not None else None
+        ids = index.query(
+            category=category,
+            source=source,
+            date_from=date_from,
+            date_to=date_to,
+            before=int(before) if before is not None else None
+        )
+        if collapse:
+            # A story's newest article that passes the filters stands for its near-duplicates,
+            # so later pages (older ids) never show the story again
+            clusters = self._cluster_index()
+            docs = index.docs
+            matches = index.matcher(category, source, date_from, date_to)
+            
+            def accept(other):
+                record = docs.get(other)
+                return record is not None and matches(record)
+            ids = (doc_id for doc_id in ids if clusters.is_representative(doc_id, accept))
+        
+        # Each record is taken as its id is found: a delete landing meanwhile only shortens the page
+        records = (record for record in map(index.docs.get, ids) if record is not None)
+        records = list(itertools.islice(records, limit + 1 if limit is not None else None))
+        next_cursor = None
+        if limit is not None and len(records) > limit:
+            del records[limit:]
+            next_cursor = str(records[-1].id)
+        return records, next_cursor
+    
+    def _cluster_fields(self, record):
+        """cluster_id and the number of other articles in the cluster, added to collapsed lists"""
+        clusters = self._cluster_index()
+        return str(clusters.cluster(record.id)), clusters.size(record.id) - 1
+    
+    def _dicts(self, records, fields=None, collapse=False):
+        articles = [record.to_dict(fields) for record in records]
+        if collapse:
+            for article, record in zip(articles, records):
+                article['cluster_id'], article['duplicates'] = self._cluster_fields(record)
+        return articles
+    
+    def _encoded(self, records, fields=None, collapse=False):
+        """Articles as JSON bytes: the cached JSON of whole articles, cluster fields spliced in"""
+        if fields:
+            return [encode_json(article).encode('utf-8') for article in self._dicts(records, fields, collapse)]
+        if collapse:
+            return [record.json[:-1] + b',"cluster_id":"%s","duplicates":%d}' % (cluster_id.encode(), duplicates)
+                    for record, (cluster_id, duplicates) in zip(records, map(self._cluster_fields, records))]
+        return [record.json for record in records]
+    
+    @STORAGE_SECONDS.time("find_page")
+    def find_page(self, category=None, source=None, published_from=None, published_to=None,
+                  before=None, limit=None, fields=None, collapse=False):
+        """
+        Return (articles, next_cursor) newest first, served from the indexes
+        
+        `before` is the keyset cursor: the _id of the last article of the previous
+        page. `fields` limits which fields are returned (_id is always included).
+        collapse=True returns one article per near-duplicate cluster (clusters.py),
+        with its `cluster_id` and how many `duplicates` it stands for.
+        """
+        records, next_cursor = self._page(category, source, published_from, published_to, before, limit, collapse)
+        return self._dicts(records, fields, collapse), next_cursor
+    
+    @STORAGE_SECONDS.time("find_page_json")
+    def find_page_json(self, category=None, source=None, published_from=None, published_to=None,
+                       before=None, limit=None, fields=None, collapse=False):
+        """
+        find_page with the page already encoded: (JSON array as bytes, next_cursor)
+        
+        Whole articles are joined from their cached JSON (articles.py), so a
+        recent page costs no per-article encoding; a `fields` subset is encoded here.
+        """
+        records, next_cursor = self._page(category, source, published_from, published_to, before, limit, collapse)
+        return b'[' + b','.join(self._encoded(records, fields, collapse)) + b']', next_cursor
+    
+    def iter_articles(self, category=None, source=None, published_from=None, published_to=None,
+                      before=None, limit=None, fields=None, batch_size=1000, encoded=False, collapse=False):
+        """
+        Yield matching articles newest first, one keyset page at a time
+        
+        Only one page is materialized at once, so memory stays flat however
+        many articles there are; writes between pages do not break the walk.
+        With encoded=True each article comes as its JSON bytes.
+        """
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = batch_size if remaining is None else min(batch_size, remaining)
+            records, next_cursor = self._page(category, source, published_from, published_to, before, size, collapse)
+            if encoded:
+                yield from self._encoded(records, fields, collapse)
+            else:
+                yield from self._dicts(records, fields, collapse)
+            if next_cursor is None:
+                return
+            before = next_cursor
+            if remaining is not None:
+                remaining -= len(records)
+    
+    def changed_records(self, since, limit=CHANGES_LIMIT):
+        """
+        (seq, reset, more, Article records added or changed, ids deleted) after
+        sequence number since; changes_since in its raw form
+        """
+        docs = self._indexes().docs
+        found = self._changes.since(since, limit) if since is not None else None
+        if found is None:
+            return self._changes.last, True, False, [], []
+        changes, seq, more = found
+        
+        # Latest change per article, oldest first; articles deleted since are tombstones
+        latest = {}
+        for _, op, doc_id in changes:
+            latest.pop(doc_id, None)
+            latest[doc_id] = op
+        records, deleted = [], []
+        for doc_id, op in latest.items():
+            record = docs.get(doc_id) if op == OP_UPSERT else None
+            if record is not None:
+                records.append(record)
+            else:
+                deleted.append(str(doc_id))
+        return seq, False, more, records, deleted
+    
+    def change_seq(self):
+        """Sequence number of the latest change: ask GET /news/changes from here"""
+        self._indexes()
+        return self._changes.last
+    
+    @STORAGE_SECONDS.time("changes")
+    def changes_since(self, since, limit=CHANGES_LIMIT):
+        """
+        Articles added or changed and ids deleted after change sequence number
+        `since`, oldest change first: {"seq", "reset", "more", "articles", "deleted"}
+        
+        Ask again from the returned `seq` (right away while `more` is true).
+        `reset` means the changes are no longer known (or since is None): load
+        the full list and sync from `seq`.
+        """
+        seq, reset, more, records, deleted = self.changed_records(since, limit)
+        return {"seq": seq, "reset": reset, "more": more,
+                "articles": [record.to_dict() for record in records], "deleted": deleted}
+    
+    @STORAGE_SECONDS.time("changes")
+    def changes_json(self, since, limit=CHANGES_LIMIT):
+        """changes_since already encoded (bytes), articles joined from their cached JSON"""
+        seq, reset, more, records, deleted = self.changed_records(since, limit)
+        head = encode_json({"seq": seq, "reset": reset, "more": more, "deleted": deleted})
+        return head[:-1].encode('utf-8') + b',"articles":[' + b','.join(r.json for r in records) + b']}'
+    
+    @STORAGE_SECONDS.time("search")
+    def search(self, query, limit=10, prefix=False, category=None, source=None, fields=None, collapse=False):
+        """
+        Articles matching a keyword query, best BM25 score first (each with a 'score')
+        
+        `word*` matches every word starting with "word"; prefix=True does the
+        same for the last word (search as you type). collapse=True keeps the
+        newest article of each near-duplicate cluster, as find_page does.
+        The full-text index is not safe to read while a write changes it, so
+        a search waits for a running write.
+        """
+        search = self._search_index()
+        docs = self._indexes().docs
+        with self._write_lock:
+            matches = ArticleIndexes.matcher(category, source)
+            accept = None
+            if category is not None or source is not None:
+                def accept(doc_id):
+                    return matches(docs[doc_id])
+            if collapse:
+                clusters = self._cluster_index()
                 
-                def limit(self, n):
-                    return self.docs[:n] if n > 0 else self.docs
+                def newer_match(other):
+                    record = docs.get(other)
+                    return record is not None and matches(record)
                 
-                def __iter__(self):
-                    return iter(self.docs)
-            
-            all_docs = self.table.all()
-            # Add doc_id as _id for compatibility
-            for doc in all_docs:
-                if '_id' not in doc:
-                    doc['_id'] = str(doc.doc_id)
-            return Cursor(all_docs[::-1])  # Reverse to show newest first
-        
-        def insert_one(self, document):
-            """Insert a single document"""
-            class Result:
-                def __init__(self, doc_id):
-                    self.inserted_id = str(doc_id)
+                def accept(doc_id):
+                    return matches(docs[doc_id]) and clusters.is_representative(doc_id, newer_match)
             
-            doc_id = self.table.insert(document)
-            return Result(doc_id)
-        
-        def insert_many(self, documents):
-            """Insert multiple documents"""
-            class Result:
-                def __init__(self, doc_ids):
-                    self.inserted_ids = [str(id) for id in doc_ids]
-            
-            doc_ids = self.table.insert_multiple(documents)
-            return Result(doc_ids)
-        
-        def delete_one(self, query):
-            """Delete one document by _id"""
-            class Result:
-                def __init__(self, count):
-                    self.deleted_count = count
-            
-            if '_id' in query:
-                try:
-                    doc_id = int(query['_id'])
-                    self.table.remove(doc_ids=[doc_id])
-                    return Result(1)
-                except:
-                    return Result(0)
-            return Result(0)
-        
-        def delete_many(self, query):
-            """Delete all documents"""
-            count = len(self.table)
-            self.table.truncate()
+            results = []
+            for doc_id, score in search.search(query, limit=limit, prefix=prefix, accept=accept):
+                article = docs[doc_id].to_dict(fields)
+                if collapse:
+                    article['cluster_id'], article['duplicates'] = self._cluster_fields(docs[doc_id])
+                article['score'] = round(score, 4)
+                results.append(article)
+            return results
+    
+    @STORAGE_SECONDS.time("find_one")
+    def find_one(self, query):
+        """Return the first document matching all fields of query, or None"""
+        if '_id' in query:
+            # Single-document read straight from the backend (mmap on the log backend)
+            try:
+                doc_id = parse_id(query['_id'])
+            except ValueError:
+                return None
+            doc = self.backend.get(doc_id)
+            return Article(doc_id, doc).to_dict() if doc is not None else None
+        
+        index = self._indexes()
+        for doc_id in _walk(index.ids):
+            record = index.docs.get(doc_id)
+            if record is not None and all(record.get(field) == value for field, value in query.items()):
+                return record.to_dict()
+        return None
+    
+    def find(self, query=None, projection=None):
+        """Return a lazy cursor over the documents matching query (newest first)"""
+        return Cursor(self._indexes(), query, projection)
+    
+    @STORAGE_SECONDS.time("insert_one")
+    @_mutates
+    def insert_one(self, document):
+        """Insert a single document"""
+        class Result:
+            def __init__(self, doc_id):
+                self.inserted_id = str(doc_id)
+        
+        document = normalize(document)
+        doc_id = self.backend.insert([document])[0]
+        self._remember(doc_id, document)
+        self._publish(OP_UPSERT, [doc_id])
+        self._version += 1
+        return Result(doc_id)
+    
+    @STORAGE_SECONDS.time("insert_many")
+    @_mutates
+    def insert_many(self, documents):
+        """Insert multiple documents"""
+        class Result:
+            def __init__(self, doc_ids):
+                self.inserted_ids = [str(id) for id in doc_ids]
+        
+        documents = [normalize(document) for document in documents]
+        doc_ids = self.backend.insert(documents)
+        for doc_id, document in zip(doc_ids, documents):
+            self._remember(doc_id, document)
+        self._publish(OP_UPSERT, doc_ids)
+        self._version += 1
+        return Result(doc_ids)
+    
+    @STORAGE_SECONDS.time("upsert_many")
+    @_mutates
+    def upsert_many(self, documents):
+        """Insert new articles, refresh changed ones and skip ones already saved"""
+        class Result:
+            def __init__(self, inserted_ids, updated_ids, skipped_count):
+                self.inserted_ids = [str(id) for id in inserted_ids]
+                self.updated_ids = [str(id) for id in updated_ids]
+                self.inserted_count = len(inserted_ids)
+                self.updated_count = len(updated_ids)
+                self.skipped_count = skipped_count
+        
+        index = self._indexes()
+        # Scraped stories get their near-duplicate cluster as they are stored
+        self._cluster_index()
+        seen = set()
+        new_docs = {}
+        updates = []
+        skipped = 0
+        
+        for document in documents:
+            document = normalize(document)
+            key = article_key(document)
             
-            class Result:
-                def __init__(self, count):
-                    self.deleted_count = count
+            # Same article twice in one batch (e.g. listed in two feeds)
+            if key in seen:
+                skipped += 1
+                continue
+            seen.add(key)
             
-            return Result(count)
+            stored = index.fingerprint_of(key)
+            if stored is None:
+                new_docs[key] = document
+            elif stored[1] == fingerprint(document):
+                skipped += 1
+            else:
+                doc_id = stored[0]
+                updates.append((doc_id, {f: document.get(f) for f in UPSERT_FIELDS}))
+        
+        # One write for all changed articles and one for all new ones
+        if updates:
+            self.backend.update_many(updates)
+            for doc_id, fields in updates:
+                old = self._index.docs[doc_id]
+                self._index.update(doc_id, fields)
+                if self._search is not None:
+                    self._search.update(doc_id, old, self._index.docs[doc_id])
+                self._clusters.update(doc_id, self._index.docs[doc_id])
+        inserted_ids = self.backend.insert(list(new_docs.values())) if new_docs else []
+        for doc_id, document in zip(inserted_ids, new_docs.values()):
+            self._remember(doc_id, document)
+        if updates or inserted_ids:
+            self._publish(OP_UPSERT, [doc_id for doc_id, _ in updates] + list(inserted_ids))
+            self._version += 1
         
-        def count_documents(self, query):
-            """Count documents"""
-            return len(self.table)
+        return Result(inserted_ids, [doc_id for doc_id, _ in updates], skipped)
+    
+    @STORAGE_SECONDS.time("delete_one")
+    @_mutates
+    def delete_one(self, query):
+        """Delete the newest document matching query (usually {'_id': id})"""
+        doc_ids = list(itertools.islice(self._matching_ids(query), 1))
+        return self._delete(doc_ids)
+    
+    @STORAGE_SECONDS.time("delete_many")
+    @_mutates
+    def delete_many(self, query):
+        """Delete every document matching query ({} empties the collection)"""
+        if query:
+            return self._delete(list(self._matching_ids(query)))
+        
+        count = len(self._indexes().docs)
+        self.backend.truncate()
+        self._index.clear()
+        if self._search is not None:
+            self._search.clear()
+        if self._clusters is not None:
+            self._clusters.clear()
+        self._publish(OP_CLEAR, [0])
+        self._version += 1
+        return DeleteResult(count)
+    
+    def _matching_ids(self, query):
+        """Ids of the documents matching query, newest first; a malformed _id matches nothing"""
+        try:
+            return self.find(query)._doc_ids()
+        except ValueError:
+            return iter(())
+    
+    def _delete(self, doc_ids):
+        """Remove documents found in the indexes from storage and the indexes"""
+        if not doc_ids:
+            return DeleteResult(0)
+        count = self.backend.remove(doc_ids)
+        self._forget(doc_ids)
+        self._publish(OP_DELETE, doc_ids)
+        self._version += 1
+        return DeleteResult(count)
+    
+    @STORAGE_SECONDS.time("count_documents")
+    def count_documents(self, query):
+        """
+        Count documents, from the in-memory indexes: every write keeps them
+        current, so no storage scan. {} and a single category or source are
+        constant-time; other queries walk the matching ids.
+        """
+        index = self._indexes()
+        if not query:
+            return len(index.docs)
+        if len(query) == 1:
+            field, value = next(iter(query.items()))
+            if field in Cursor.INDEXED and not isinstance(value, dict):
+                by_value = index.by_category if field == 'category' else index.by_source
+                return len(by_value.get(value, ()))
+        return sum(1 for _ in self._matching_ids(query))
+    
+    def estimated_document_count(self):
+        """Number of articles, from the in-memory indexes (no storage round-trip)"""
+        return len(self._indexes().docs)
+    
+    @STORAGE_SECONDS.time("distinct")
+    def distinct(self, field):
+        """Distinct values of a field; category and source come straight from their indexes"""
+        index = self._indexes()
+        if field in ('category', 'source'):
+            by_value = index.by_category if field == 'category' else index.by_source
+            # list() copies in one step, so a write adding a value meanwhile does not break the loop
+            return [value for value, ids in list(by_value.items()) if ids and value is not None]
+        return list({record.get(field) for record in list(index.docs.values()) if record.get(field) is not None})
+
+class AsyncCollection:
+    """
+    Awaitable CollectionWrapper operations, run on the storage I/O executors
+    (the event loop never waits on file or network I/O)
+    """
+    def __init__(self, collection):
+        self.collection = collection
+    
+    async def find_page(self, **filters):
+        return await run_read(self.collection.find_page, **filters)
+    
+    async def search(self, query, **options):
+        return await run_read(self.collection.search, query, **options)
+    
+    async def find_one(self, query):
+        return await run_read(self.collection.find_one, query)
+    
+    async def count_documents(self, query):
+        return await run_read(self.collection.count_documents, query)
+    
+    async def estimated_document_count(self):
+        return await run_read(self.collection.estimated_document_count)
+    
+    async def distinct(self, field):
+        return await run_read(self.collection.distinct, field)
+    
+    async def insert_one(self, document):
+        # Group-committed with the other inserts queued at the same time
+        return await asyncio.wrap_future(self.collection.commits.submit(document))
+    
+    async def insert_many(self, documents):
+        return await run_write(self.collection.insert_many, documents)
+    
+    async def upsert_many(self, documents):
+        return await run_write(self.collection.upsert_many, documents)
+    
+    async def delete_one(self, query):
+        return await run_write(self.collection.delete_one, query)
+    
+    async def delete_many(self, query):
+        return await run_write(self.collection.delete_many, query)
+
+def get_news_collection():
+    """
+    Get the news articles collection
+    """
+    if news_collection is None:
+        connect_to_mongodb()
     
-    return CollectionWrapper(news_table)
+    # Wrapped version for compatibility (shared so its indexes stay warm)
+    return news_collection
 
 def get_chat_collection():
     """
-    Get the chat history collection
+    Get the chat history table, a StorageBackend like the articles' on every backend
     """
-    global chat_table
     if chat_table is None:
         connect_to_mongodb()
     return chat_table
\ No newline at end of file
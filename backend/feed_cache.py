@@ -0,0 +1,144 @@
+import contextlib
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Iterable, Optional
+
+from shared import ProcessLock, fcntl
+
+# Validators are kept next to the database file
+CACHE_PATH = os.path.join(os.path.dirname(__file__), 'feed_cache.json')
+
+
+def body_hash(body: bytes) -> str:
+    """
+    Hash of a feed body, used to spot unchanged feeds on servers without validators
+    """
+    return hashlib.sha256(body).hexdigest()
+
+
+class FeedCache:
+    """
+    Persistent per-feed validator cache (ETag, Last-Modified and body hash)
+
+    Several processes may scrape with the same file (API workers, the CLI
+    scraper), so save() merges this process's changes into the file as it
+    is now, under a lock file shared by all of them.
+    """
+    def __init__(self, path: str = CACHE_PATH):
+        self.path = path
+        self.entries = None
+        self.changes = {}      # feed_url -> validators changed since the last save (None: forgotten)
+        self.cleared = False   # every feed forgotten since the last save
+        self.lock = threading.Lock()
+        self.file_lock = None
+
+    @property
+    def dirty(self) -> bool:
+        return self.cleared or bool(self.changes)
+
+    def _read(self) -> Dict:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _load(self):
+        if self.entries is None:
+            self.entries = self._read()
+
+    def _process_lock(self):
+        if fcntl is None:   # Windows: one process at a time
+            return contextlib.nullcontext()
+        if self.file_lock is None:
+            self.file_lock = ProcessLock(f"{self.path}.lock")
+        return self.file_lock
+
+    def get(self, feed_url: str) -> Optional[Dict]:
+        """
+        Get the stored validators for a feed
+        """
+        with self.lock:
+            self._load()
+            return self.entries.get(feed_url)
+
+    def conditional_headers(self, feed_url: str) -> Dict[str, str]:
+        """
+        Build If-None-Match / If-Modified-Since headers for a feed
+        """
+        entry = self.get(feed_url) or {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def update(self, feed_url: str, validators: Dict):
+        """
+        Store the validators of a successfully processed feed
+        """
+        with self.lock:
+            self._load()
+            stored = self.entries.get(feed_url) or {}
+            if stored.get('stored'):
+                validators = dict(validators, stored=True)
+            if stored != validators:
+                self.entries[feed_url] = validators
+                self.changes[feed_url] = validators
+
+    def save(self):
+        """
+        Write the cache to disk if anything changed, keeping what other
+        processes saved meanwhile for the feeds this one did not touch
+        """
+        with self.lock:
+            if not self.dirty:
+                return
+            with self._process_lock():
+                entries = {} if self.cleared else self._read()
+                for feed_url, validators in self.changes.items():
+                    if validators is None:
+                        entries.pop(feed_url, None)
+                    else:
+                        entries[feed_url] = validators
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(entries, f)
+                os.replace(tmp_path, self.path)
+            self.entries = entries
+            self.changes = {}
+            self.cleared = False
+
+    def mark_stored(self, feed_urls: Iterable[str]):
+        """
+        Note that these feeds' articles made it into the database, so their
+        validators are worth clearing once those articles are all deleted
+        """
+        with self.lock:
+            self._load()
+            for feed_url in feed_urls:
+                entry = self.entries.get(feed_url)
+                if entry is not None and not entry.get('stored'):
+                    entry = self.entries[feed_url] = dict(entry, stored=True)
+                    self.changes[feed_url] = entry
+
+    def was_stored(self, feed_url: str) -> bool:
+        return bool((self.get(feed_url) or {}).get('stored'))
+
+    def clear(self, feed_urls: Optional[Iterable[str]] = None):
+        """
+        Forget the validators of some feeds (all of them by default)
+        """
+        with self.lock:
+            if feed_urls is None:
+                self.entries = {}
+                self.changes = {}
+                self.cleared = True
+                return
+            self._load()
+            for feed_url in feed_urls:
+                if self.entries.pop(feed_url, None) is not None:
+                    self.changes[feed_url] = None
@@ -0,0 +1,187 @@
+"""
+Live feed of new articles for GET /news/live (Server-Sent Events)
+
+One Broadcaster per process: a single pump task asks the collection for
+what changed (GET /news/changes, in-process) and fans the result out to
+every subscriber. Each event is encoded once per distinct filter, not
+once per client, so an idle subscriber costs a queue and a few objects.
+Per-client queues are bounded: a client that falls behind that far is
+sent a `reset` event and dropped (the browser reconnects and reloads).
+"""
+import asyncio
+import os
+import signal
+import threading
+from typing import Dict, Optional, Set, Tuple
+
+from articles import CATEGORIES, SOURCES, encode_json
+from database import get_news_collection, run_read
+from metrics import registry
+
+POLL_INTERVAL = float(os.getenv('LIVE_POLL_SECONDS', '0.5'))   # how often the pump looks for changes
+QUEUE_SIZE = int(os.getenv('LIVE_QUEUE_SIZE', '64'))           # events a client may fall behind
+HEARTBEAT = 15.0                                               # comment line so proxies keep idle streams
+
+PING = b": ping\n\n"
+CLOSE = b""   # queued to end a stream
+
+
+def reset_event(seq: int) -> bytes:
+    """Tell the client its copy cannot be patched anymore: reload GET /news and sync from seq"""
+    return b"id: %d\nevent: reset\ndata: {\"seq\":%d}\n\n" % (seq, seq)
+
+
+class Subscriber:
+    __slots__ = ("queue", "filter", "dropped", "seq")
+
+    def __init__(self, category: Optional[str], source: Optional[str], seq: int):
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+        self.filter = (category, source)
+        self.dropped = False
+        self.seq = seq   # change the stream starts after (sent in its hello)
+
+
+class Broadcaster:
+    def __init__(self, poll_interval: float = POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self.subscribers: Set[Subscriber] = set()
+        self.seq = None
+        self.task = None
+        self.events = 0       # frames encoded
+        self.dropped = 0      # slow subscribers dropped
+
+    async def subscribe(self, category: Optional[str] = None, source: Optional[str] = None) -> Subscriber:
+        if self.task is None or self.task.done():
+            # Nobody followed the changes since the pump stopped: start from the current one
+            seq = await run_read(get_news_collection().change_seq)
+            if self.task is None or self.task.done():
+                self.seq = seq
+        # No await between reading the pump's position and joining: every change after it is queued
+        subscriber = Subscriber(category, source, self.seq)
+        self.subscribers.add(subscriber)
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self._pump())
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+
+    async def stream(self, subscriber: Subscriber):
+        """Bytes for one StreamingResponse; ends when the client is dropped or disconnects"""
+        try:
+            # Tell the client where the stream starts, so it can fill any gap with GET /news/changes
+            yield b"retry: 3000\nevent: hello\ndata: {\"seq\":%d}\n\n" % subscriber.seq
+            while True:
+                frame = await subscriber.queue.get()
+                if frame is CLOSE:
+                    return
+                yield frame
+        finally:
+            self.unsubscribe(subscriber)
+
+    def publish(self, frame: bytes, subscribers=None):
+        """Queue a frame for subscribers (all by default), dropping the ones that are too far behind"""
+        for subscriber in list(self.subscribers if subscribers is None else subscribers):
+            if subscriber.dropped:
+                continue
+            try:
+                subscriber.queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                self._drop(subscriber)
+
+    def _drop(self, subscriber: Subscriber):
+        """Empty a slow client's queue and end its stream with a reset"""
+        subscriber.dropped = True
+        self.dropped += 1
+        self.subscribers.discard(subscriber)
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(reset_event(self.seq or 0))
+        subscriber.queue.put_nowait(CLOSE)
+
+    async def _pump(self):
+        """Poll for changes while anyone listens and fan them out"""
+        collection = get_news_collection()
+        idle = 0.0
+        while self.subscribers:
+            await asyncio.sleep(self.poll_interval)
+            more = True
+            while more:
+                try:
+                    seq, reset, more, records, deleted = await run_read(collection.changed_records, self.seq)
+                except Exception as e:
+                    print(f"⚠️ Live feed could not read changes: {e}")
+                    break
+                if reset:
+                    self.seq = seq
+                    self.publish(reset_event(seq))
+                    break
+                self.seq = seq
+                if records or deleted:
+                    self._fan_out(seq, records, deleted)
+                    idle = 0.0
+            idle += self.poll_interval
+            if idle >= HEARTBEAT:
+                self.publish(PING)
+                idle = 0.0
+        self.task = None
+
+    def _fan_out(self, seq: int, records, deleted):
+        """One `changes` frame per distinct filter, shared by every subscriber with that filter"""
+        groups: Dict[Tuple, list] = {}
+        for subscriber in self.subscribers:
+            groups.setdefault(subscriber.filter, []).append(subscriber)
+        # Deleted articles are gone, so their ids go to everyone (unknown ids are ignored)
+        head = encode_json({"seq": seq, "deleted": deleted})[:-1].encode('utf-8')
+        for (category, source), subscribers in groups.items():
+            # Names to interned codes per batch (-1: no article has that name)
+            category_code = CATEGORIES.codes.get(category, -1) if category is not None else None
+            source_code = SOURCES.codes.get(source, -1) if source is not None else None
+            matching = [record.json for record in records
+                        if (category_code is None or record.category_code == category_code)
+                        and (source_code is None or record.source_code == source_code)]
+            if not matching and not deleted:
+                continue
+            self.events += 1
+            data = head + b',"articles":[' + b','.join(matching) + b']}'
+            self.publish(b"id: %d\nevent: changes\ndata: %s\n\n" % (seq, data), subscribers)
+
+    def close(self):
+        """End every stream and the pump (shutdown)"""
+        for subscriber in list(self.subscribers):
+            if subscriber.queue.full():
+                self._drop(subscriber)
+            else:
+                subscriber.queue.put_nowait(CLOSE)
+        self.subscribers.clear()
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def close_on_exit(self):
+        """
+        End the streams as soon as the server is told to stop (SIGINT/SIGTERM):
+        uvicorn waits for open responses before it shuts down, and a live
+        stream never finishes by itself. Call from the app's startup.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            previous = signal.getsignal(sig)
+
+            def handler(signum, frame, previous=previous):
+                loop.call_soon_threadsafe(self.close)
+                if callable(previous):
+                    previous(signum, frame)
+            signal.signal(sig, handler)
+
+
+# Shared by the API endpoint
+broadcaster = Broadcaster()
+
+registry.gauge("news_live_subscribers", "Clients connected to GET /news/live", lambda: len(broadcaster.subscribers))
+registry.gauge("news_live_events_total", "Live events encoded (one per filter per change batch)",
+               lambda: broadcaster.events, kind="counter")
+registry.gauge("news_live_dropped_total", "Live subscribers dropped for falling behind",
+               lambda: broadcaster.dropped, kind="counter")
@@ -0,0 +1,266 @@
+"""
+Append-only record log used by the "log" storage backend
+
+File layout: a sequence of records, each
+
+    header  = <payload length u32><crc32 u32><op u8><doc_id u64>
+    payload = JSON document (empty for tombstones)
+
+Writes only ever append, so an insert costs the size of one record instead
+of a rewrite of the whole file. An in-memory index maps doc_id -> payload
+offset and single documents are read back through mmap. Deleted and
+overwritten records are garbage until a background compaction copies the
+live records into a fresh file.
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+HEADER = struct.Struct('<IIBQ')
+
+OP_PUT = 1        # document (insert or full replacement)
+OP_DELETE = 2     # tombstone
+OP_META = 3       # next id to hand out, written first in every file
+
+# Compact once garbage is both this large and this share of the file
+COMPACT_MIN_BYTES = 1024 * 1024
+COMPACT_RATIO = 0.5
+
+
+class AppendOnlyLog:
+    def __init__(self, path, fsync=False, auto_compact=True):
+        self.path = path
+        self.fsync = fsync
+        self.auto_compact = auto_compact
+        self.lock = threading.RLock()
+        self.index = {}          # doc_id -> (payload offset, payload length)
+        self.next_id = 1
+        self.garbage = 0         # bytes of dead records
+        self.size = 0
+        self.generation = 0      # bumped by clear() so a running compaction can bail out
+        self._map = None
+        self._compacting = False
+        self._open()
+
+    # ---------- file handling ----------
+
+    def _open(self):
+        if not os.path.exists(self.path):
+            with open(self.path, 'wb') as f:
+                f.write(self._record(OP_META, self.next_id))
+        self.file = open(self.path, 'r+b')
+        self._scan()
+        self.file.seek(self.size)
+
+    def _scan(self):
+        """Rebuild the offset index with one sequential, CRC-checked pass over the file"""
+        self.index = {}
+        self.garbage = 0
+        end = os.path.getsize(self.path)
+        offset = 0
+        f = self.file
+        f.seek(0)
+        while offset + HEADER.size <= end:
+            length, crc, op, doc_id = HEADER.unpack(f.read(HEADER.size))
+            payload_at = offset + HEADER.size
+            if payload_at + length > end:
+                break
+            if op == OP_PUT:
+                payload = f.read(length)
+                if zlib.crc32(payload) != crc:
+                    break
+                if doc_id in self.index:
+                    self.garbage += HEADER.size + self.index[doc_id][1]
+                self.index[doc_id] = (payload_at, length)
+                self.next_id = max(self.next_id, doc_id + 1)
+            elif op == OP_DELETE:
+                old = self.index.pop(doc_id, None)
+                if old:
+                    self.garbage += HEADER.size + old[1]
+                self.garbage += HEADER.size
+            elif op == OP_META:
+                self.next_id = max(self.next_id, doc_id)
+            else:
+                break
+            offset = payload_at + length
+
+        # Drop a torn record left by a crash in the middle of a write
+        if offset < end:
+            f.truncate(offset)
+        self.size = offset
+        self._map = None
+
+    def _record(self, op, doc_id, payload=b''):
+        return HEADER.pack(len(payload), zlib.crc32(payload), op, doc_id) + payload
+
+    def _append(self, records):
+        """Write encoded records in one call; returns the offset they start at"""
+        data = b''.join(records)
+        offset = self.size
+        self.file.write(data)
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+        self.size += len(data)
+        return offset
+
+    def _mapped(self, needed):
+        """mmap covering at least `needed` bytes (remapped as the file grows)"""
+        if self._map is None or len(self._map) < needed:
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    # ---------- public API ----------
+
+    def __len__(self):
+        return len(self.index)
+
+    def reserve_ids(self, count):
+        with self.lock:
+            first = self.next_id
+            self.next_id += count
+            return list(range(first, first + count))
+
+    def put_many(self, items):
+        """Append (doc_id, document) records; a doc_id already present is replaced"""
+        with self.lock:
+            records = []
+            for doc_id, document in items:
+                payload = json.dumps(document, separators=(',', ':'), default=str).encode('utf-8')
+                records.append((doc_id, self._record(OP_PUT, doc_id, payload)))
+            offset = self._append([record for _, record in records])
+            for doc_id, record in records:
+                old = self.index.get(doc_id)
+                if old:
+                    self.garbage += HEADER.size + old[1]
+                self.index[doc_id] = (offset + HEADER.size, len(record) - HEADER.size)
+                self.next_id = max(self.next_id, doc_id + 1)
+                offset += len(record)
+        self._maybe_compact()
+
+    def get(self, doc_id):
+        """Read one document through mmap, None if it does not exist"""
+        with self.lock:
+            entry = self.index.get(doc_id)
+            if entry is None:
+                return None
+            offset, length = entry
+            payload = self._mapped(offset + length)[offset:offset + length]
+        return json.loads(payload)
+
+    def items(self):
+        """Yield (doc_id, document) for every live document in id order"""
+        for doc_id in sorted(self.index):
+            document = self.get(doc_id)
+            if document is not None:
+                yield doc_id, document
+
+    def delete_many(self, doc_ids):
+        """Append tombstones, returns how many documents existed"""
+        with self.lock:
+            existing = [doc_id for doc_id in doc_ids if doc_id in self.index]
+            if existing:
+                self._append([self._record(OP_DELETE, doc_id) for doc_id in existing])
+                for doc_id in existing:
+                    self.garbage += 2 * HEADER.size + self.index.pop(doc_id)[1]
+        self._maybe_compact()
+        return len(existing)
+
+    def clear(self):
+        """Drop every document but keep handing out increasing ids"""
+        with self.lock:
+            self._rewrite([])
+            self.generation += 1
+
+    def close(self):
+        with self.lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            self.file.close()
+
+    # ---------- compaction ----------
+
+    def _maybe_compact(self):
+        if not self.auto_compact:
+            return
+        with self.lock:
+            if self._compacting:
+                return
+            if self.garbage < COMPACT_MIN_BYTES or self.garbage < self.size * COMPACT_RATIO:
+                return
+            self._compacting = True
+        threading.Thread(target=self.compact, daemon=True).start()
+
+    def _rewrite(self, live):
+        """Replace the file with only the given (doc_id, payload) records (lock held)"""
+        tmp_path = self.path + '.new'
+        with open(tmp_path, 'wb') as out:
+            out.write(self._record(OP_META, self.next_id))
+            for doc_id, payload in live:
+                out.write(self._record(OP_PUT, doc_id, payload))
+            out.flush()
+            os.fsync(out.fileno())
+        self._swap(tmp_path)
+
+    def _swap(self, tmp_path):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self.file.close()
+        os.replace(tmp_path, self.path)
+        self.file = open(self.path, 'r+b')
+        self._scan()
+        self.file.seek(self.size)
+
+    def compact(self):
+        """
+        Copy live records into a new file without blocking writers for the bulk copy
+
+        Phase 1 copies a snapshot of the index; phase 2 (under the lock) replays
+        whatever was appended meanwhile, then swaps the files.
+        """
+        source = None
+        try:
+            with self.lock:
+                snapshot = sorted(self.index.items())
+                snapshot_end = self.size
+                generation = self.generation
+                # Private mapping: the shared one may be remapped by readers meanwhile
+                source = mmap.mmap(self.file.fileno(), snapshot_end, access=mmap.ACCESS_READ)
+                tmp_path = self.path + '.compact'
+
+            # Phase 1: old records never change, so they can be copied unlocked
+            with open(tmp_path, 'wb') as out:
+                out.write(self._record(OP_META, 0))
+                for doc_id, (offset, length) in snapshot:
+                    payload = source[offset:offset + length]
+                    out.write(HEADER.pack(length, zlib.crc32(payload), OP_PUT, doc_id))
+                    out.write(payload)
+
+                # Phase 2: catch up with writes that happened during the copy
+                with self.lock:
+                    if generation != self.generation:
+                        out.close()
+                        os.remove(tmp_path)
+                        return
+                    self.file.flush()
+                    tail = self._mapped(self.size)[snapshot_end:self.size]
+                    out.write(tail)
+                    out.seek(0)
+                    out.write(self._record(OP_META, self.next_id))
+                    out.flush()
+                    os.fsync(out.fileno())
+                    out.close()
+                    before = self.size
+                    self._swap(tmp_path)
+                    print(f"🧹 Compacted {os.path.basename(self.path)}: {before} -> {self.size} bytes")
+        finally:
+            if source is not None:
+                source.close()
+            self._compacting = False
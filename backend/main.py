@@ -1,11 +1,21 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from models import NewsArticle, ChatMessage, ChatResponse, ScrapeRequest
-from database import connect_to_mongodb, get_news_collection
-from typing import List
+from models import NewsArticle, ChatMessage, ChatResponse, ScrapeRequest, DeleteRequest
+from database import connect_to_mongodb, close_mongodb_connection, get_news_collection, run_read, parse_id, CHANGES_LIMIT
+from scheduler import scheduler
+from chatbot import chat_with_ai
+from backup import to_ndjson
+from articles import normalize
+from response_cache import response_cache, ResponseCache
+from live import broadcaster
+import metrics
+from typing import List, Optional
 from datetime import datetime
-from bson import ObjectId
+
+# GET /news pages up to this size are built on the event loop (no thread hop)
+INLINE_PAGE_LIMIT = 200
 
 
 # Lifespan context manager (replaces deprecated on_event)
@@ -14,10 +24,18 @@ async def lifespan(app: FastAPI):
     # Startup code
     print("🚀 Starting FastAPI...")
     connect_to_mongodb()
+    scheduler.start()
+    broadcaster.close_on_exit()
     print("✅ FastAPI started and connected to MongoDB")
     print("📡 Server running at http://localhost:8000")
     yield
-    # Shutdown code (if needed)
+    # Shutdown code
+    from scraper import close_http_client, close_parse_pool
+    broadcaster.close()
+    scheduler.stop()
+    close_http_client()
+    close_parse_pool()
+    close_mongodb_connection()
     print("🛑 FastAPI shutting down")
 
 
@@ -35,55 +53,206 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+# Request timings for /metrics (outermost, so CORS and errors are included)
+if metrics.ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
 # HOME ENDPOINT
 @app.get("/")
-def read_root():
+async def read_root():
     return {
         "message": "Welcome to AI News Portal API!",
         "endpoints": {
             "docs": "/docs",
             "get_news": "GET /news",
+            "news_changes": "GET /news/changes?since=",
+            "news_live": "GET /news/live",
+            "search": "GET /search?q=",
             "add_news": "POST /news",
             "delete_all": "DELETE /news",
             "delete_one": "DELETE /news/{id}",
+            "delete_many": "POST /news/delete",
             "scrape": "POST /scrape",
-            "chat": "POST /chat"
+            "scrape_status": "GET /scrape/{job_id}",
+            "chat": "POST /chat",
+            "cache_stats": "GET /cache/stats",
+            "metrics": "GET /metrics"
         },
         "database": "MongoDB (Persistent Storage)"
     }
 
 # GET ALL NEWS
 @app.get("/news")
-def get_news():
+async def get_news(
+    request: Request,
+    category: Optional[str] = None,
+    source: Optional[str] = None,
+    published_from: Optional[datetime] = None,
+    published_to: Optional[datetime] = None,
+    before: Optional[int] = Query(None, description="Cursor: _id of the last article of the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. title,source,url"),
+    stream: Optional[str] = Query(None, description="'ndjson' streams one article per line"),
+    collapse: bool = Query(False, description="One article per story: near-duplicates from other sources are folded in")
+):
     """
-    Returns all news articles from MongoDB
+    Returns news articles from MongoDB, newest first
+    
+    Without `limit` all matching articles are returned. With `limit`, the
+    X-Next-Cursor header holds the `before` value for the next page.
+    With `stream=ndjson` the articles are streamed as they are read (no
+    X-Next-Cursor; the last line's `_id` is the cursor).
+    With `collapse=true` each near-duplicate cluster is shown once, by its
+    newest article, with its `cluster_id` and number of `duplicates`.
+    
+    JSON responses are cached until the next write and carry an ETag;
+    send it back in If-None-Match to get a 304 when nothing changed.
     """
     collection = get_news_collection()
+    filters = dict(
+        category=category,
+        source=source,
+        published_from=published_from,
+        published_to=published_to,
+        before=before,
+        limit=limit,
+        fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+        collapse=collapse
+    )
+    
+    if stream is not None:
+        if stream != "ndjson":
+            raise HTTPException(status_code=400, detail="stream must be 'ndjson'")
+        return StreamingResponse(
+            to_ndjson(collection.iter_articles(**filters, encoded=True)),
+            media_type="application/x-ndjson"
+        )
+    
+    key = ResponseCache.key_for(request)
+    version = collection.version if collection.current else await run_read(collection.current_version)
+    cached = response_cache.get(key, version)
+    if cached is None:
+        def render():
+            # Joined from the JSON each article keeps, nothing is encoded per request
+            body, next_cursor = collection.find_page_json(**filters)
+            headers = {"X-Next-Cursor": next_cursor} if next_cursor is not None else None
+            return response_cache.put_body(key, version, body, headers)
+        # Small pages come straight from the in-memory indexes in about a millisecond,
+        # cheaper than the hop to a thread; everything else is read off the event loop
+        # (collapse too: the first one builds the near-duplicate clusters; and with
+        # other workers, since any read may first have to apply their writes)
+        if limit is not None and limit <= INLINE_PAGE_LIMIT and not collapse and collection.journal is None:
+            cached = render()
+        else:
+            cached = await run_read(render)
     
-    # Get all articles from database
-    articles = list(collection.find())
+    return cached.to_response(request)
+
+# CHANGES SINCE A SEQUENCE NUMBER
+@app.get("/news/changes")
+async def get_news_changes(
+    since: Optional[int] = Query(None, description="`seq` of the previous response; leave out to get the current one"),
+    limit: int = Query(CHANGES_LIMIT, ge=1, le=10000)
+):
+    """
+    Articles added or changed and ids deleted since `since`, oldest change first
+    
+    Returns {"seq", "reset", "more", "deleted", "articles"}. Pass `seq` as
+    `since` next time (right away while `more` is true). When `reset` is
+    true the changes are not known anymore: reload GET /news and carry on
+    from `seq`. To start syncing, read `seq` first, then load GET /news.
+    """
+    collection = get_news_collection()
+    body = await run_read(collection.changes_json, since, limit)
+    return Response(body, media_type="application/json", headers={"Cache-Control": "no-store"})
+
+# LIVE FEED
+@app.get("/news/live")
+async def get_news_live(category: Optional[str] = None, source: Optional[str] = None):
+    """
+    Server-Sent Events stream of new, changed and deleted articles
     
-    # Convert MongoDB _id to string for JSON serialization
-    for article in articles:
-        article['_id'] = str(article['_id'])
+    Events: `hello` (the `seq` the stream starts at), `changes` (`seq`,
+    `deleted` and `articles` as in GET /news/changes, articles limited to
+    `category`/`source`) and `reset` (reload GET /news). A client that falls too far
+    behind gets `reset` and is disconnected.
+    """
+    subscriber = await broadcaster.subscribe(category, source)
+    return StreamingResponse(
+        broadcaster.stream(subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# FULL-TEXT SEARCH
+@app.get("/search")
+async def search_news(
+    request: Request,
+    q: str = Query(..., min_length=1, description="Keywords; end a word with * to match it as a prefix"),
+    limit: int = Query(10, ge=1, le=100),
+    prefix: bool = Query(False, description="Match the last word as a prefix (search as you type)"),
+    category: Optional[str] = None,
+    source: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. title,source,url"),
+    collapse: bool = Query(False, description="One result per story (see GET /news)")
+):
+    """
+    Search article titles and content, best match first (BM25)
+    """
+    collection = get_news_collection()
+    key = ResponseCache.key_for(request)
+    version = collection.version if collection.current else await run_read(collection.current_version)
+    cached = response_cache.get(key, version)
+    if cached is None:
+        def render():
+            results = collection.search(
+                q,
+                limit=limit,
+                prefix=prefix,
+                category=category,
+                source=source,
+                fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+                collapse=collapse
+            )
+            return response_cache.put(key, version, results)
+        cached = await run_read(render)
     
-    return articles
+    return cached.to_response(request)
+
+# RESPONSE CACHE STATS
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """
+    Hit/miss counts and size of the GET /news and GET /search response cache
+    """
+    return response_cache.stats()
+
+# PROMETHEUS METRICS
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Request, storage and scrape timings plus cache and queue gauges (Prometheus text format)
+    """
+    if not metrics.ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are turned off (NEWS_METRICS=0)")
+    return Response(metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 # ADD NEWS
 @app.post("/news")
-def add_news(article: NewsArticle):
+async def add_news(article: NewsArticle):
     """
     Add a news article to MongoDB
     """
     collection = get_news_collection()
     
-    # Convert Pydantic model to dictionary
-    article_dict = article.dict()  # Changed from model_dump() to dict()
+    # Convert Pydantic model to dictionary, published_date as stored (naive UTC ISO string)
+    article_dict = normalize(article.dict())  # Changed from model_dump() to dict()
     
     # Insert into MongoDB
-    result = collection.insert_one(article_dict)
+    result = await collection.aio.insert_one(article_dict)
     
     # Don't return ObjectId directly - convert to string
     return {
@@ -98,43 +267,40 @@ def add_news(article: NewsArticle):
 
 # DELETE ALL NEWS
 @app.delete("/news")
-def delete_all_news():
+async def delete_all_news():
     """
     Delete all news articles from MongoDB
     """
     collection = get_news_collection()
     
-    # Count before deletion
-    count = collection.count_documents({})
-    
     # Delete all documents
-    collection.delete_many({})
+    result = await collection.aio.delete_many({})
     
     return {
         "status": "success",
-        "message": f"Deleted {count} articles from database",
+        "message": f"Deleted {result.deleted_count} articles from database",
         "remaining": 0
     }
 
 # DELETE SINGLE NEWS BY ID
 @app.delete("/news/{article_id}")
-def delete_news_by_id(article_id: str):
+async def delete_news_by_id(article_id: str):
     """
-    Delete a specific news article by MongoDB ID
+    Delete a specific news article by its `_id`
     """
     collection = get_news_collection()
     
     try:
-        # Convert string ID to MongoDB ObjectId
-        obj_id = ObjectId(article_id)
-    except:
+        # Same integer ids on every storage backend
+        doc_id = parse_id(article_id)
+    except ValueError:
         raise HTTPException(
             status_code=400,
             detail="Invalid article ID format"
         )
     
     # Find and delete
-    result = collection.delete_one({"_id": obj_id})
+    result = await collection.aio.delete_one({"_id": doc_id})
     
     if result.deleted_count == 0:
         raise HTTPException(
@@ -145,48 +311,101 @@ def delete_news_by_id(article_id: str):
     return {
         "status": "success",
         "message": f"Deleted article with ID {article_id}",
-        "remaining_count": collection.count_documents({})
+        "remaining_count": await collection.aio.estimated_document_count()
     }
 
-
-# SCRAPE NEWS - Now actually works!
-@app.post("/scrape")
-def scrape_news(request: ScrapeRequest):
-    """
-    Trigger news scraping and save to database
+# DELETE SEVERAL NEWS
+@app.post("/news/delete")
+async def delete_news(request: DeleteRequest):
     """
-    from scraper import scrape_multiple_sources
+    Delete the articles with the given ids and/or matching a filter
+    (category, source, published_from/published_to) in one write
     
-    # Scrape articles
-    articles = scrape_multiple_sources(request.category)
+    With both ids and a filter only the listed articles that match it are
+    deleted. Use DELETE /news to delete everything.
+    """
+    query = {}
+    if request.ids is not None:
+        try:
+            query["_id"] = {"$in": [parse_id(article_id) for article_id in request.ids]}
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if request.category is not None:
+        query["category"] = request.category
+    if request.source is not None:
+        query["source"] = request.source
+    if request.published_from is not None or request.published_to is not None:
+        query["published_date"] = {}
+        if request.published_from is not None:
+            query["published_date"]["$gte"] = request.published_from
+        if request.published_to is not None:
+            query["published_date"]["$lte"] = request.published_to
     
-    if not articles:
-        return {
-            "status": "error",
-            "message": f"No articles found for category: {request.category}",
-            "articles_scraped": 0
-        }
+    if not query:
+        raise HTTPException(
+            status_code=400,
+            detail="Give ids or a filter (use DELETE /news to delete everything)"
+        )
     
-    # Save to MongoDB
     collection = get_news_collection()
-    
-    # Insert all articles
-    result = collection.insert_many(articles)
+    result = await collection.aio.delete_many(query)
     
     return {
         "status": "success",
-        "message": f"Scraped and saved {len(articles)} articles",
-        "articles_scraped": len(articles),
+        "message": f"Deleted {result.deleted_count} articles",
+        "deleted": result.deleted_count,
+        "remaining_count": await collection.aio.estimated_document_count()
+    }
+
+
+# SCRAPE NEWS - queued for the background scrape worker
+@app.post("/scrape", status_code=202)
+async def scrape_news(request: ScrapeRequest):
+    """
+    Queue a news scrape and return its job ID right away
+    
+    Requests for a category that is already queued or running share that job.
+    Poll GET /scrape/{job_id} for the result.
+    """
+    job = scheduler.enqueue_category(request.category)
+    
+    if job is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown category: {request.category}"
+        )
+    
+    return {
+        "status": "queued",
+        "message": f"Scrape of {request.category} queued",
+        "job_id": job["job_id"],
         "category": request.category,
-        "inserted_ids": [str(id) for id in result.inserted_ids]
+        "status_url": f"/scrape/{job['job_id']}"
     }
-# CHAT ENDPOINT (placeholder - we'll implement later)
+
+# SCRAPE JOB STATUS
+@app.get("/scrape/{job_id}")
+async def get_scrape_job(job_id: str):
+    """
+    Status of a scrape job: queued, running, done or failed (with counts when finished)
+    """
+    job = scheduler.get_job(job_id)
+    
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Scrape job {job_id} not found"
+        )
+    
+    return job
+
+# CHAT ENDPOINT
 @app.post("/chat", response_model=ChatResponse)
-def chat_with_bot(message: ChatMessage):
+async def chat_with_bot(message: ChatMessage):
     """
-    Chat with AI about news (to be implemented)
+    Chat with AI about news, answered from the articles that best match the question
     """
     return ChatResponse(
-        bot_message=f"You said: {message.user_message}. AI chatbot coming soon!",
+        bot_message=await run_read(chat_with_ai, message.user_message),
         timestamp=datetime.now()
     )
\ No newline at end of file
@@ -0,0 +1,212 @@
+"""
+Prometheus-style metrics (text exposition format, no client library needed)
+
+Counters and histograms are updated in place under one lock each, cheap
+enough to leave on; gauges are read from callbacks only when /metrics is
+scraped. Set NEWS_METRICS=0 to turn everything off: the decorators then
+return the functions unchanged and the middleware is not installed.
+"""
+import bisect
+import functools
+import os
+import threading
+import time
+from typing import Callable, Iterable, List, Tuple
+
+ENABLED = os.getenv('NEWS_METRICS', '1') != '0'
+
+# Seconds; from sub-millisecond index reads up to slow feed downloads
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values = {}          # label values -> count
+        self.lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        if not ENABLED:
+            return
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            items = sorted(self.values.items())
+        for label_values, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.series = {}          # label values -> [bucket counts..., sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, seconds: float, *label_values):
+        if not ENABLED:
+            return
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [0] * (len(self.buckets) + 2)
+            series[i] += 1        # counts are per bucket, made cumulative when rendered
+            series[-2] += seconds
+            series[-1] += 1
+
+    def time(self, *label_values):
+        """Decorator timing every call of a function into this histogram"""
+        def decorate(func):
+            if not ENABLED:
+                return func
+
+            @functools.wraps(func)
+            def timed(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - start, *label_values)
+            return timed
+        return decorate
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            items = sorted((k, list(v)) for k, v in self.series.items())
+        for label_values, series in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), series):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, label_values, le)} {cumulative}")
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+class Gauge:
+    """
+    Value read from a callback when metrics are rendered ({label values: value} or a number);
+    kind="counter" for totals another component already keeps
+    """
+    def __init__(self, name: str, documentation: str, read: Callable, labels: Iterable[str] = (),
+                 kind: str = "gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+        self.labels = tuple(labels)
+        self.kind = kind
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        try:
+            value = self.read()
+        except Exception:
+            return lines
+        items = sorted(value.items()) if isinstance(value, dict) else [((), value)]
+        for label_values, number in items:
+            if not isinstance(label_values, tuple):
+                label_values = (label_values,)
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(number)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _add(self, metric):
+        with self.lock:
+            return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labels: Iterable[str] = ()) -> Counter:
+        return self._add(Counter(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Iterable[str] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, documentation, labels, buckets))
+
+    def gauge(self, name: str, documentation: str, read: Callable, labels: Iterable[str] = (),
+              kind: str = "gauge") -> Gauge:
+        return self._add(Gauge(name, documentation, read, labels, kind))
+
+    def render(self) -> str:
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# Shared by the modules that report timings
+REQUEST_SECONDS = registry.histogram(
+    "news_http_request_duration_seconds", "Time to answer an HTTP request, by route", ["method", "route"])
+REQUESTS = registry.counter(
+    "news_http_requests_total", "HTTP requests answered, by route and status", ["method", "route", "status"])
+STORAGE_SECONDS = registry.histogram(
+    "news_storage_operation_seconds", "Time spent in collection operations", ["operation"])
+SCRAPE_STAGE_SECONDS = registry.histogram(
+    "news_scrape_stage_seconds", "Time per scrape stage (fetch, parse, clean, insert), by source", ["stage", "source"])
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request by its route template
+    (/news/{article_id}, not the concrete path, so series stay few)
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            REQUEST_SECONDS.observe(time.perf_counter() - start, scope["method"], path)
+            REQUESTS.inc(scope["method"], path, status[0])
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional, Union
 from datetime import datetime
 
 # Model for a News Article
@@ -45,4 +45,19 @@ class ChatResponse(BaseModel):
 # Model for scraping request
 class ScrapeRequest(BaseModel):
     source: Optional[str] = "all"      # Which news site to scrape
-    category: Optional[str] = "general"
\ No newline at end of file
+    category: Optional[str] = "general"
+
+# Model for deleting several articles (by id, by filter, or both: only ids matching the filter)
+class DeleteRequest(BaseModel):
+    ids: Optional[List[Union[int, str]]] = None   # Article ids as returned in "_id"
+    category: Optional[str] = None
+    source: Optional[str] = None
+    published_from: Optional[datetime] = None
+    published_to: Optional[datetime] = None
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "ids": ["12", "15"]
+            }
+        }
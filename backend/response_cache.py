@@ -0,0 +1,140 @@
+"""
+In-process cache of serialized read responses (GET /news, GET /search)
+
+Entries are keyed by path and query string and remember the collection
+version they were built from: every write bumps that version, so a cached
+body is never served after the data changed. The cache is an LRU bounded
+by entry count and total bytes, and entries also expire after a TTL (for
+changes made outside this process). Each body carries a strong ETag, so
+clients that send If-None-Match get a 304 without a body.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from fastapi.encoders import jsonable_encoder
+from starlette.requests import Request
+from starlette.responses import Response
+
+from metrics import registry
+
+CACHE_ENTRIES = int(os.getenv('RESPONSE_CACHE_ENTRIES', '256'))
+CACHE_BYTES = int(os.getenv('RESPONSE_CACHE_MB', '64')) * 1024 * 1024
+CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', '30'))   # seconds, 0 disables the cache
+
+
+class CachedResponse:
+    __slots__ = ("body", "etag", "headers", "version", "expires")
+
+    def __init__(self, body: bytes, headers: Dict[str, str], version: int, expires: float):
+        self.body = body
+        self.etag = '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+        self.headers = headers
+        self.version = version
+        self.expires = expires
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """True if an If-None-Match header names this body (weak comparison, as RFC 9110 asks)"""
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        tags = (tag.strip() for tag in if_none_match.split(","))
+        return any(tag.removeprefix("W/") == self.etag for tag in tags)
+
+    def to_response(self, request: Request) -> Response:
+        """The cached JSON, or 304 Not Modified when the client already has it"""
+        # no-cache: browsers keep the body but revalidate with If-None-Match every time
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache", **self.headers}
+        if self.matches(request.headers.get("if-none-match")):
+            return Response(status_code=304, headers=headers)
+        return Response(self.body, media_type="application/json", headers=headers)
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = CACHE_ENTRIES, max_bytes: int = CACHE_BYTES,
+                 ttl: float = CACHE_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()    # key -> CachedResponse, least recently used first
+        self.size = 0                   # bytes held by cached bodies
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key_for(request: Request) -> str:
+        """Cache key of a request: path plus its sorted query parameters"""
+        return request.url.path + "?" + "&".join(
+            f"{k}={v}" for k, v in sorted(request.query_params.multi_items())
+        )
+
+    def get(self, key: str, version: int) -> Optional[CachedResponse]:
+        """The cached response for key if it was built from this version and has not expired"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and (entry.version != version or entry.expires < time.monotonic()):
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, version: int, content, headers: Optional[Dict[str, str]] = None) -> CachedResponse:
+        """Serialize content once and cache it (bodies too big for the cache are only returned)"""
+        body = json.dumps(jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return self.put_body(key, version, body, headers)
+
+    def put_body(self, key: str, version: int, body: bytes, headers: Optional[Dict[str, str]] = None) -> CachedResponse:
+        """Cache an already serialized JSON body"""
+        entry = CachedResponse(body, headers or {}, version, time.monotonic() + self.ttl)
+        if self.ttl <= 0 or len(body) > self.max_bytes // 2:
+            return entry
+
+        with self.lock:
+            if key in self.entries:
+                self._drop(key)
+            self.entries[key] = entry
+            self.size += len(body)
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                self._drop(next(iter(self.entries)))
+        return entry
+
+    def _drop(self, key: str):
+        self.size -= len(self.entries.pop(key).body)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self) -> Dict:
+        """Hit/miss counts and current size"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Shared by the API endpoints
+response_cache = ResponseCache()
+
+registry.gauge("news_response_cache_entries", "Responses held in the cache", lambda: len(response_cache.entries))
+registry.gauge("news_response_cache_bytes", "Size of the cached response bodies", lambda: response_cache.size)
+registry.gauge("news_response_cache_hits_total", "Cache lookups answered from the cache",
+               lambda: response_cache.hits, kind="counter")
+registry.gauge("news_response_cache_misses_total", "Cache lookups that had to build the response",
+               lambda: response_cache.misses, kind="counter")
@@ -0,0 +1,255 @@
+"""
+Background ingestion: a job queue for /scrape plus periodic polling of every feed
+"""
+import json
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from database import get_news_collection, SEARCH_SAVE_INTERVAL, MULTI_PROCESS, CHANGES_PATH
+from shared import hold_lock
+from metrics import registry, SCRAPE_STAGE_SECONDS
+import scraper
+
+# Poll every source this often unless its registry entry sets an interval (seconds)
+DEFAULT_INTERVAL = int(os.getenv('SCRAPE_INTERVAL', '900'))
+JITTER = 0.1             # +/- share of the interval, so feeds are not hit in lockstep
+MAX_BACKOFF = 6 * 3600   # failing feeds back off exponentially up to this
+AUTO_SCRAPE = os.getenv('AUTO_SCRAPE', '1') != '0'
+KEEP_JOBS = 200          # finished jobs kept for the status endpoint
+
+# With several worker processes only one polls the feeds, and job status is shared through
+# files so GET /scrape/{job_id} works whichever worker answers
+POLL_LOCK_PATH = f"{CHANGES_PATH}.poller.lock"
+JOBS_DIR = os.getenv('NEWS_JOBS_DIR', os.path.join(os.path.dirname(__file__), 'scrape_jobs'))
+
+
+def _observe_insert(batch: List[Dict], seconds: float):
+    """Split a batch's upsert time over its sources by their share of the articles"""
+    per_source = {}
+    for article in batch:
+        per_source[article.get("source")] = per_source.get(article.get("source"), 0) + 1
+    for source, count in per_source.items():
+        SCRAPE_STAGE_SECONDS.observe(seconds * count / len(batch), "insert", source)
+
+
+def run_scrape(sources: List[Tuple[str, str, str]]) -> Dict:
+    """
+    Fetch, parse and upsert a list of sources; returns counts and the feeds report
+    """
+    report = scraper.new_scrape_report()
+    # A feed whose articles are all gone (e.g. after DELETE /news) is downloaded in full again:
+    # its validators would answer "unchanged" and nothing would be stored. Feeds that never
+    # had articles stored (empty, or every entry filtered out) keep theirs.
+    collection = get_news_collection()
+    validator_cache = scraper.validator_cache
+    validator_cache.clear([url for url, name, _ in sources
+                           if validator_cache.was_stored(url) and not collection.count_documents({"source": name})])
+    result = {"articles_scraped": 0, "inserted": 0, "updated": 0, "skipped": 0,
+              "inserted_ids": [], "feeds": report}
+    
+    # Batches are stored as they arrive, while the remaining feeds are still parsed
+    for batch in scraper.iter_scrape_batches(sources, report):
+        start = time.perf_counter()
+        saved = collection.upsert_many(batch)
+        _observe_insert(batch, time.perf_counter() - start)
+        result["articles_scraped"] += len(batch)
+        result["inserted"] += saved.inserted_count
+        result["updated"] += saved.updated_count
+        result["skipped"] += saved.skipped_count
+        result["inserted_ids"].extend(saved.inserted_ids)
+    
+    if scraper.USE_FEED_CACHE:
+        validator_cache.mark_stored([url for url, name, _ in sources if collection.count_documents({"source": name})])
+        validator_cache.save()
+    
+    if result["articles_scraped"]:
+        result["message"] = (f"Scraped {result['articles_scraped']} articles: {result['inserted']} new, "
+                             f"{result['updated']} updated, {result['skipped']} already saved")
+    elif report["skipped"] and not report["failed"]:
+        result["message"] = f"No new articles: {len(report['skipped'])} feeds unchanged since last scrape"
+    else:
+        result["message"] = "No articles found"
+    return result
+
+
+class ScrapeScheduler:
+    def __init__(self):
+        self.jobs = OrderedDict()       # job_id -> job dict
+        self.active = {}                # label -> job_id of a queued or running job
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.threads = []
+        self.next_poll = {}             # source_name -> monotonic time of the next poll
+        self.failures = {}              # source_name -> consecutive failures
+        self.poll_lock = None           # held by the one worker process that polls
+
+    # ---------- jobs ----------
+
+    def enqueue(self, label: str, sources: List[Tuple[str, str, str]]) -> Dict:
+        """
+        Queue a scrape; a request for a label that is already queued or running joins that job
+        """
+        with self.lock:
+            job_id = self.active.get(label)
+            if job_id is not None:
+                return self.jobs[job_id]
+
+            job = {
+                "job_id": uuid.uuid4().hex,
+                "label": label,
+                "status": "queued",
+                "created_at": datetime.now().isoformat(),
+                "started_at": None,
+                "finished_at": None,
+                "message": "Waiting for the scrape worker",
+                "result": None,
+                "error": None,
+            }
+            self.jobs[job["job_id"]] = job
+            self.active[label] = job["job_id"]
+            while len(self.jobs) > KEEP_JOBS:
+                oldest_id, oldest = next(iter(self.jobs.items()))
+                if oldest["status"] in ("queued", "running"):
+                    break
+                del self.jobs[oldest_id]
+                self._unpublish(oldest_id)
+
+        self._publish(job)
+        self.queue.put((job["job_id"], sources))
+        return job
+
+    def enqueue_category(self, category: str) -> Optional[Dict]:
+        sources = scraper.sources_for_category(category)
+        if sources is None:
+            return None
+        return self.enqueue(f"category:{category}", sources)
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job:
+                return dict(job)
+        if MULTI_PROCESS and len(job_id) == 32 and job_id.isalnum():
+            # Queued through another worker process
+            try:
+                with open(os.path.join(JOBS_DIR, f"{job_id}.json"), encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                return None
+        return None
+
+    def _publish(self, job: Dict):
+        """Share a job's status with the other worker processes"""
+        if not MULTI_PROCESS:
+            return
+        path = os.path.join(JOBS_DIR, f"{job['job_id']}.json")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(JOBS_DIR, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(job, f, default=str)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"❌ Could not share status of scrape job {job['job_id']}: {e}")
+
+    def _unpublish(self, job_id: str):
+        if MULTI_PROCESS:
+            try:
+                os.remove(os.path.join(JOBS_DIR, f"{job_id}.json"))
+            except OSError:
+                pass
+
+    def _worker(self):
+        while not self.stop_event.is_set():
+            try:
+                job_id, sources = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            job = self.jobs[job_id]
+            job["status"] = "running"
+            job["started_at"] = datetime.now().isoformat()
+            job["message"] = "Scraping"
+            self._publish(job)
+            try:
+                result = run_scrape(sources)
+                self._record_outcome(result["feeds"])
+                # Keep the saved search index reasonably fresh without rewriting it per feed
+                get_news_collection().save_search_index(min_interval=SEARCH_SAVE_INTERVAL)
+                job["result"] = result
+                job["message"] = result["message"]
+                job["status"] = "done" if result["articles_scraped"] or result["feeds"]["skipped"] else "failed"
+            except Exception as e:
+                print(f"❌ Scrape job {job['label']} failed: {e}")
+                job["error"] = str(e)
+                job["message"] = f"Scrape failed: {e}"
+                job["status"] = "failed"
+            finally:
+                job["finished_at"] = datetime.now().isoformat()
+                with self.lock:
+                    self.active.pop(job["label"], None)
+                self._publish(job)
+
+    # ---------- periodic polling ----------
+
+    def _interval(self, source_name: str) -> float:
+        """Poll interval with jitter and exponential backoff after failures"""
+        base = scraper.FEED_INTERVALS.get(source_name, DEFAULT_INTERVAL)
+        base = min(base * 2 ** self.failures.get(source_name, 0), MAX_BACKOFF)
+        return base * random.uniform(1 - JITTER, 1 + JITTER)
+
+    def _record_outcome(self, report: Dict):
+        """Reset backoff for sources that answered, grow it for those that failed"""
+        now = time.monotonic()
+        for name in report["scraped"] + report["skipped"]:
+            self.failures[name] = 0
+            self.next_poll[name] = now + self._interval(name)
+        for name in report["failed"]:
+            self.failures[name] = self.failures.get(name, 0) + 1
+            self.next_poll[name] = now + self._interval(name)
+
+    def _poller(self):
+        for _, name, _ in scraper.all_sources():
+            # Spread the first round over the first minute
+            self.next_poll.setdefault(name, time.monotonic() + random.uniform(0, 60))
+        while not self.stop_event.wait(1.0):
+            now = time.monotonic()
+            for source in scraper.all_sources():
+                name = source[1]
+                if self.next_poll.get(name, 0) <= now:
+                    # Not due again until the job reports back (or the interval passes)
+                    self.next_poll[name] = now + self._interval(name)
+                    self.enqueue(f"source:{name}", [source])
+
+    # ---------- lifecycle ----------
+
+    def start(self, poll: bool = AUTO_SCRAPE):
+        self.stop_event.clear()
+        if poll and MULTI_PROCESS:
+            # The first worker process to start polls for all of them
+            self.poll_lock = self.poll_lock or hold_lock(POLL_LOCK_PATH)
+            poll = self.poll_lock is not None
+        targets = [self._worker] + ([self._poller] if poll else [])
+        self.threads = [threading.Thread(target=t, daemon=True) for t in targets]
+        for thread in self.threads:
+            thread.start()
+        print(f"⏰ Scrape scheduler started (polling {'on' if poll else 'off'})")
+
+    def stop(self):
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join(timeout=5)
+        self.threads = []
+
+
+scheduler = ScrapeScheduler()
+
+registry.gauge("news_scrape_jobs_queued", "Scrape jobs waiting for the worker", lambda: scheduler.queue.qsize())
+registry.gauge("news_scrape_jobs_active", "Scrape jobs queued or running", lambda: len(scheduler.active))
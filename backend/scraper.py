@@ -1,109 +1,402 @@
 import requests
-from bs4 import BeautifulSoup
 from datetime import datetime
-from typing import List, Dict
+from typing import Iterator, List, Dict, Optional, Tuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+import json
+import multiprocessing
+import os
+import threading
+import time
 import feedparser
+import httpx
+from feed_cache import FeedCache, body_hash
+from cleaner import clean_html
+from metrics import SCRAPE_STAGE_SECONDS
 
-def scrape_rss_feed(feed_url: str, source_name: str, category: str = "general") -> List[Dict]:
+# Feed registry file: every source with its category (and optional poll interval)
+FEEDS_FILE = os.getenv('NEWS_FEEDS_FILE', os.path.join(os.path.dirname(__file__), 'feeds.json'))
+FEEDS = {}            # category -> [(feed_url, source_name)]
+FEED_INTERVALS = {}   # source_name -> poll interval in seconds, when the registry sets one
+
+# Parse settings: feedparser is pure Python, so big scrapes parse in worker processes
+MAX_ENTRIES_PER_FEED = 10
+PARSE_WORKERS = int(os.getenv('PARSE_WORKERS', str(os.cpu_count() or 1)))
+PARSE_POOL_MIN_FEEDS = 4  # smaller scrapes parse in the fetch threads
+SCRAPE_BATCH = 500        # articles handed to the database writer at a time
+
+# Fetch settings
+FETCH_TIMEOUT = 10.0      # Total seconds allowed per feed download
+MAX_FETCH_WORKERS = 8     # Feeds fetched at the same time
+PER_HOST_LIMIT = 2        # Concurrent requests against a single host
+USER_AGENT = "NewsPortal/1.0 (+https://github.com/avoithic-aiesh/news-portal)"
+
+# Conditional GET: skip feeds that have not changed since the last scrape
+USE_FEED_CACHE = True
+validator_cache = FeedCache()
+
+# One pooled HTTP client shared by every fetch (keeps connections alive)
+_http_client = None
+_client_lock = threading.Lock()
+_host_semaphores = {}
+_parse_pool = None
+
+
+def load_feeds(path: str = FEEDS_FILE) -> Dict[str, List[Tuple[str, str]]]:
+    """
+    Load the feed registry into FEEDS and FEED_INTERVALS
+    
+    The file holds {"feeds": [{"name", "url", "category", "interval"?, "enabled"?}, ...]}.
+    """
+    with open(path, encoding="utf-8") as f:
+        registry = json.load(f)
+    
+    feeds, intervals = {}, {}
+    for entry in registry["feeds"]:
+        if not entry.get("enabled", True):
+            continue
+        feeds.setdefault(entry.get("category", "general"), []).append((entry["url"], entry["name"]))
+        if entry.get("interval"):
+            intervals[entry["name"]] = int(entry["interval"])
+    
+    # Update in place so modules holding a reference see the new registry
+    FEEDS.clear()
+    FEEDS.update(feeds)
+    FEED_INTERVALS.clear()
+    FEED_INTERVALS.update(intervals)
+    return FEEDS
+
+
+try:
+    load_feeds()
+except (OSError, ValueError, KeyError) as e:
+    print(f"❌ Could not load feed registry {FEEDS_FILE}: {e}")
+
+
+def get_http_client() -> httpx.Client:
+    """
+    Get the shared HTTP client, creating it on first use
+    """
+    global _http_client
+    with _client_lock:
+        if _http_client is None:
+            _http_client = httpx.Client(
+                headers={"User-Agent": USER_AGENT},
+                follow_redirects=True,
+                timeout=FETCH_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=MAX_FETCH_WORKERS * PER_HOST_LIMIT,
+                    max_keepalive_connections=MAX_FETCH_WORKERS
+                )
+            )
+        return _http_client
+
+
+def close_http_client():
+    """
+    Close the shared HTTP client
+    """
+    global _http_client
+    with _client_lock:
+        if _http_client is not None:
+            _http_client.close()
+            _http_client = None
+
+
+def get_parse_pool() -> ProcessPoolExecutor:
+    """
+    Get the worker processes that parse feeds, starting them on first use
+    """
+    global _parse_pool
+    with _client_lock:
+        # A pool whose worker died stays broken, so start a fresh one
+        if _parse_pool is None or _parse_pool._broken:
+            # spawn, not fork: forking a process with server threads can copy held locks
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=PARSE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _parse_pool
+
+
+def close_parse_pool():
+    """
+    Stop the parser processes
+    """
+    global _parse_pool
+    with _client_lock:
+        if _parse_pool is not None:
+            _parse_pool.shutdown(cancel_futures=True)
+            _parse_pool = None
+
+
+def _host_semaphore(url: str) -> threading.Semaphore:
+    """
+    Get the semaphore limiting concurrent requests to the host of a URL
+    """
+    host = urlparse(url).netloc.lower()
+    with _client_lock:
+        if host not in _host_semaphores:
+            _host_semaphores[host] = threading.Semaphore(PER_HOST_LIMIT)
+        return _host_semaphores[host]
+
+
+def fetch_feed(feed_url: str, timeout: float = FETCH_TIMEOUT) -> Tuple[Optional[bytes], Dict]:
+    """
+    Download a feed body, giving up once the whole download takes longer than timeout
+    
+    Returns (body, validators). body is None when the feed has not changed
+    since the validators in the feed cache were stored.
+    """
+    cached = validator_cache.get(feed_url) if USE_FEED_CACHE else None
+    headers = validator_cache.conditional_headers(feed_url) if cached else {}
+    
+    with _host_semaphore(feed_url):
+        deadline = time.monotonic() + timeout
+        chunks = []
+        with get_http_client().stream("GET", feed_url, headers=headers, timeout=timeout) as response:
+            if response.status_code == 304:
+                return None, cached
+            response.raise_for_status()
+            # httpx timeouts apply per read, so also enforce a deadline for the whole body
+            for chunk in response.iter_bytes():
+                chunks.append(chunk)
+                if time.monotonic() > deadline:
+                    raise httpx.TimeoutException(f"Feed took longer than {timeout}s: {feed_url}")
+            validators = {
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified"),
+            }
+    
+    body = b"".join(chunks)
+    validators["body_hash"] = body_hash(body)
+    
+    # Server ignored the validators but sent the same bytes again
+    if cached and cached.get("body_hash") == validators["body_hash"]:
+        validator_cache.update(feed_url, validators)
+        return None, validators
+    
+    return body, validators
+
+
+def new_scrape_report() -> Dict[str, List[str]]:
     """
-    Scrape articles from an RSS feed
+    Empty report of which sources were scraped, skipped (unchanged) or failed
     """
+    return {"scraped": [], "skipped": [], "failed": []}
+
+
+def parse_feed(content: bytes, feed_url: str, source_name: str, category: str = "general",
+               clean: bool = True) -> List[Dict]:
+    """
+    Turn a downloaded feed body into article dicts (runs in the parser processes)
+    """
+    # content-location lets feedparser resolve relative links
+    feed = feedparser.parse(content, response_headers={"content-location": feed_url})
+    if feed.bozo and not feed.entries:
+        raise ValueError(f"Not a feed: {feed.get('bozo_exception')}")
+    
     articles = []
+    for entry in feed.entries[:MAX_ENTRIES_PER_FEED]:  # Get latest articles
+        article = {
+            "title": entry.get("title", "No title"),
+            "content": entry.get("summary", entry.get("description", "No content available")),
+            "source": source_name,
+            "url": entry.get("link", ""),
+            "published_date": None,
+            "category": category,
+            "image_url": None
+        }
+        
+        # Try to get published date (convert to string for JSON compatibility)
+        if hasattr(entry, 'published_parsed') and entry.published_parsed:
+            try:
+                dt = datetime(*entry.published_parsed[:6])
+                article["published_date"] = dt.isoformat()  # ← FIXED: Convert to string
+            except:
+                pass
+        
+        # Try to get image
+        if hasattr(entry, 'media_content') and entry.media_content:
+            article["image_url"] = entry.media_content[0].get('url', None)
+        elif hasattr(entry, 'media_thumbnail') and entry.media_thumbnail:
+            article["image_url"] = entry.media_thumbnail[0].get('url', None)
+        
+        # Clean the content (remove HTML tags)
+        if clean:
+            article["content"] = clean_html(article["content"])
+        
+        articles.append(article)
+    return articles
+
+def scrape_rss_feed(feed_url: str, source_name: str, category: str = "general",
+                    content: Optional[bytes] = None, report: Optional[Dict] = None,
+                    clean: bool = True) -> List[Dict]:
+    """
+    Scrape articles from an RSS feed (pass content to parse an already downloaded body)
+    """
+    validators = None
     
     try:
-        # Parse the RSS feed
-        feed = feedparser.parse(feed_url)
+        if content is None:
+            content, validators = fetch_feed(feed_url)
+            if content is None:
+                print(f"⏭️ {source_name} unchanged since last scrape, skipped")
+                if report is not None:
+                    report["skipped"].append(source_name)
+                return []
         
-        # Extract articles from feed entries
-        for entry in feed.entries[:10]:  # Get latest 10 articles
-            article = {
-                "title": entry.get("title", "No title"),
-                "content": entry.get("summary", entry.get("description", "No content available")),
-                "source": source_name,
-                "url": entry.get("link", ""),
-                "published_date": None,
-                "category": category,
-                "image_url": None
-            }
-            
-            # Try to get published date (convert to string for JSON compatibility)
-            if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                try:
-                    dt = datetime(*entry.published_parsed[:6])
-                    article["published_date"] = dt.isoformat()  # ← FIXED: Convert to string
-                except:
-                    pass
-            
-            # Try to get image
-            if hasattr(entry, 'media_content') and entry.media_content:
-                article["image_url"] = entry.media_content[0].get('url', None)
-            elif hasattr(entry, 'media_thumbnail') and entry.media_thumbnail:
-                article["image_url"] = entry.media_thumbnail[0].get('url', None)
-            
-            # Clean the content (remove HTML tags)
-            article["content"] = clean_html(article["content"])
-            
-            articles.append(article)
+        articles = parse_feed(content, feed_url, source_name, category, clean=clean)
+        
+        # Only remember validators once the body was processed successfully
+        if validators and USE_FEED_CACHE:
+            validator_cache.update(feed_url, validators)
         
         print(f"✅ Scraped {len(articles)} articles from {source_name}")
+        if report is not None:
+            report["scraped"].append(source_name)
         return articles
         
     except Exception as e:
         print(f"❌ Error scraping {source_name}: {e}")
+        if report is not None:
+            report["failed"].append(source_name)
         return []
 
-def clean_html(html_text: str) -> str:
+def _fetch_source(feed_url: str, source_name: str) -> Tuple[Optional[bytes], Optional[Dict], Optional[Exception]]:
+    """fetch_feed for the pipeline: (body, validators, error) instead of raising"""
+    start = time.perf_counter()
+    try:
+        body, validators = fetch_feed(feed_url)
+        return body, validators, None
+    except Exception as e:
+        return None, None, e
+    finally:
+        SCRAPE_STAGE_SECONDS.observe(time.perf_counter() - start, "fetch", source_name)
+
+def _parse_source(content: bytes, feed_url: str, source_name: str,
+                  category: str) -> Tuple[List[Dict], float, float]:
     """
-    Remove HTML tags and clean text
+    parse_feed for the pipeline: (articles, parse seconds, clean seconds)
+    
+    Timed where it runs and handed back, since parser processes have their own metrics.
+    """
+    start = time.perf_counter()
+    articles = parse_feed(content, feed_url, source_name, category, clean=False)
+    parsed = time.perf_counter()
+    for article in articles:
+        article["content"] = clean_html(article["content"])
+    return articles, parsed - start, time.perf_counter() - parsed
+
+def iter_scrape_batches(sources_to_scrape: List[Tuple[str, str, str]],
+                        report: Optional[Dict] = None,
+                        batch_size: int = SCRAPE_BATCH) -> Iterator[List[Dict]]:
     """
-    if not html_text:
-        return ""
+    Fetch and parse (feed_url, source_name, category) sources, yielding
+    articles in batches as feeds finish
     
-    soup = BeautifulSoup(html_text, 'html.parser')
-    text = soup.get_text(separator=' ', strip=True)
+    Downloads run in threads. Each body goes straight to the parser (worker
+    processes for big scrapes), so parsing overlaps with downloads still in
+    flight and the caller can store one batch while the next is parsed.
+    """
+    if not sources_to_scrape:
+        return
+    if report is None:
+        report = new_scrape_report()
+    use_pool = PARSE_WORKERS > 1 and len(sources_to_scrape) >= PARSE_POOL_MIN_FEEDS
+    batch = []
     
-    # Limit content to 500 characters for summary
-    if len(text) > 500:
-        text = text[:497] + "..."
+    # Total time follows the slowest feed instead of the sum of all feeds
+    workers = min(MAX_FETCH_WORKERS, len(sources_to_scrape))
+    with ThreadPoolExecutor(max_workers=workers) as fetchers:
+        parser = get_parse_pool() if use_pool else fetchers
+        fetches = {fetchers.submit(_fetch_source, source[0], source[1]): source for source in sources_to_scrape}
+        parses = {}
+        pending = set(fetches)
+        
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in fetches:
+                    feed_url, source_name, category = source = fetches[future]
+                    body, validators, error = future.result()
+                    if error is not None:
+                        print(f"❌ Error scraping {source_name}: {error}")
+                        report["failed"].append(source_name)
+                    elif body is None:
+                        print(f"⏭️ {source_name} unchanged since last scrape, skipped")
+                        report["skipped"].append(source_name)
+                    else:
+                        parsing = parser.submit(_parse_source, body, feed_url, source_name, category)
+                        parses[parsing] = (source, validators)
+                        pending.add(parsing)
+                    continue
+                
+                (feed_url, source_name, _), validators = parses.pop(future)
+                error = future.exception()
+                if error is not None:
+                    print(f"❌ Error scraping {source_name}: {error}")
+                    report["failed"].append(source_name)
+                    continue
+                articles, parse_seconds, clean_seconds = future.result()
+                SCRAPE_STAGE_SECONDS.observe(parse_seconds, "parse", source_name)
+                SCRAPE_STAGE_SECONDS.observe(clean_seconds, "clean", source_name)
+                # Only remember validators once the body was processed successfully
+                if validators and USE_FEED_CACHE:
+                    validator_cache.update(feed_url, validators)
+                print(f"✅ Scraped {len(articles)} articles from {source_name}")
+                report["scraped"].append(source_name)
+                batch.extend(articles)
+            
+            while len(batch) >= batch_size:
+                yield batch[:batch_size]
+                batch = batch[batch_size:]
     
-    return text
+    if batch:
+        yield batch
+    if USE_FEED_CACHE:
+        validator_cache.save()
 
-def scrape_multiple_sources(category: str = "all") -> List[Dict]:
+def scrape_sources(sources_to_scrape: List[Tuple[str, str, str]],
+                   report: Optional[Dict] = None) -> List[Dict]:
     """
-    Scrape from multiple news sources
+    Scrape a list of (feed_url, source_name, category) concurrently
     """
     all_articles = []
-    
-    # Define RSS feeds for different sources
-    feeds = {
-        "technology": [
-            ("https://techcrunch.com/feed/", "TechCrunch"),
-            ("https://www.theverge.com/rss/index.xml", "The Verge"),
-        ],
-        "general": [
-            ("http://rss.cnn.com/rss/cnn_topstories.rss", "CNN"),
-            ("http://feeds.bbci.co.uk/news/rss.xml", "BBC News"),
-        ],
-        "business": [
-            ("https://feeds.bloomberg.com/markets/news.rss", "Bloomberg"),
-        ]
-    }
-    
-    # Determine which feeds to scrape
+    for batch in iter_scrape_batches(sources_to_scrape, report):
+        all_articles.extend(batch)
+    return all_articles
+
+def sources_for_category(category: str) -> Optional[List[Tuple[str, str, str]]]:
+    """
+    (feed_url, source_name, category) list for a scrape category, None if unknown
+    """
     if category == "all":
         sources_to_scrape = []
-        for cat_feeds in feeds.values():
+        for cat_feeds in FEEDS.values():
             sources_to_scrape.extend([(url, name, "general") for url, name in cat_feeds])
-    elif category in feeds:
-        sources_to_scrape = [(url, name, category) for url, name in feeds[category]]
-    else:
+        return sources_to_scrape
+    if category in FEEDS:
+        return [(url, name, category) for url, name in FEEDS[category]]
+    return None
+
+def all_sources() -> List[Tuple[str, str, str]]:
+    """
+    Every registered feed with its own category
+    """
+    return [(url, name, category) for category, feeds in FEEDS.items() for url, name in feeds]
+
+def scrape_multiple_sources(category: str = "all", report: Optional[Dict] = None) -> List[Dict]:
+    """
+    Scrape from multiple news sources
+    """
+    # Determine which feeds to scrape
+    sources_to_scrape = sources_for_category(category)
+    if sources_to_scrape is None:
         print(f"❌ Unknown category: {category}")
         return []
     
-    # Scrape each source
-    for feed_url, source_name, cat in sources_to_scrape:
-        articles = scrape_rss_feed(feed_url, source_name, cat)
-        all_articles.extend(articles)
+    all_articles = scrape_sources(sources_to_scrape, report)
     
     print(f"🎉 Total articles scraped: {len(all_articles)}")
     return all_articles
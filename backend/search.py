@@ -0,0 +1,363 @@
+"""
+Incremental inverted index over article title + content with BM25 ranking
+
+Postings are kept per term as two parallel arrays (doc ids, term
+frequencies) sorted by doc id, so new articles are appends and the whole
+index packs into a small binary file that loads without re-tokenizing.
+"""
+import bisect
+import heapq
+import json
+import math
+import os
+import re
+import struct
+import zlib
+from array import array
+
+TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have he her his i in is it its of on or our
+she that the their them they this to was we were what when where which who will with
+you your not no can about after over than then there these those been into more new
+said says also would could just one
+""".split())
+
+TITLE_WEIGHT = 2        # title words count this many times
+MAX_PREFIX_TERMS = 16   # most frequent matching terms a prefix query expands to
+K1 = 1.2
+B = 0.75
+
+# Terms in more documents than this get a "head": their best postings by
+# impact, so a query can usually be answered without walking every posting
+HEAD_MIN_DF = 4096
+HEAD_SIZE = 1000
+HEAD_DRIFT = 0.25       # rebuild a head once the average length moved this much
+
+FILE_MAGIC = b"NPSI"
+FILE_VERSION = 1
+
+
+def tokenize(text):
+    """
+    Lowercase word tokens without stopwords
+    """
+    return [t for t in TOKEN_RE.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def document_terms(doc):
+    """
+    term -> frequency for an article (title words weighted up)
+    """
+    counts = {}
+    for term in tokenize(doc.get('title') or ''):
+        counts[term] = counts.get(term, 0) + TITLE_WEIGHT
+    for term in tokenize(doc.get('content') or ''):
+        counts[term] = counts.get(term, 0) + 1
+    return counts
+
+
+def impact(tf, length, avg_len):
+    """
+    BM25 term-frequency part of a posting's score (multiply by the term's weight)
+    """
+    return tf / (tf + K1 * (1 - B) + K1 * B * length / avg_len)
+
+
+def document_checksum(doc_id, doc):
+    """
+    Stable checksum of the indexed text, used to check a saved index still matches the data
+    """
+    text = f"{doc_id}\x1f{doc.get('title') or ''}\x1f{doc.get('content') or ''}"
+    return zlib.crc32(text.encode('utf-8'))
+
+
+class SearchIndex:
+    def __init__(self):
+        self.postings = {}          # term -> (array('I') doc_ids, array('H') tfs)
+        self.doc_len = {}           # doc_id -> number of indexed tokens
+        self.total_len = 0
+        self.signature = 0          # xor of document checksums
+        self._vocab = None          # sorted terms for prefix lookups, rebuilt lazily
+        self.heads = {}             # term -> [ascending (impact, doc_id), floor, avg_len, {doc_id: tf}]
+        self.dirty = False
+
+    # ---------- updates ----------
+
+    def add(self, doc_id, doc):
+        """Index a new document (use update() for one that is already indexed)"""
+        terms = document_terms(doc)
+        length = sum(terms.values())
+        for term, tf in terms.items():
+            entry = self.postings.get(term)
+            if entry is None:
+                entry = self.postings[term] = (array('I'), array('H'))
+                self._vocab = None
+            ids, tfs = entry
+            tf = min(tf, 65535)
+            if not ids or ids[-1] < doc_id:
+                ids.append(doc_id)
+                tfs.append(tf)
+            else:
+                i = bisect.bisect_left(ids, doc_id)
+                ids.insert(i, doc_id)
+                tfs.insert(i, tf)
+            head = self.heads.get(term)
+            if head is not None:
+                entries, floor, avg_len, head_tfs = head
+                score = impact(tf, length, avg_len)
+                if score > floor:
+                    bisect.insort(entries, (score, doc_id))
+                    head_tfs[doc_id] = tf
+                    if len(entries) > HEAD_SIZE:
+                        # The dropped posting joins the rest, so the bound on them rises
+                        dropped, dropped_id = entries.pop(0)
+                        del head_tfs[dropped_id]
+                        head[1] = max(floor, dropped)
+        self.doc_len[doc_id] = length
+        self.total_len += length
+        self.signature ^= document_checksum(doc_id, doc)
+        self.dirty = True
+
+    def remove(self, doc_id, doc):
+        """Remove a document; doc must be the version that was indexed"""
+        length = self.doc_len.pop(doc_id, None)
+        if length is None:
+            return
+        for term, tf in document_terms(doc).items():
+            head = self.heads.get(term)
+            if head is not None:
+                entries = head[0]
+                i = bisect.bisect_left(entries, (impact(min(tf, 65535), length, head[2]), doc_id))
+                if i < len(entries) and entries[i][1] == doc_id:
+                    del entries[i]
+                    del head[3][doc_id]
+                    if len(entries) < HEAD_SIZE // 2:
+                        del self.heads[term]
+            entry = self.postings.get(term)
+            if entry is None:
+                continue
+            ids, tfs = entry
+            i = bisect.bisect_left(ids, doc_id)
+            if i < len(ids) and ids[i] == doc_id:
+                del ids[i]
+                del tfs[i]
+                if not ids:
+                    del self.postings[term]
+                    self.heads.pop(term, None)
+                    self._vocab = None
+        self.total_len -= length
+        self.signature ^= document_checksum(doc_id, doc)
+        self.dirty = True
+
+    def update(self, doc_id, old, new):
+        """Re-index a document whose title or content changed"""
+        if document_checksum(doc_id, old) != document_checksum(doc_id, new):
+            self.remove(doc_id, old)
+            self.add(doc_id, new)
+
+    def clear(self):
+        self.__init__()
+        self.dirty = True
+
+    # ---------- queries ----------
+
+    def _expand(self, prefix):
+        """Most frequent vocabulary terms starting with prefix"""
+        if self._vocab is None:
+            self._vocab = sorted(self.postings)
+        start = bisect.bisect_left(self._vocab, prefix)
+        matches = []
+        for term in self._vocab[start:start + 1000]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        if len(matches) > MAX_PREFIX_TERMS:
+            matches = heapq.nlargest(MAX_PREFIX_TERMS, matches, key=lambda t: len(self.postings[t][0]))
+        return matches
+
+    def parse_query(self, query, prefix=False):
+        """
+        Query terms; `word*` (or the last word when prefix=True) matches as a prefix
+        """
+        words = TOKEN_RE.findall(query.lower())
+        star = set(m.group(1).lower() for m in re.finditer(r"([^\W_]+)\*", query))
+        terms = []
+        for i, word in enumerate(words):
+            if word in star or (prefix and i == len(words) - 1):
+                terms.extend(self._expand(word))
+            elif len(word) > 1 and word not in STOPWORDS:
+                terms.append(word)
+        return list(dict.fromkeys(terms))
+
+    def _head(self, term, avg_len):
+        """The term's best postings by impact, built on first use"""
+        head = self.heads.get(term)
+        if head is None or abs(avg_len - head[2]) > HEAD_DRIFT * head[2]:
+            ids, tfs = self.postings[term]
+            doc_len = self.doc_len
+            best = heapq.nlargest(
+                HEAD_SIZE + 1,
+                ((impact(tf, doc_len[doc_id], avg_len), doc_id) for doc_id, tf in zip(ids, tfs))
+            )
+            floor = best.pop()[0] if len(best) > HEAD_SIZE else 0.0
+            tf_of = dict(zip(ids, tfs))
+            head = self.heads[term] = [best[::-1], floor, avg_len, {d: tf_of[d] for _, d in best}]
+        return head
+
+    def search(self, query, limit=10, prefix=False, accept=None, exact=False):
+        """
+        Top `limit` (doc_id, score) pairs by BM25; accept(doc_id) can filter results
+
+        Rare terms are scored in full. Common terms are only scored for a
+        candidate set: their heads (champion lists) plus every document a rare
+        term matched. When no document outside that set can reach the result
+        it is exact; otherwise it is the champion-list approximation, or with
+        exact=True every posting is scored.
+        """
+        terms = [t for t in self.parse_query(query, prefix) if t in self.postings]
+        n = len(self.doc_len)
+        if not terms or n == 0:
+            return []
+        avg_len = self.total_len / n
+        doc_len = self.doc_len
+        scores = {}
+        get = scores.get
+
+        weights = {}
+        common = []
+        for term in terms:
+            ids, tfs = self.postings[term]
+            df = len(ids)
+            weights[term] = math.log(1 + (n - df + 0.5) / (df + 0.5)) * (K1 + 1)
+            if df > HEAD_MIN_DF and limit <= HEAD_SIZE:
+                common.append(term)
+                continue
+            weight = weights[term]
+            for doc_id, tf in zip(ids, tfs):
+                scores[doc_id] = get(doc_id, 0.0) + weight * impact(tf, doc_len[doc_id], avg_len)
+
+        if common:
+            # A document outside the candidates has no rare term and each common
+            # term from outside its head, so it scores at most the sum of the floors
+            bound = 0.0
+            candidates = set(scores)
+            for term in common:
+                entries, floor, head_avg, _ = self._head(term, avg_len)
+                # Impacts were computed with head_avg; a larger average can only raise them
+                bound += weights[term] * floor * max(1.0, avg_len / head_avg)
+                candidates.update(doc_id for _, doc_id in entries)
+
+            for term in common:
+                ids, tfs = self.postings[term]
+                head_tfs = self.heads[term][3]
+                weight = weights[term]
+                for doc_id in candidates:
+                    tf = head_tfs.get(doc_id)
+                    if tf is None:
+                        i = bisect.bisect_left(ids, doc_id)
+                        if i == len(ids) or ids[i] != doc_id:
+                            continue
+                        tf = tfs[i]
+                    scores[doc_id] = get(doc_id, 0.0) + weight * impact(tf, doc_len[doc_id], avg_len)
+
+            top = self._top(scores, limit, accept)
+            if len(top) == limit and (top[-1][1] >= bound or not exact):
+                return top
+
+            # Not provably exact: score every posting of every term
+            scores = {}
+            get = scores.get
+            for term in terms:
+                ids, tfs = self.postings[term]
+                weight = weights[term]
+                for doc_id, tf in zip(ids, tfs):
+                    scores[doc_id] = get(doc_id, 0.0) + weight * impact(tf, doc_len[doc_id], avg_len)
+
+        return self._top(scores, limit, accept)
+
+    @staticmethod
+    def _top(scores, limit, accept):
+        items = scores.items()
+        if accept is not None:
+            items = ((doc_id, score) for doc_id, score in items if accept(doc_id))
+        return heapq.nlargest(limit, items, key=lambda item: item[1])
+
+    # ---------- persistence ----------
+
+    def save(self, path):
+        """
+        Write the index as: magic, header length, JSON header, zlib-compressed arrays
+        """
+        terms = sorted(self.postings)
+        counts = array('I', (len(self.postings[t][0]) for t in terms))
+        all_ids = array('I')
+        all_tfs = array('H')
+        for term in terms:
+            ids, tfs = self.postings[term]
+            all_ids.extend(ids)
+            all_tfs.extend(tfs)
+        doc_ids = array('I', sorted(self.doc_len))
+        doc_lens = array('I', (self.doc_len[d] for d in doc_ids))
+
+        blobs = [
+            "\n".join(terms).encode('utf-8'),
+            counts.tobytes(), all_ids.tobytes(), all_tfs.tobytes(),
+            doc_ids.tobytes(), doc_lens.tobytes(),
+        ]
+        header = json.dumps({
+            "version": FILE_VERSION,
+            "signature": self.signature,
+            "total_len": self.total_len,
+            "sizes": [len(b) for b in blobs],
+        }).encode('utf-8')
+
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(FILE_MAGIC + struct.pack('<I', len(header)) + header)
+            f.write(zlib.compress(b"".join(blobs), 1))
+        os.replace(tmp_path, path)
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path):
+        """Read an index written by save(); None if the file is missing or unreadable"""
+        try:
+            with open(path, 'rb') as f:
+                if f.read(4) != FILE_MAGIC:
+                    return None
+                header = json.loads(f.read(struct.unpack('<I', f.read(4))[0]))
+                if header.get("version") != FILE_VERSION:
+                    return None
+                data = zlib.decompress(f.read())
+        except (OSError, ValueError, zlib.error, struct.error):
+            return None
+
+        blobs = []
+        offset = 0
+        for size in header["sizes"]:
+            blobs.append(data[offset:offset + size])
+            offset += size
+        terms = blobs[0].decode('utf-8').split("\n") if blobs[0] else []
+        counts, all_ids, all_tfs, doc_ids, doc_lens = (array(code) for code in 'IIHII')
+        for arr, blob in zip((counts, all_ids, all_tfs, doc_ids, doc_lens), blobs[1:]):
+            arr.frombytes(blob)
+
+        index = cls()
+        start = 0
+        for term, count in zip(terms, counts):
+            index.postings[term] = (all_ids[start:start + count], all_tfs[start:start + count])
+            start += count
+        index.doc_len = dict(zip(doc_ids, doc_lens))
+        index.total_len = header["total_len"]
+        index.signature = header["signature"]
+        return index
+
+    @staticmethod
+    def signature_of(docs):
+        """Signature a complete index over docs (doc_id -> document) would have"""
+        signature = 0
+        for doc_id, doc in docs.items():
+            signature ^= document_checksum(doc_id, doc)
+        return signature
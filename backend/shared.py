@@ -0,0 +1,152 @@
+"""
+Coordination between API worker processes that share one database
+(uvicorn --workers N with NEWS_MULTI_PROCESS=1)
+
+Every worker keeps its own in-memory indexes, so two things are shared
+through small files next to the database:
+
+- a ProcessLock (flock) that makes writes from all workers take turns, so
+  ids are handed out once and no write is lost to a stale copy;
+- a ChangeJournal, an append-only list of (op, doc_id, seq) records that
+  every write adds to (seq is the change sequence number GET /news/changes
+  hands out, so every worker numbers a write the same way). Before serving a read a worker looks at the journal's
+  size (one stat call) and, when it grew, re-reads just those documents.
+"""
+import os
+import struct
+import threading
+from typing import List, Tuple
+
+try:
+    import fcntl
+except ImportError:   # Windows: multi-process mode is not available
+    fcntl = None
+
+OP_UPSERT = 1         # document inserted or changed, re-read it from storage
+OP_DELETE = 2         # document removed
+OP_CLEAR = 3          # every document removed
+RECORD = struct.Struct("<BQQ")   # op, doc_id, change sequence number
+
+ROTATE_BYTES = 64 * 1024 * 1024   # start a fresh journal past this size (workers reload once)
+
+
+class ProcessLock:
+    """
+    Exclusive lock shared by every process that opens the same lock file
+
+    Re-entrant inside a process: nested `with` blocks only count.
+    """
+    def __init__(self, path: str):
+        if fcntl is None:
+            raise RuntimeError("Multi-process mode needs fcntl (Linux/macOS)")
+        self.path = path
+        self.file = open(path, "a+b")
+        self.thread_lock = threading.RLock()
+        self.depth = 0
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        if self.depth == 0:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+        self.depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self.depth -= 1
+        if self.depth == 0:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        self.thread_lock.release()
+
+    def close(self):
+        self.file.close()
+
+
+def hold_lock(path: str):
+    """
+    Take an exclusive lock on path without waiting and keep it for the life
+    of the process; returns the open file, or None if another process has it
+    """
+    if fcntl is None:
+        return None
+    handle = open(path, "a+b")
+    try:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return None
+    return handle
+
+
+class ChangeJournal:
+    """
+    Shared append-only list of writes; each process tracks how far it has read
+    """
+    def __init__(self, path: str, rotate_bytes: int = ROTATE_BYTES):
+        self.path = path
+        self.rotate_bytes = rotate_bytes
+        self.lock = ProcessLock(f"{path}.lock")
+        self.inode = None
+        self.offset = 0
+
+    def _stat(self):
+        try:
+            return os.stat(self.path)
+        except FileNotFoundError:
+            return None
+
+    def mark(self):
+        """Remember the current end; call before loading the full table (under self.lock)"""
+        if self._stat() is None:
+            open(self.path, "ab").close()
+        st = self._stat()
+        self.inode = st.st_ino
+        self.offset = st.st_size
+
+    def changed(self) -> bool:
+        """Cheap check (one stat) for writes this process has not read yet"""
+        st = self._stat()
+        if st is None:
+            return self.inode is not None
+        return st.st_ino != self.inode or st.st_size > self.offset
+
+    def read_new(self) -> Tuple[List[Tuple[int, int, int]], bool]:
+        """
+        Records written since the last call, and whether the journal was
+        replaced (then the caller must reload everything and call mark())
+        """
+        st = self._stat()
+        if st is None or st.st_ino != self.inode:
+            return [], st is not None or self.inode is not None
+        if st.st_size <= self.offset:
+            return [], False
+
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(st.st_size - self.offset)
+        # A record still being appended is picked up next time
+        whole = len(data) - len(data) % RECORD.size
+        self.offset += whole
+        return list(RECORD.iter_unpack(data[:whole])), False
+
+    def append(self, changes: List[Tuple[int, int, int]]):
+        """Record (op, doc_id, seq) writes (under self.lock, after catching up with read_new)"""
+        if not changes:
+            return
+        data = b"".join(RECORD.pack(op, doc_id, seq) for op, doc_id, seq in changes)
+        with open(self.path, "ab") as f:
+            f.write(data)
+        st = self._stat()
+        self.inode = st.st_ino
+        self.offset = st.st_size
+        if st.st_size > self.rotate_bytes:
+            self.rotate()
+
+    def rotate(self):
+        """Replace the journal with an empty one; other workers reload once (under self.lock)"""
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        open(tmp_path, "wb").close()
+        os.replace(tmp_path, self.path)
+        self.mark()
+
+    def close(self):
+        self.lock.close()
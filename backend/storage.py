@@ -0,0 +1,466 @@
+"""
+Storage backends behind CollectionWrapper
+
+Every backend stores plain article dicts under integer ids that only grow,
+even across deletes, truncation and restarts (the change log and delta sync
+never see an id come back), so the in-memory indexes in database.py work
+the same on all of them. Other tables (chat history) are backends too.
+"""
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import certifi
+import pymongo
+from pymongo import ReturnDocument
+from tinydb import TinyDB
+from tinydb.storages import Storage
+
+from logstore import AppendOnlyLog
+
+
+class StorageBackend:
+    """
+    Interface every backend implements (ids are ints)
+    """
+    name = "base"
+
+    def load(self):
+        """Yield (doc_id, document) for every stored document, oldest first"""
+        raise NotImplementedError
+
+    def get(self, doc_id):
+        """Read one document, None if it does not exist"""
+        raise NotImplementedError
+
+    def get_many(self, doc_ids):
+        """Read several documents: {doc_id: document} for the ones that exist"""
+        found = {}
+        for doc_id in doc_ids:
+            doc = self.get(doc_id)
+            if doc is not None:
+                found[doc_id] = doc
+        return found
+
+    def refresh(self):
+        """Forget cached state another process may have changed (before a write)"""
+
+    def insert(self, documents):
+        """Store documents and return their new ids"""
+        raise NotImplementedError
+
+    def update(self, doc_id, fields):
+        """Set fields on one document"""
+        raise NotImplementedError
+
+    def update_many(self, updates):
+        """Apply a list of (doc_id, fields)"""
+        for doc_id, fields in updates:
+            self.update(doc_id, fields)
+
+    def remove(self, doc_ids):
+        """Delete documents, returns how many existed"""
+        raise NotImplementedError
+
+    def truncate(self):
+        """Delete every document"""
+        raise NotImplementedError
+
+    def count(self):
+        raise NotImplementedError
+
+    def open_table(self, name):
+        """Backend of the same kind for another table in the same database (chat history)"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class AtomicJSONStorage(Storage):
+    """
+    TinyDB storage that replaces the JSON file in one step (temp file + rename)
+
+    A crash or a second writer mid-write leaves the old or the new file,
+    never a truncated one. With fsync=False the OS decides when data hits disk.
+    """
+    def __init__(self, path, fsync=True):
+        self.path = path
+        self.fsync = fsync
+
+    def read(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                content = f.read()
+        except FileNotFoundError:
+            return None
+        return json.loads(content) if content.strip() else None
+
+    def write(self, data):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+class TinyDBBackend(StorageBackend):
+    """
+    JSON file through TinyDB (default, no server needed)
+
+    TinyDB numbers documents from the highest id left in the table, so every
+    delete also saves the highest id handed out so far in a small table of
+    its own, in the same write of the file.
+    """
+    name = "tinydb"
+
+    def __init__(self, path=None, table="news_articles", storage=None, fsync=True, db=None):
+        if db is None:
+            db = TinyDB(storage=storage) if storage else TinyDB(path, storage=AtomicJSONStorage, fsync=fsync)
+        self.db = db
+        self.table = self.db.table(table)
+        self.last_ids = self.db.table("last_ids")
+
+    def _next_id(self, tables):
+        """Next id to hand out: TinyDB's counter, set from one read of the tables when it is not known yet"""
+        if self.table._next_id is None:
+            stored = tables.get(self.table.name) or {}
+            saved = ((tables.get(self.last_ids.name) or {}).get("1") or {}).get(self.table.name, 0)
+            self.table._next_id = max(max(map(int, stored), default=0), saved) + 1
+        return self.table._next_id
+
+    def _write(self, change):
+        """
+        Apply change(tables) to the raw tables with one read and one write of
+        the file (skipped when change returns a false value); returns its result
+        """
+        tables = self.db.storage.read() or {}
+        # Known before the change drops the highest ids
+        highest = self._next_id(tables) - 1
+        result = change(tables)
+        if result:
+            last_ids = tables.setdefault(self.last_ids.name, {}).setdefault("1", {})
+            last_ids[self.table.name] = max(last_ids.get(self.table.name, 0), highest)
+            self.db.storage.write(tables)
+            self.table.clear_cache()
+            self.last_ids.clear_cache()
+        return result
+
+    def load(self):
+        for doc in self.table.all():
+            yield doc.doc_id, doc
+
+    def get(self, doc_id):
+        return self.table.get(doc_id=doc_id)
+
+    def get_many(self, doc_ids):
+        # One read of the file for all of them
+        return {doc.doc_id: doc for doc in self.table.get(doc_ids=list(doc_ids))}
+
+    def refresh(self):
+        # TinyDB caches the next id; another process may have used it
+        self.table._next_id = None
+        self.table.clear_cache()
+
+    def insert(self, documents):
+        if self.table._next_id is None:
+            # TinyDB would start after the highest id still stored
+            self._next_id(self.db.storage.read() or {})
+        return self.table.insert_multiple(documents)
+
+    def update(self, doc_id, fields):
+        self.table.update(fields, doc_ids=[doc_id])
+
+    def remove(self, doc_ids):
+        # TinyDB fails the whole remove on an unknown id, so the raw table is edited instead
+        doc_ids = set(doc_ids)
+
+        def change(tables):
+            table = tables.get(self.table.name) or {}
+            return sum(table.pop(str(doc_id), None) is not None for doc_id in doc_ids)
+        return self._write(change)
+
+    def truncate(self):
+        def change(tables):
+            if not tables.get(self.table.name):
+                return False
+            tables[self.table.name] = {}
+            return True
+        self._write(change)
+
+    def count(self):
+        return len(self.table)
+
+    def open_table(self, name):
+        return TinyDBBackend(table=name, db=self.db)
+
+    def close(self):
+        self.db.close()
+
+
+class MongoBackend(StorageBackend):
+    """
+    MongoDB through pymongo, with a pooled client and bulk writes
+
+    Ids come from a counters collection so they stay small increasing ints
+    like on the other backends.
+    """
+    name = "mongodb"
+
+    def __init__(self, url, db_name="news_portal", table="news_articles", pool_size=50, client=None):
+        if client is None:
+            options = {"maxPoolSize": pool_size, "serverSelectionTimeoutMS": 5000}
+            if url.startswith("mongodb+srv://"):
+                options["tlsCAFile"] = certifi.where()
+            client = pymongo.MongoClient(url, **options)
+            client.admin.command("ping")
+        self.client = client
+        self.db = self.client[db_name]
+        self.collection = self.db[table]
+        self.counters = self.db["counters"]
+        self.table = table
+
+    def _next_ids(self, count):
+        """Reserve count ids in one round-trip"""
+        counter = self.counters.find_one_and_update(
+            {"_id": self.table},
+            {"$inc": {"seq": count}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        last = counter["seq"]
+        return list(range(last - count + 1, last + 1))
+
+    def load(self):
+        for doc in self.collection.find({}).sort("_id", pymongo.ASCENDING):
+            doc_id = doc.pop("_id")
+            yield doc_id, doc
+
+    def get(self, doc_id):
+        doc = self.collection.find_one({"_id": doc_id})
+        if doc is not None:
+            doc.pop("_id")
+        return doc
+
+    def get_many(self, doc_ids):
+        return {doc.pop("_id"): doc for doc in self.collection.find({"_id": {"$in": list(doc_ids)}})}
+
+    def insert(self, documents):
+        documents = list(documents)
+        if not documents:
+            return []
+        doc_ids = self._next_ids(len(documents))
+        self.collection.insert_many(
+            [{**doc, "_id": doc_id} for doc_id, doc in zip(doc_ids, documents)],
+            ordered=False
+        )
+        return doc_ids
+
+    def update(self, doc_id, fields):
+        self.collection.update_one({"_id": doc_id}, {"$set": fields})
+
+    def update_many(self, updates):
+        requests = [pymongo.UpdateOne({"_id": doc_id}, {"$set": fields}) for doc_id, fields in updates]
+        if requests:
+            self.collection.bulk_write(requests, ordered=False)
+
+    def remove(self, doc_ids):
+        return self.collection.delete_many({"_id": {"$in": list(doc_ids)}}).deleted_count
+
+    def truncate(self):
+        self.collection.delete_many({})
+
+    def count(self):
+        return self.collection.estimated_document_count()
+
+    def open_table(self, name):
+        return MongoBackend(None, db_name=self.db.name, table=name, client=self.client)
+
+    def close(self):
+        self.client.close()
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    SQLite file in WAL mode (single node, safe with several processes)
+
+    Documents are stored as JSON text; AUTOINCREMENT makes sure ids are never reused.
+    """
+    name = "sqlite"
+
+    def __init__(self, path, table="news_articles", conn=None, lock=None, fsync=False):
+        if conn is None:
+            conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # FULL syncs the WAL on every commit; NORMAL only at checkpoints
+            conn.execute("PRAGMA synchronous=FULL" if fsync else "PRAGMA synchronous=NORMAL")
+        self.conn = conn
+        self.lock = lock or threading.Lock()
+        self.path = path
+        self.table = table
+        self.conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY AUTOINCREMENT, doc TEXT NOT NULL)"
+        )
+
+    @contextmanager
+    def _transaction(self):
+        """One write transaction (one WAL commit) for a whole batch"""
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def load(self):
+        with self.lock:
+            rows = self.conn.execute(f"SELECT id, doc FROM {self.table} ORDER BY id").fetchall()
+        for doc_id, doc in rows:
+            yield doc_id, json.loads(doc)
+
+    def get(self, doc_id):
+        with self.lock:
+            row = self.conn.execute(f"SELECT doc FROM {self.table} WHERE id = ?", (doc_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, doc_ids):
+        doc_ids = list(doc_ids)
+        found = {}
+        with self.lock:
+            # SQLite allows 999 bound parameters per statement
+            for start in range(0, len(doc_ids), 900):
+                chunk = doc_ids[start:start + 900]
+                rows = self.conn.execute(
+                    f"SELECT id, doc FROM {self.table} WHERE id IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update((doc_id, json.loads(doc)) for doc_id, doc in rows)
+        return found
+
+    def insert(self, documents):
+        doc_ids = []
+        with self._transaction() as conn:
+            for doc in documents:
+                cursor = conn.execute(f"INSERT INTO {self.table} (doc) VALUES (?)", (json.dumps(doc),))
+                doc_ids.append(cursor.lastrowid)
+        return doc_ids
+
+    def update(self, doc_id, fields):
+        self.update_many([(doc_id, fields)])
+
+    def update_many(self, updates):
+        with self._transaction() as conn:
+            for doc_id, fields in updates:
+                row = conn.execute(f"SELECT doc FROM {self.table} WHERE id = ?", (doc_id,)).fetchone()
+                if row is None:
+                    continue
+                doc = json.loads(row[0])
+                doc.update(fields)
+                conn.execute(f"UPDATE {self.table} SET doc = ? WHERE id = ?", (json.dumps(doc), doc_id))
+
+    def remove(self, doc_ids):
+        doc_ids = list(doc_ids)
+        if not doc_ids:
+            return 0
+        with self._transaction() as conn:
+            cursor = conn.executemany(
+                f"DELETE FROM {self.table} WHERE id = ?", [(doc_id,) for doc_id in doc_ids]
+            )
+            return cursor.rowcount
+
+    def truncate(self):
+        with self._transaction() as conn:
+            conn.execute(f"DELETE FROM {self.table}")
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def open_table(self, name):
+        return SQLiteBackend(self.path, table=name, conn=self.conn, lock=self.lock)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class LogBackend(StorageBackend):
+    """
+    Append-only record log (see logstore.py): inserts and deletes append,
+    single documents are read through mmap
+    """
+    name = "log"
+
+    def __init__(self, path, table="news_articles", fsync=False):
+        self.path = path
+        self.fsync = fsync
+        self.log = AppendOnlyLog(path, fsync=fsync)
+
+    def load(self):
+        return self.log.items()
+
+    def get(self, doc_id):
+        return self.log.get(doc_id)
+
+    def insert(self, documents):
+        documents = list(documents)
+        doc_ids = self.log.reserve_ids(len(documents))
+        self.log.put_many(zip(doc_ids, documents))
+        return doc_ids
+
+    def update(self, doc_id, fields):
+        self.update_many([(doc_id, fields)])
+
+    def update_many(self, updates):
+        changed = []
+        for doc_id, fields in updates:
+            document = self.log.get(doc_id)
+            if document is not None:
+                changed.append((doc_id, {**document, **fields}))
+        self.log.put_many(changed)
+
+    def remove(self, doc_ids):
+        return self.log.delete_many(doc_ids)
+
+    def truncate(self):
+        self.log.clear()
+
+    def count(self):
+        return len(self.log)
+
+    def open_table(self, name):
+        root, ext = os.path.splitext(self.path)
+        return LogBackend(f"{root}.{name}{ext}", table=name, fsync=self.fsync)
+
+    def close(self):
+        self.log.close()
+
+
+def create_backend(name, table="news_articles", **settings):
+    """
+    Build the backend selected in configuration (tinydb, mongodb, sqlite or log)
+
+    fsync=True syncs every committed write to disk, fsync=False leaves it to
+    the OS (unset keeps each backend's default); MongoDB follows its own write concern.
+    """
+    name = (name or "tinydb").lower()
+    durability = {"fsync": settings["fsync"]} if settings.get("fsync") is not None else {}
+    if name == "tinydb":
+        return TinyDBBackend(settings.get("path"), table=table, **durability)
+    if name in ("mongodb", "mongo"):
+        return MongoBackend(
+            settings["url"],
+            db_name=settings.get("db_name", "news_portal"),
+            table=table,
+            pool_size=settings.get("pool_size", 50)
+        )
+    if name == "sqlite":
+        return SQLiteBackend(settings.get("sqlite_path"), table=table, **durability)
+    if name == "log":
+        return LogBackend(settings.get("log_path"), table=table, **durability)
+    raise ValueError(f"Unknown database backend: {name}")
@@ -0,0 +1,44 @@
+"""
+Near-duplicate clusters kept current one article at a time
+
+Run from the backend folder: python3 -m pytest -q
+"""
+from clusters import ClusterIndex
+
+STORY = ("The central bank left interest rates unchanged on Thursday and said inflation "
+         "was easing faster than expected across the region, while warning that wage growth "
+         "and energy prices could still push it back up later in the year")
+
+
+def story(sign_off):
+    return {"title": "Central bank holds rates", "content": f"{STORY}. {sign_off}"}
+
+
+OTHER = {"title": "Local team wins the cup", "content": "A late goal settled the final in front of a home crowd"}
+
+
+def test_near_duplicates_share_a_cluster():
+    index = ClusterIndex.build({1: story("Reporting by agencies."), 2: story("Updated with comment."), 3: OTHER})
+    assert index.cluster(1) == index.cluster(2) == 1
+    assert index.cluster(3) == 3
+    assert index.size(2) == 2 and index.size(3) == 1
+    assert index.is_representative(2) and not index.is_representative(1)
+
+
+def test_removed_founder_does_not_come_back_by_id():
+    index = ClusterIndex.build({1: story("Reporting by agencies."), 2: story("Updated with comment."),
+                                3: story("More to follow.")})
+    index.remove(1)
+    # The cluster goes on under its oldest remaining article
+    assert index.cluster(2) == index.cluster(3) == 2
+    assert sorted(index.members) == [2]
+
+    # Edited into another story, the old founder is a cluster of its own
+    index.update(1, OTHER)
+    assert index.cluster(1) == 1 and index.size(1) == 1
+    assert index.members[2] == [2, 3] and index.size(2) == 2
+
+    # ...and joins the story again on its text, not its id
+    index.update(1, story("Reporting by agencies."))
+    assert index.cluster(1) == 2 and index.members[2] == [1, 2, 3]
+    assert 1 not in index.members
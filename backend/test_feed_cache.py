@@ -0,0 +1,66 @@
+"""
+Feed validator cache shared by several processes through one file
+
+Run from the backend folder: python3 -m pytest -q
+"""
+from feed_cache import FeedCache
+
+
+def test_save_keeps_other_processes_validators(tmp_path):
+    path = str(tmp_path / "feed_cache.json")
+    first, second = FeedCache(path), FeedCache(path)
+    first.update("https://a.example/rss", {"etag": '"a1"'})
+    first.update("https://b.example/rss", {"etag": '"b1"'})
+    first.save()
+
+    # Both have read the file, then each changes different feeds
+    assert second.get("https://a.example/rss") == {"etag": '"a1"'}
+    first.update("https://a.example/rss", {"etag": '"a2"'})
+    second.update("https://c.example/rss", {"etag": '"c1"'})
+    second.clear(["https://b.example/rss"])
+    first.save()
+    second.save()
+
+    assert FeedCache(path).get("https://a.example/rss") == {"etag": '"a2"'}
+    assert FeedCache(path).get("https://b.example/rss") is None
+    assert FeedCache(path).get("https://c.example/rss") == {"etag": '"c1"'}
+    assert not first.dirty and not second.dirty
+    assert list(tmp_path.glob("*.tmp")) == []
+
+
+def test_clear_all_forgets_saved_feeds(tmp_path):
+    path = str(tmp_path / "feed_cache.json")
+    cache = FeedCache(path)
+    cache.update("https://a.example/rss", {"etag": '"a1"'})
+    cache.save()
+    cache.clear()
+    cache.update("https://b.example/rss", {"etag": '"b1"'})
+    cache.save()
+    assert FeedCache(path)._read() == {"https://b.example/rss": {"etag": '"b1"'}}
+
+
+def test_only_emptied_feeds_are_downloaded_again(tmp_path, monkeypatch):
+    import database
+    import scheduler
+    import scraper
+    from benchmarks.common import StubFeedServer, make_rss
+    from test_indexes import memory_collection
+
+    collection = memory_collection(0)
+    monkeypatch.setattr(database, "news_collection", collection)
+    monkeypatch.setattr(scheduler, "get_news_collection", lambda: collection)
+    monkeypatch.setattr(scraper, "validator_cache", FeedCache(str(tmp_path / "feed_cache.json")))
+    with StubFeedServer(make_rss("Busy", count=5), etag=True) as busy, \
+            StubFeedServer(make_rss("Busy", count=5), etag=True) as quiet:
+        # Quiet only repeats Busy's stories, so nothing is ever stored under its name
+        sources = [(busy.url, "Busy", "general"), (quiet.url, "Quiet", "general")]
+        assert scheduler.run_scrape(sources[:1])["inserted"] == 5
+        result = scheduler.run_scrape(sources)
+        assert result["feeds"]["scraped"] == ["Quiet"] and result["skipped"] == 5
+        assert sorted(scheduler.run_scrape(sources)["feeds"]["skipped"]) == ["Busy", "Quiet"]
+
+        collection.delete_many({})
+        result = scheduler.run_scrape(sources)
+        # The emptied feed is fetched in full; the one that never had articles still gets a 304
+        assert result["inserted"] == 5
+        assert result["feeds"]["scraped"] == ["Busy"] and result["feeds"]["skipped"] == ["Quiet"]
@@ -0,0 +1,270 @@
+"""
+In-memory indexes and reads: index walks against a plain linear filter,
+keyset pages, cursor pushdown
+
+Run from the backend folder: python3 -m pytest -q
+"""
+import random
+
+import pytest
+from tinydb.storages import MemoryStorage
+
+from database import ArticleIndexes, CollectionWrapper, _date_entry, date_key
+from storage import TinyDBBackend
+
+SOURCES = ["CNN", "BBC News", "Bloomberg", "TechCrunch"]
+CATEGORIES = ["general", "business", "technology", None]
+
+
+def make_articles(count, seed=1):
+    """Articles with mixed sources, categories and dates (some undated, some sharing a date)"""
+    rng = random.Random(seed)
+    for i in range(count):
+        day = rng.randint(1, 28)
+        yield {
+            "title": f"Story {i}",
+            "content": f"Body of story {i}",
+            "source": rng.choice(SOURCES),
+            "category": rng.choice(CATEGORIES),
+            "url": f"https://example.com/{i}",
+            "published_date": None if rng.random() < 0.1 else f"2026-02-{day:02d}T{rng.randint(0, 23):02d}:00:00",
+        }
+
+
+def memory_collection(count, seed=1):
+    backend = TinyDBBackend(storage=MemoryStorage)
+    backend.insert(list(make_articles(count, seed)))
+    return CollectionWrapper(backend)
+
+
+def linear(index, category=None, source=None, date_from=None, date_to=None, before=None):
+    """What query() must return, newest _id first, by looking at every article"""
+    ids = []
+    for doc_id, record in index.docs.items():
+        if category is not None and record.category != category:
+            continue
+        if source is not None and record.source != source:
+            continue
+        if date_from is not None or date_to is not None:
+            if record.published is None:
+                continue
+            if (date_from is not None and record.published < date_from) or \
+                    (date_to is not None and record.published > date_to):
+                continue
+        if before is not None and doc_id >= before:
+            continue
+        ids.append(doc_id)
+    return sorted(ids, reverse=True)
+
+
+def random_filters(rng, index):
+    filters = {}
+    if rng.random() < 0.5:
+        filters["category"] = rng.choice(CATEGORIES[:-1] + ["missing"])
+    if rng.random() < 0.5:
+        filters["source"] = rng.choice(SOURCES + ["Nobody"])
+    if rng.random() < 0.4:
+        filters["date_from"] = date_key(f"2026-02-{rng.randint(1, 28):02d}T00:00:00")
+    if rng.random() < 0.4:
+        filters["date_to"] = date_key(f"2026-02-{rng.randint(1, 28):02d}T12:00:00")
+    if rng.random() < 0.4:
+        filters["before"] = rng.randint(1, max(index.docs) + 1)
+    return filters
+
+
+def test_query_matches_linear_filter():
+    collection = memory_collection(500)
+    index = collection._indexes()
+    rng = random.Random(7)
+    for _ in range(300):
+        filters = random_filters(rng, index)
+        assert list(index.query(**filters)) == linear(index, **filters), filters
+
+
+def test_query_after_adds_and_removes():
+    collection = memory_collection(300)
+    collection.delete_many({"_id": {"$in": list(range(1, 300, 3))}})
+    collection.insert_many(list(make_articles(50, seed=2)))
+    index = collection._indexes()
+    rng = random.Random(8)
+    for _ in range(200):
+        filters = random_filters(rng, index)
+        assert list(index.query(**filters)) == linear(index, **filters), filters
+
+
+def test_query_by_published_date():
+    index = memory_collection(300)._indexes()
+    expected = sorted(index.docs, key=lambda doc_id: _date_entry(index.docs[doc_id]), reverse=True)
+    assert list(index.query(order="published_date")) == expected
+    assert list(index.query(order="published_date", descending=False)) == expected[::-1]
+    date_from = date_key("2026-02-10T00:00:00")
+    dated = [doc_id for doc_id in expected if index.docs[doc_id].published is not None
+             and index.docs[doc_id].published >= date_from]
+    assert list(index.query(order="published_date", date_from=date_from)) == dated
+
+
+@pytest.mark.parametrize("limit", [1, 7, 50, 100])
+def test_keyset_pages_cover_everything_once(limit):
+    collection = memory_collection(100)
+    index = collection._indexes()
+    for filters in [{}, {"source": "CNN"}, {"category": "business", "published_from": "2026-02-05T00:00:00"}]:
+        expected = linear(index, category=filters.get("category"), source=filters.get("source"),
+                          date_from=date_key(filters.get("published_from")))
+        seen, before, pages = [], None, 0
+        while True:
+            page, before = collection.find_page(limit=limit, before=before, **filters)
+            pages += 1
+            assert len(page) <= limit
+            seen += [int(article["_id"]) for article in page]
+            if before is None:
+                break
+            # The cursor is the last id of a full page
+            assert len(page) == limit and before == page[-1]["_id"]
+        assert seen == expected
+        # A last page that is exactly full gives no cursor (no empty page after it)
+        assert pages == max(1, -(-len(expected) // limit))
+
+
+def test_page_after_last_article_is_empty():
+    collection = memory_collection(10)
+    assert collection.find_page(limit=5, before=1) == ([], None)
+    page, cursor = collection.find_page(limit=10)
+    assert len(page) == 10 and cursor is None
+
+
+def test_find_page_json_matches_find_page():
+    import json
+    collection = memory_collection(60)
+    for filters in [{}, {"limit": 10}, {"source": "BBC News", "limit": 5}, {"fields": ["title", "source"]}]:
+        articles, cursor = collection.find_page(**filters)
+        body, json_cursor = collection.find_page_json(**filters)
+        assert json.loads(body) == articles and json_cursor == cursor
+
+
+def test_cursor_pushdown_matches_scan():
+    collection = memory_collection(200)
+    index = collection._indexes()
+    everything = [record.to_dict() for record in index.docs.values()]
+    queries = [
+        {"source": "CNN"},
+        {"category": "technology", "source": "Bloomberg"},
+        {"published_date": {"$gte": "2026-02-10T00:00:00", "$lt": "2026-02-20T00:00:00"}},
+        {"_id": {"$in": ["5", "17", "170", "999"]}},
+        {"_id": {"$in": [str(i) for i in range(1, 200, 2)]}, "source": "CNN"},
+        {"_id": "42"},
+    ]
+    for query in queries:
+        def matches(article):
+            for field, condition in query.items():
+                value = article.get(field)
+                if field == "_id" and isinstance(condition, dict):
+                    if value not in condition["$in"]:
+                        return False
+                elif isinstance(condition, dict):
+                    if value is None or not (condition.get("$gte", "") <= value and value < condition.get("$lt", "~")):
+                        return False
+                elif value != condition:
+                    return False
+            return True
+        expected = sorted((a for a in everything if matches(a)), key=lambda a: int(a["_id"]), reverse=True)
+        assert list(collection.find(query)) == expected, query
+        assert list(collection.find(query).sort("_id", 1)) == expected[::-1], query
+        assert list(collection.find(query).skip(2).limit(3)) == expected[2:5], query
+        assert collection.count_documents(query) == len(expected), query
+
+
+def test_delete_by_ids_with_filter():
+    collection = memory_collection(100)
+    cnn = [doc_id for doc_id, record in collection._indexes().docs.items() if record.source == "CNN"][:5]
+    others = [doc_id for doc_id, record in collection._indexes().docs.items() if record.source != "CNN"][:5]
+    result = collection.delete_many({"_id": {"$in": cnn + others}, "source": "CNN"})
+    assert result.deleted_count == len(cnn)
+    assert all(collection.find_one({"_id": str(doc_id)}) is None for doc_id in cnn)
+    assert all(collection.find_one({"_id": str(doc_id)}) is not None for doc_id in others)
+    assert collection.count_documents({}) == 100 - len(cnn)
+
+
+def test_rebuilt_indexes_match_incremental_ones():
+    collection = memory_collection(150)
+    collection.delete_many({"_id": {"$in": list(range(2, 150, 5))}})
+    collection.upsert_many(list(make_articles(40, seed=3)))
+    incremental = collection._indexes()
+    rebuilt = ArticleIndexes.build(collection.backend.load())
+    assert incremental.ids == rebuilt.ids
+    assert incremental.by_date == rebuilt.by_date
+    assert {k: v for k, v in incremental.by_source.items() if v} == {k: v for k, v in rebuilt.by_source.items() if v}
+    assert incremental.keys == rebuilt.keys
+
+
+def test_reads_during_writes():
+    """Reads do not take the write lock: none may fail, repeat or misorder while a thread writes"""
+    import sys
+    import threading
+    collection = memory_collection(400)
+    collection._cluster_index()
+    collection._search_index()
+    stop = threading.Event()
+    errors = []
+
+    def write():
+        rng = random.Random(5)
+        batch = 0
+        while not stop.is_set():
+            batch += 1
+            collection.upsert_many(list(make_articles(20, seed=100 + batch)))
+            ids = list(collection._indexes().docs)
+            collection.delete_many({"_id": {"$in": rng.sample(ids, min(len(ids), 15))}})
+            if batch % 5 == 0:
+                # A few big deletes rebuild whole lists (remove_many)
+                collection.delete_many({"_id": {"$in": rng.sample(ids, min(len(ids), 100))}})
+                collection.insert_many(list(make_articles(100, seed=batch)))
+
+    def read(task):
+        try:
+            while not stop.is_set():
+                task()
+        except Exception as error:   # reported by the test thread
+            errors.append(error)
+            stop.set()
+
+    def pages():
+        before, seen = None, set()
+        while True:
+            page, before = collection.find_page(limit=25, before=before, source="CNN")
+            ids = [int(article["_id"]) for article in page]
+            assert ids == sorted(ids, reverse=True) and not seen & set(ids)
+            seen.update(ids)
+            if before is None:
+                return
+
+    def cursors():
+        list(collection.find({"category": "business"}).sort("published_date", -1))
+        list(collection.find({"published_date": {"$gte": "2026-02-10T00:00:00"}}).sort("title", 1))
+        ids = [int(a["_id"]) for a in collection.find({"_id": {"$in": [str(i) for i in range(1, 900, 3)]}})]
+        assert ids == sorted(ids, reverse=True)
+        collection.count_documents({"source": "BBC News", "category": "general"})
+        collection.distinct("category")
+        collection.find_one({"source": "Bloomberg"})
+
+    def others():
+        collection.find_page_json(limit=50, collapse=True)
+        collection.find_page_json(limit=50, category="technology", published_from="2026-02-03T00:00:00")
+        collection.search("story body", limit=10, source="CNN", collapse=True)
+        collection.changes_json(0)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    try:
+        threads = [threading.Thread(target=write)] + \
+            [threading.Thread(target=read, args=(task,)) for task in (pages, cursors, others)]
+        for thread in threads:
+            thread.start()
+        stop.wait(2)
+        stop.set()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert not errors, repr(errors[0])
+    rebuilt = ArticleIndexes.build(collection.backend.load())
+    assert collection._indexes().ids == rebuilt.ids
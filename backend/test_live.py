@@ -0,0 +1,41 @@
+"""
+Live feed (GET /news/live): where a stream starts and what it is sent
+
+Run from the backend folder: python3 -m pytest -q
+"""
+import asyncio
+import json
+
+import database
+from live import Broadcaster
+from test_indexes import make_articles, memory_collection
+
+
+def frames(chunks):
+    """(event, data) of SSE frames"""
+    for chunk in chunks:
+        fields = dict(line.split(": ", 1) for line in chunk.decode().splitlines() if ": " in line)
+        yield fields.get("event"), json.loads(fields["data"])
+
+
+def test_hello_is_where_the_queued_events_start(monkeypatch):
+    collection = memory_collection(10)
+    monkeypatch.setattr(database, "news_collection", collection)
+
+    async def run():
+        broadcaster = Broadcaster(poll_interval=0.01)
+        subscriber = await broadcaster.subscribe()
+        start = collection.change_seq()
+        # Changes land and are queued before the client reads its first frame
+        collection.insert_many(list(make_articles(3, seed=2)))
+        while subscriber.queue.empty():
+            await asyncio.sleep(0.01)
+        stream = broadcaster.stream(subscriber)
+        hello, changes = [await stream.__anext__() for _ in range(2)]
+        broadcaster.close()
+        await stream.aclose()
+        return start, list(frames([hello, changes]))
+
+    start, [(hello, hello_data), (event, data)] = asyncio.run(run())
+    assert hello == "hello" and hello_data["seq"] == start
+    assert event == "changes" and data["seq"] > start and len(data["articles"]) == 3
@@ -0,0 +1,108 @@
+"""
+Storage backends through CollectionWrapper: upsert counts and ids that
+are never handed out twice
+
+Run from the backend folder: python3 -m pytest -q
+"""
+import pytest
+from tinydb.storages import MemoryStorage
+
+from database import CollectionWrapper
+from storage import LogBackend, SQLiteBackend, TinyDBBackend
+from test_indexes import make_articles
+
+BACKENDS = ["tinydb-memory", "tinydb", "sqlite", "log"]
+
+
+def open_backend(kind, folder):
+    if kind == "tinydb-memory":
+        return TinyDBBackend(storage=MemoryStorage)
+    if kind == "tinydb":
+        return TinyDBBackend(str(folder / "news.json"), fsync=False)
+    if kind == "sqlite":
+        return SQLiteBackend(str(folder / "news.sqlite3"))
+    return LogBackend(str(folder / "news.log"))
+
+
+@pytest.fixture(params=BACKENDS)
+def kind(request):
+    return request.param
+
+
+def test_upsert_counts(kind, tmp_path):
+    collection = CollectionWrapper(open_backend(kind, tmp_path))
+    articles = list(make_articles(30))
+
+    result = collection.upsert_many(articles)
+    assert (result.inserted_count, result.updated_count, result.skipped_count) == (30, 0, 0)
+
+    result = collection.upsert_many(articles)
+    assert (result.inserted_count, result.updated_count, result.skipped_count) == (0, 0, 30)
+
+    changed = [dict(article, content=article["content"] + " (updated)") for article in articles[:4]]
+    result = collection.upsert_many(changed + articles[4:10])
+    assert (result.inserted_count, result.updated_count, result.skipped_count) == (0, 4, 6)
+    assert collection.find_one({"_id": result.updated_ids[0]})["content"].endswith("(updated)")
+
+    # The same story twice in one batch (listed in two feeds) is stored once
+    fresh = list(make_articles(35))[30:]
+    result = collection.upsert_many(fresh + fresh[:2])
+    assert (result.inserted_count, result.updated_count, result.skipped_count) == (5, 0, 2)
+    assert collection.count_documents({}) == 35
+
+
+def test_ids_are_never_reused(kind, tmp_path):
+    collection = CollectionWrapper(open_backend(kind, tmp_path))
+    ids = [int(doc_id) for doc_id in collection.insert_many(list(make_articles(10))).inserted_ids]
+    assert ids == sorted(ids) and len(set(ids)) == 10
+    highest = ids[-1]
+
+    # Deleting the newest article must not free its id
+    collection.delete_many({"_id": {"$in": [highest, highest - 1]}})
+    new_id = int(collection.insert_many(list(make_articles(11))[10:]).inserted_ids[0])
+    assert new_id > highest
+    highest = new_id
+
+    collection.delete_many({})
+    assert collection.count_documents({}) == 0
+    new_id = int(collection.insert_many(list(make_articles(12))[11:]).inserted_ids[0])
+    assert new_id > highest
+    highest = new_id
+
+    if kind == "tinydb-memory":
+        return
+    # ...not even after the file is opened again
+    collection.delete_many({"_id": highest})
+    collection.backend.close()
+    reopened = CollectionWrapper(open_backend(kind, tmp_path))
+    assert reopened.count_documents({}) == 0
+    new_id = int(reopened.insert_many(list(make_articles(13))[12:]).inserted_ids[0])
+    assert new_id > highest
+
+
+def test_chat_table_ids_are_separate(kind, tmp_path):
+    backend = open_backend(kind, tmp_path)
+    chat = backend.open_table("chat_history")
+    first = chat.insert([{"message": "hi"}])[0]
+    backend.insert(list(make_articles(3)))
+    chat.remove([first])
+    assert chat.insert([{"message": "again"}])[0] > first
+    assert backend.count() == 3 and chat.count() == 1
+
+
+def test_tinydb_delete_is_one_write():
+    class CountingStorage(MemoryStorage):
+        writes = 0
+
+        def write(self, data):
+            CountingStorage.writes += 1
+            super().write(data)
+
+    backend = TinyDBBackend(storage=CountingStorage)
+    backend.insert(list(make_articles(10)))
+    for remove in (lambda: backend.remove([10, 3, 99]), backend.truncate):
+        before = CountingStorage.writes
+        remove()
+        assert CountingStorage.writes - before == 1
+    assert backend.count() == 0
+    assert backend.insert(list(make_articles(1)))[0] == 11